@@ -0,0 +1,294 @@
+"""
+Active-learning sampling of the PES grid.
+
+Active learning: instead of computing all 71×71 grid points, train a small ensemble of NeuralNetwork PESs on
+the points labelled so far and request the next batch where the ensemble disagrees most or the predicted
+force is largest. An analytic LEPS potential stands in for the quantum chemistry code when testing the loop.
+"""
+
+import importlib
+import os
+import sys
+import numpy as np
+import pandas as pd
+import torch
+from config import AL_STRATEGIES as STRATEGIES, SOFTWARE_ORACLES
+from dataset_io import DATA_COLUMNS, read_table
+from ensemble import VectorizedEnsemble
+from train import forces_from_gradient
+
+RUN_BIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "run-big")
+HARTREE_PER_EV = 1.0 / 27.211386
+
+
+def grid_candidates(start: float = 0.5, step: float = 0.05, size: int = 71):
+    """
+    All (x, y) points of the rectangular grid used by the input generators.
+
+    x is the ATOM1-ATOM3 distance (m) and y the ATOM1-ATOM2 distance (-n), in Angstrom.
+    """
+    axis = np.round(start + step * np.arange(size), 6)
+    xx, yy = np.meshgrid(axis, axis, indexing="ij")
+    return np.column_stack((xx.ravel(), yy.ravel()))
+
+
+def initial_design(candidates, stride: int = 10):
+    """
+    Coarse sub-grid used as the first batch: every `stride`-th grid line plus the far edges.
+
+    Returns:
+        np.ndarray: indices into `candidates`
+    """
+    keep = []
+    for axis in (0, 1):
+        values = np.unique(candidates[:, axis])
+        chosen = set(values[::stride]) | {values[-1]}
+        keep.append(np.isin(candidates[:, axis], list(chosen)))
+    return np.flatnonzero(keep[0] & keep[1])
+
+
+class LEPSPotential:
+    """
+    London-Eyring-Polanyi-Sato potential for the collinear ATOM2-ATOM1-ATOM3 geometry.
+
+    Analytic stand-in for Gaussian/QE/CP2K: labels points with energies (Hartree) and forces (Hartree/Bohr)
+    in the same x, y, z1..z4 layout as the extracted datasets. Defaults are the classic H3 Morse/Sato
+    parameters, shared by the three pairs.
+
+    Args:
+        dissociation (float | tuple): Morse well depth per pair (12, 13, 23), eV
+        alpha (float | tuple): Morse range parameter per pair, 1/Angstrom
+        r_eq (float | tuple): equilibrium distance per pair, Angstrom
+        sato (float | tuple): Sato parameter per pair
+    """
+
+    def __init__(self, dissociation=4.7466, alpha=1.9425, r_eq=0.7419, sato=0.18):
+        def per_pair(value):
+            return np.broadcast_to(np.asarray(value, dtype=np.float64), (3,)).copy()
+
+        self.dissociation = per_pair(dissociation) * HARTREE_PER_EV
+        self.alpha = per_pair(alpha)
+        self.r_eq = per_pair(r_eq)
+        self.sato = per_pair(sato)
+
+    def _integrals(self, r, pair):
+        """
+        Coulomb (Q) and exchange (J) integrals of one pair and their derivatives with respect to r.
+        """
+        d, a, k = self.dissociation[pair], self.alpha[pair], self.sato[pair]
+        e1 = np.exp(-a * (r - self.r_eq[pair]))
+        e2 = e1 * e1
+        q = d / 4 * ((3 + k) * e2 - (2 + 6 * k) * e1)
+        j = d / 4 * ((1 + 3 * k) * e2 - (6 + 2 * k) * e1)
+        dq = d / 4 * (-2 * a * (3 + k) * e2 + a * (2 + 6 * k) * e1)
+        dj = d / 4 * (-2 * a * (1 + 3 * k) * e2 + a * (6 + 2 * k) * e1)
+        return q / (1 + k), j / (1 + k), dq / (1 + k), dj / (1 + k)
+
+    def energy_and_gradient(self, x, y):
+        """
+        Energy and dE/d(x, y) at arrays of (x, y) points.
+
+        Returns:
+            tuple: (energy, gradient) with shapes (N,) and (N, 2), Hartree and Hartree/Angstrom
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        # pair distances: ATOM1-ATOM2 = y, ATOM1-ATOM3 = x, ATOM2-ATOM3 = x + y
+        q12, j12, dq12, dj12 = self._integrals(y, 0)
+        q13, j13, dq13, dj13 = self._integrals(x, 1)
+        q23, j23, dq23, dj23 = self._integrals(x + y, 2)
+
+        root = np.sqrt(0.5 * ((j12 - j13) ** 2 + (j13 - j23) ** 2 + (j23 - j12) ** 2)) + 1e-300
+        energy = q12 + q13 + q23 - root
+        # d(root)/dJ_i = (2 J_i - J_j - J_k) / (2 root)
+        droot12 = (2 * j12 - j13 - j23) / (2 * root)
+        droot13 = (2 * j13 - j12 - j23) / (2 * root)
+        droot23 = (2 * j23 - j12 - j13) / (2 * root)
+        de12 = dq12 - droot12 * dj12
+        de13 = dq13 - droot13 * dj13
+        de23 = dq23 - droot23 * dj23
+        gradient = np.column_stack((de13 + de23, de12 + de23))
+        return energy, gradient
+
+    def __call__(self, points):
+        """
+        Label (x, y) points.
+
+        Returns:
+            pd.DataFrame: columns x, y, z1 (energy) and z2..z4 (forces on ATOM1, ATOM2, ATOM3)
+        """
+        points = np.asarray(points, dtype=np.float64)
+        energy, gradient = self.energy_and_gradient(points[:, 0], points[:, 1])
+        forces = forces_from_gradient(torch.from_numpy(gradient)).numpy()
+        return pd.DataFrame(np.column_stack((points, energy, forces)), columns=DATA_COLUMNS)
+
+
+class PESEnsemble:
+    """
+    Ensemble of independently initialised NeuralNetwork PESs trained on energies and forces.
+
+    Members are trained full-batch (the labelled sets are small) on standardised energies, all at once by
+    ensemble.VectorizedEnsemble; the spread of their predictions is the uncertainty estimate used for acquisition.
+
+    Args:
+        cfg (dict): model config (hidden_dim, num_layers, activation_function, learning_rate, weight)
+        members (int): ensemble size
+        epochs (int): full-batch Adam steps per member
+        device: torch device, defaults to CUDA when available
+        seed (int): base random seed, member i uses seed + i
+    """
+
+    def __init__(self, cfg, members: int = 5, epochs: int = 1500, device=None, seed: int = 0):
+        self.cfg = cfg
+        self.members = members
+        self.epochs = epochs
+        self.device = device or torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.seed = seed
+        self.ensemble = None
+
+    def fit(self, data):
+        """
+        Train all members on a labelled DataFrame with x, y, z1..z4 columns.
+        """
+        table = data[DATA_COLUMNS].to_numpy(dtype=np.float64)
+        self.ensemble = VectorizedEnsemble(self.cfg, self.members, device=self.device, seed=self.seed)
+        self.ensemble.fit(table[:, :2], table[:, 2], table[:, 3:], epochs=self.epochs)
+        return self
+
+    def predict(self, points):
+        """
+        Ensemble statistics at (x, y) points.
+
+        Returns:
+            tuple: (mean energy, energy standard deviation, mean force norm), each of shape (N,)
+        """
+        energies, gradients = self.ensemble.energy_and_gradient(points)
+        force_norms = forces_from_gradient(gradients.reshape(-1, 2)).norm(dim=1).reshape(self.members, -1)
+        return (energies.mean(0).cpu().numpy(), energies.std(0).cpu().numpy(),
+                force_norms.mean(0).cpu().numpy())
+
+
+def acquisition_scores(std, force_norm, strategy: str = "combined"):
+    """
+    Score candidates: ensemble disagreement, predicted force magnitude, or both (each scaled to [0, 1]).
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown acquisition strategy: {strategy} (choose from {', '.join(STRATEGIES)})")
+    if strategy == "disagreement":
+        return std
+    if strategy == "gradient":
+        return force_norm
+    return std / (std.max() or 1.0) + force_norm / (force_norm.max() or 1.0)
+
+
+def select_batch(candidates, scores, exclude, batch_size: int, min_separation: float = 0.1):
+    """
+    Greedily pick the highest-scoring candidates, skipping excluded ones and points closer than
+    `min_separation` (Angstrom) to a point already picked in this batch.
+
+    Returns:
+        np.ndarray: indices into `candidates`
+    """
+    order = np.argsort(-scores, kind="stable")
+    chosen = []
+    for idx in order:
+        if exclude[idx]:
+            continue
+        if chosen and np.min(np.linalg.norm(candidates[chosen] - candidates[idx], axis=1)) < min_separation:
+            continue
+        chosen.append(idx)
+        if len(chosen) == batch_size:
+            break
+    return np.asarray(chosen, dtype=int)
+
+
+def run_active_learning(oracle, cfg, rounds: int = 8, batch_size: int = 64, initial_stride: int = 10,
+                        strategy: str = "combined", members: int = 5, epochs: int = 1500,
+                        min_separation: float = 0.1, candidates=None, seed: int = 0):
+    """
+    Full active-learning loop against an in-process oracle (e.g. LEPSPotential).
+
+    Each round trains the ensemble on the labelled points, reports its error on the whole grid
+    against the oracle, and labels the next batch of selected points.
+
+    Returns:
+        tuple: (labelled DataFrame, history DataFrame with one row per round)
+    """
+    candidates = grid_candidates() if candidates is None else candidates
+    labelled = np.zeros(len(candidates), dtype=bool)
+    labelled[initial_design(candidates, initial_stride)] = True
+    data = oracle(candidates[labelled])
+    reference = oracle(candidates)["z1"].to_numpy()
+
+    history = []
+    for round_idx in range(rounds + 1):
+        ensemble = PESEnsemble(cfg, members=members, epochs=epochs, seed=seed + round_idx * members).fit(data)
+        mean, std, force_norm = ensemble.predict(candidates)
+        error = mean - reference
+        history.append({
+            "round": round_idx,
+            "labelled": int(labelled.sum()),
+            "rmse": float(np.sqrt(np.mean(error ** 2))),
+            "max_error": float(np.abs(error).max()),
+            "mean_std": float(std[~labelled].mean()) if (~labelled).any() else 0.0,
+        })
+        print(f"Round {round_idx}: {history[-1]['labelled']} points, RMSE {history[-1]['rmse']:.6f}, "
+              f"max error {history[-1]['max_error']:.6f}")
+        if round_idx == rounds:
+            break
+        batch = select_batch(candidates, acquisition_scores(std, force_norm, strategy), labelled,
+                             batch_size, min_separation)
+        if batch.size == 0:
+            break
+        labelled[batch] = True
+        data = pd.concat([data, oracle(candidates[batch])], ignore_index=True)
+    return data, pd.DataFrame(history)
+
+
+def load_generator(software: str):
+    """
+    Import the run-big input generator of a quantum chemistry package.
+    """
+    if software not in SOFTWARE_ORACLES:
+        raise ValueError(f"Unknown quantum chemistry package: {software} (choose from {', '.join(SOFTWARE_ORACLES)})")
+    if RUN_BIG_DIR not in sys.path:
+        sys.path.insert(0, RUN_BIG_DIR)
+    return importlib.import_module(f"generate_{software}_input")
+
+
+def propose_batch(software: str, cfg, data_path=None, root=None, batch_size: int = 64, initial_stride: int = 10,
+                  strategy: str = "combined", members: int = 5, epochs: int = 1500, min_separation: float = 0.1,
+                  seed: int = 0):
+    """
+    One active-learning round against Gaussian / QE / CP2K.
+
+    Trains the ensemble on the points extracted so far (`data_path`), selects the next batch among grid points
+    that have no calculation folder yet, and writes only their inputs with the run-big generator. Without
+    labelled data the coarse initial design is written instead. Run the jobs, extract, and call again.
+
+    Returns:
+        np.ndarray: the (x, y) points written
+    """
+    generator = load_generator(software)
+    from extract import discover_points
+    root = root or os.path.join(RUN_BIG_DIR, generator.MAIN_FOLDER)
+    candidates = grid_candidates()
+
+    requested = np.zeros(len(candidates), dtype=bool)
+    if os.path.isdir(root):
+        existing = {(round(m, 6), round(-n, 6)) for m, n, _ in discover_points(root, generator.ATOM2, generator.ATOM3)}
+        requested = np.array([(x, y) in existing for x, y in candidates])
+
+    if data_path and os.path.exists(data_path):
+        data = read_table(data_path).dropna()
+        ensemble = PESEnsemble(cfg, members=members, epochs=epochs, seed=seed).fit(data)
+        _, std, force_norm = ensemble.predict(candidates)
+        batch = select_batch(candidates, acquisition_scores(std, force_norm, strategy), requested,
+                             batch_size, min_separation)
+    else:
+        batch = initial_design(candidates, initial_stride)
+        batch = batch[~requested[batch]]
+
+    points = candidates[batch]
+    generator.write_points([(float(x), round(-float(y), 6)) for x, y in points], root=root)
+    return points
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Throughput of the training, inference, MD, plotting, minimum-search and output-parsing hot paths.
+
+Everything runs on synthetic inputs built in a scratch directory: an analytic collinear Ne-H-H surface (two
+Morse terms plus a Ne-H repulsion) sampled on the usual (r12, r23) grid with z1..z4 labels, a network briefly
+fitted to it for the inference-side benchmarks, and small fake Gaussian / QE / CP2K output trees for the
+run-big readers. Each benchmark reports in its own unit (samples/s, points/s, steps/s, files/s, seconds);
+the results can be written to JSON and compared with an earlier run, e.g. the same script on the parent commit.
+
+Usage:
+    python benchmarks/hot_paths.py
+    python benchmarks/hot_paths.py --only train model --json bench.json
+    python benchmarks/hot_paths.py --json new.json --compare old.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "run-big"))
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import numpy as np
+import pandas as pd
+import torch
+
+BENCHMARKS = ("train", "model", "md", "visualize", "minima", "readers")
+TRAIN_EPOCHS = {"sample": 2, "batch": 10, "full": 50}
+BATCH_SIZES = (1, 64, 1024, 16384)
+SOFTWARES = ("gaussian", "qe", "cp2k")
+BOHR = 0.529
+
+
+# ---------- Synthetic data ----------
+def _morse(r, depth, a, r0):
+    e = np.exp(-a * (r - r0))
+    return depth * (1 - e) ** 2, 2 * depth * a * e * (1 - e)
+
+
+def analytic_pes(r12, r23):
+    """
+    Energy (Hartree) and dE/d(r12, r23) of the synthetic surface: Ne-H and H-H Morse terms plus a Ne...H repulsion.
+    """
+    e_neh, g_neh = _morse(r12, 0.005, 1.5, 3.0)
+    e_hh, g_hh = _morse(r23, 0.17, 1.94, 0.74)
+    rep = 0.5 * np.exp(-2.0 * (r12 + r23))
+    return e_neh + e_hh + rep, np.stack((g_neh - 2.0 * rep, g_hh - 2.0 * rep), axis=-1)
+
+
+def synthetic_dataset(points_per_axis=36):
+    """
+    DataFrame with the training columns x, y, z1..z4 (z2..z4 ordered like train.forces_from_gradient).
+    """
+    from train import forces_from_gradient
+
+    axis = np.linspace(0.5, 4.0, points_per_axis)
+    x, y = (g.ravel() for g in np.meshgrid(axis, axis))
+    energy, gradient = analytic_pes(x, y)
+    forces = forces_from_gradient(torch.from_numpy(gradient)).numpy()
+    return pd.DataFrame({"x": x, "y": y, "z1": energy, "z2": forces[:, 0], "z3": forces[:, 1], "z4": forces[:, 2]})
+
+
+def fitted_model(cfg, data, device, steps=300):
+    """
+    Network of the config's architecture after a short full-batch Adam fit of the synthetic energies, so MD
+    trajectories and the minimum search see a surface of realistic shape.
+    """
+    from model import NeuralNetwork
+
+    model = NeuralNetwork(
+        cfg["input_dim"], cfg["hidden_dim"], cfg["num_layers"], cfg["output_dim"], cfg["activation_function"]
+    ).to(device)
+    X = torch.tensor(data[["x", "y"]].to_numpy(), dtype=torch.float32, device=device)
+    E = torch.tensor(data[["z1"]].to_numpy(), dtype=torch.float32, device=device)
+    optimizer = torch.optim.Adam(model.parameters(), lr=1e-2)
+    for _ in range(steps):
+        optimizer.zero_grad(set_to_none=True)
+        torch.mean((model(X) - E) ** 2).backward()
+        optimizer.step()
+    return model.eval()
+
+
+FILLER = " Iteration {i:5d}  Delta-E= {d:14.9f}  Rises=F  Damp=F  RMSDP={r:.2e}\n"
+
+
+def _gaussian_output(energy, forces):
+    rows = "".join(f"  {i + 1:5d}  {z:5d}  {f:14.9f}  0.000000000  0.000000000\n"
+                   for i, (z, f) in enumerate(zip((10, 1, 1), forces)))
+    dashes = " " + "-" * 67 + "\n"
+    return (f" SCF Done:  E(RB3LYP) =  {energy:.10f}     A.U. after   12 cycles\n"
+            + dashes + " Center     Atomic                   Forces (Hartrees/Bohr)\n"
+            + " Number     Number              X              Y              Z\n"
+            + dashes + rows + dashes + " Normal termination of Gaussian 16\n")
+
+
+def _qe_output(energy, forces):
+    rows = "".join(f"     atom    {i + 1} type  {t} force =    {f / 0.5:12.8f}    0.00000000    0.00000000\n"
+                   for i, (t, f) in enumerate(zip((1, 2, 2), forces)))
+    return (f"!    total energy              =   {energy / 0.5:16.8f} Ry\n\n"
+            + "     Forces acting on atoms (cartesian axes, Ry/au):\n\n" + rows + "\n"
+            + "     Total force =     0.003000     Total SCF correction =     0.000000\n"
+            + "   JOB DONE.\n")
+
+
+def _cp2k_output(energy, forces):
+    rows = "".join(f"      {i + 1}      {k}      {el}          {f:12.8f}    0.00000000    0.00000000\n"
+                   for i, (k, el, f) in enumerate(zip((1, 2, 2), ("Ne", "H", "H"), forces)))
+    return (f" ENERGY| Total FORCE_EVAL ( QS ) energy (a.u.):          {energy:.12f}\n\n"
+            + " ATOMIC FORCES in [a.u.]\n\n # Atom   Kind   Element          X              Y              Z\n"
+            + rows + " SUM OF ATOMIC FORCES          0.00000000    0.00000000    0.00000000\n"
+            + "  PROGRAM ENDED AT                 2025-01-01 00:00:00.000\n")
+
+
+FAKE_OUTPUTS = {"gaussian": _gaussian_output, "qe": _qe_output, "cp2k": _cp2k_output}
+
+
+def fake_outputs(root, software, n_files, filler_lines):
+    """
+    Write `n_files` point directories with a parsable output each (SCF-cycle filler in front, as in real
+    outputs) in the layout extract.discover_points expects; returns the output paths.
+    """
+    from extract import get_backend
+
+    backend = get_backend(software)
+    tree = os.path.join(root, backend.folder_suffix)
+    rng = np.random.default_rng(0)
+    filler = "".join(FILLER.format(i=i, d=1e-3 / (i + 1), r=1e-4 / (i + 1)) for i in range(filler_lines))
+    paths = []
+    side = int(np.ceil(np.sqrt(n_files)))
+    for k in range(n_files):
+        r12, r23 = 0.5 + 0.05 * (k // side), 0.5 + 0.05 * (k % side)
+        point_dir = os.path.join(tree, f"Ne{r12:.2f},H{r23:.2f}")
+        os.makedirs(point_dir, exist_ok=True)
+        energy, _ = analytic_pes(r12, r23)
+        path = backend.output_path(point_dir)
+        with open(path, "w") as f:
+            f.write(filler + FAKE_OUTPUTS[software](energy - 128.0, rng.normal(0.0, 0.01, 3)))
+        paths.append(path)
+    return paths
+
+
+# ---------- Timing helpers ----------
+def _sync(device):
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+
+
+def _per_call(fn, device, min_time=0.2, repeat=3):
+    """
+    Median seconds per call over `repeat` rounds, each looping until `min_time` has passed (after one warm-up).
+    """
+    fn()
+    _sync(device)
+    rounds = []
+    for _ in range(repeat):
+        calls, start = 0, time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            _sync(device)
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        rounds.append(elapsed / calls)
+    return statistics.median(rounds)
+
+
+@contextlib.contextmanager
+def _chdir(path):
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+def _metric(value, unit, **details):
+    return {"value": float(value), "unit": unit, **details}
+
+
+# ---------- Benchmarks ----------
+def bench_train(ctx):
+    """train.train epochs in every training mode, in training samples per second."""
+    import torch.utils.tensorboard  # noqa: F401  (import cost is not part of an epoch)
+    from data_loader import load_data
+    from loss import CustomLoss
+    from train import train, build_optimizer
+
+    results = {}
+    for mode, epochs in TRAIN_EPOCHS.items():
+        cfg = {**ctx["cfg"], "training_mode": mode}
+        torch.manual_seed(0)
+        loader, data = load_data(ctx["csv"], batch_size=cfg["batch_size"] if mode == "batch" else 1)
+        model = fitted_model(cfg, ctx["data"], ctx["device"], steps=0).train()
+        optimizer, scheduler = build_optimizer(model, cfg)
+        start = time.perf_counter()
+        result = train(model, loader, CustomLoss(), optimizer, scheduler, os.path.join(ctx["work"], "bench.pth"),
+                       data, cfg["weight"], trainname="bench", epochs=epochs, patience=epochs + 1, mode=mode,
+                       eval_every=0, progress=False)
+        seconds = time.perf_counter() - start
+        samples = len(data) * result["epochs_run"]
+        results[f"train.{mode}"] = _metric(samples / seconds, "samples/s", epochs=result["epochs_run"],
+                                           seconds=seconds)
+    return results
+
+
+def bench_model(ctx):
+    """NeuralNetwork energy and fused energy+gradient passes, in points per second versus batch size."""
+    model, device = ctx["model"], ctx["device"]
+    generator = torch.Generator().manual_seed(0)
+    results = {}
+    for batch_size in BATCH_SIZES:
+        x = (0.5 + 3.5 * torch.rand(batch_size, 2, generator=generator)).to(device)
+
+        def energy():
+            with torch.no_grad():
+                model(x)
+
+        def energy_and_forces():
+            with torch.no_grad():
+                model.energy_and_gradient(x)
+
+        for name, fn in (("energy", energy), ("energy_forces", energy_and_forces)):
+            seconds = _per_call(fn, device, ctx["min_time"], ctx["repeat"])
+            results[f"model.{name}[{batch_size}]"] = _metric(batch_size / seconds, "points/s", batch_size=batch_size)
+    return results
+
+
+def bench_md(ctx):
+    """molecular_simulation.run_simulation end to end (integration, CSV/XYZ/.trj output, plots), in MD steps per second."""
+    from molecular_simulation import run_simulation
+
+    results = {}
+    for integrator in ("euler", "velocity-verlet"):
+        start = time.perf_counter()
+        out = run_simulation(ctx["config_name"], ctx["model_dir"], steps=ctx["md_steps"], integrator=integrator)
+        seconds = time.perf_counter() - start
+        steps = len(pd.read_csv(out["csv_path"])) - 1       # integrated steps, a trajectory may leave the domain
+        results[f"md.{integrator}"] = _metric(steps / seconds, "steps/s", steps=steps, seconds=seconds)
+    return results
+
+
+def bench_visualize(ctx):
+    """utils.visualize_model, plus the 1000x1000 grid evaluation it performs, in grid points per second."""
+    from pes_evaluator import PESEvaluator
+    from utils import visualize_model
+
+    model, device = ctx["model"], ctx["device"]
+    evaluator = PESEvaluator(model)
+    seconds = _per_call(lambda: evaluator.grid((0.5, 4.0), (0.5, 4.0), 1000), device, ctx["min_time"], ctx["repeat"])
+    paths = [os.path.join(ctx["work"], name) for name in ("3d.png", "contour.png", "fit.png")]
+    start = time.perf_counter()
+    visualize_model(model, ctx["data"], *paths)
+    total = time.perf_counter() - start
+    return {
+        "visualize.grid": _metric(1000 * 1000 / seconds, "points/s"),
+        "visualize.visualize_model": _metric(total, "s"),
+    }
+
+
+def bench_minima(ctx):
+    """minimumCheck.global_search_min, in starting points per second."""
+    from minimumCheck import global_search_min, seed_count
+
+    device = ctx["device"]
+    x_bounds = torch.tensor([0.5, 4.0], device=device)
+    y_bounds = torch.tensor([0.5, 4.0], device=device)
+    torch.manual_seed(0)
+    start = time.perf_counter()
+    result = global_search_min(ctx["model"], x_bounds, y_bounds, n_starts=seed_count, device=device)
+    seconds = time.perf_counter() - start
+    return {"minima.global_search_min": _metric(seed_count / seconds, "starts/s", seconds=seconds,
+                                                minima=len(result["minima"]))}
+
+
+def bench_readers(ctx):
+    """run-big readers (extract.extract_results) on fake outputs, serial and process pool, in files per second."""
+    from extract import extract_results
+
+    results = {}
+    for software in SOFTWARES:
+        paths = fake_outputs(os.path.join(ctx["work"], "run-big"), software, ctx["files"], ctx["filler_lines"])
+        megabytes = sum(os.path.getsize(p) for p in paths) / 1e6
+        for label, workers in (("serial", 1), ("pool", None)):
+            start = time.perf_counter()
+            parsed = extract_results(software, paths, workers=workers)
+            seconds = time.perf_counter() - start
+            if any(r[0] is None or r[1] is None for r in parsed):
+                raise RuntimeError(f"fake {software} outputs no longer parse, update FAKE_OUTPUTS")
+            results[f"readers.{software}.{label}"] = _metric(len(paths) / seconds, "files/s",
+                                                             mb_per_s=megabytes / seconds)
+    return results
+
+
+RUNNERS = {
+    "train": bench_train,
+    "model": bench_model,
+    "md": bench_md,
+    "visualize": bench_visualize,
+    "minima": bench_minima,
+    "readers": bench_readers,
+}
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(only=BENCHMARKS, grid=36, md_steps=2000, files=200, filler_lines=2000, min_time=0.2, repeat=3,
+        workdir=None):
+    """
+    Returns:
+        dict: {"commit", "python", "torch", "device", ..., "results": {name: {"value", "unit", ...}}}
+    """
+    from config import get_config, DEFAULT_CONFIG_NAME
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    report = {"commit": _git_commit(), "python": platform.python_version(), "torch": torch.__version__,
+              "device": str(device), "threads": torch.get_num_threads(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "params": {"grid": grid, "md_steps": md_steps, "files": files, "filler_lines": filler_lines},
+              "results": {}}
+    with contextlib.ExitStack() as stack:
+        work = workdir or stack.enter_context(tempfile.TemporaryDirectory(prefix="pes-bench-"))
+        os.makedirs(work, exist_ok=True)
+        stack.enter_context(_chdir(work))      # TensorBoard logs/ and other relative outputs stay in the scratch dir
+        cfg = get_config(DEFAULT_CONFIG_NAME)
+        data = synthetic_dataset(grid)
+        csv_path = os.path.join(work, "synthetic_pes.csv")
+        data.to_csv(csv_path, index=False)
+        torch.manual_seed(0)
+        model = fitted_model(cfg, data, device)
+        model_dir = os.path.join(work, DEFAULT_CONFIG_NAME)
+        os.makedirs(model_dir, exist_ok=True)
+        torch.save(model.state_dict(), os.path.join(model_dir, cfg["save_model_path"]))
+        ctx = {"cfg": cfg, "config_name": DEFAULT_CONFIG_NAME, "data": data, "csv": csv_path, "model": model,
+               "model_dir": model_dir, "device": device, "work": work, "md_steps": md_steps, "files": files,
+               "filler_lines": filler_lines, "min_time": min_time, "repeat": repeat}
+        for name in only:
+            print(f"[{name}] {RUNNERS[name].__doc__}")
+            for key, metric in RUNNERS[name](ctx).items():
+                report["results"][key] = metric
+                print(f"  {key:36s} {metric['value']:14.4g} {metric['unit']}")
+    return report
+
+
+def compare(old, new):
+    """
+    Print new vs old for every metric present in both reports; > 1 means faster.
+    """
+    print(f"Compared with {old.get('commit') or 'previous run'} ({old.get('timestamp', '?')}):")
+    for key, metric in new["results"].items():
+        before = old.get("results", {}).get(key)
+        if before is None or before["unit"] != metric["unit"] or not before["value"] or not metric["value"]:
+            continue
+        # throughputs: higher is better; plain seconds: lower is better
+        speedup = before["value"] / metric["value"] if metric["unit"] == "s" else metric["value"] / before["value"]
+        print(f"  {key:36s} {before['value']:12.4g} -> {metric['value']:12.4g} {metric['unit']:10s} x{speedup:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PES training, inference, MD and parsing hot paths")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("--grid", type=int, default=36, help="Synthetic dataset points per axis")
+    parser.add_argument("--md-steps", type=int, default=2000, help="Steps per run_simulation call")
+    parser.add_argument("--files", type=int, default=200, help="Fake output files per code")
+    parser.add_argument("--filler-lines", type=int, default=2000, help="SCF-cycle lines in front of each fake output")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per timing round of the short benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing rounds (median is reported)")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads for torch (default: torch's choice)")
+    parser.add_argument("--workdir", default=None, help="Keep the synthetic inputs and outputs here (default: temp dir)")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="Earlier --json results to compare against")
+    args = parser.parse_args(argv)
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    report = run(args.only, args.grid, args.md_steps, args.files, args.filler_lines, args.min_time, args.repeat,
+                 os.path.abspath(args.workdir) if args.workdir else None)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Start-up time of the main.py CLI and of the project modules.
+
+Every measurement runs in a fresh interpreter (that is what a job script pays per call) and reports the
+median wall time over --repeat runs, plus which heavy packages the import pulled in, so a module that starts
+importing torch or matplotlib at top level again shows up immediately.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 10 --json import_time.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_PACKAGES = ("torch", "pandas", "sklearn", "matplotlib", "tensorboard", "tqdm", "scipy")
+COMMANDS = {
+    "main.py list-configs": ["main.py", "list-configs"],
+    "main.py --help": ["main.py", "--help"],
+    "main.py simulate --help": ["main.py", "simulate", "--help"],
+}
+MODULES = ("config", "numpy_pes", "dataset_io", "model", "pes_evaluator", "utils", "train",
+           "molecular_simulation", "active_learning")
+
+
+def _time_process(argv, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + argv, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def _heavy_imports(module):
+    code = (f"import sys, json; import {module}; "
+            f"print(json.dumps([m for m in {HEAVY_PACKAGES!r} if m in sys.modules]))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run(repeat=5):
+    """
+    Returns:
+        dict: {"interpreter_s": ..., "commands": {name: seconds}, "modules": {name: {"seconds", "heavy"}}}
+    """
+    results = {"python": sys.version.split()[0], "repeat": repeat,
+               "interpreter_s": _time_process(["-c", "pass"], repeat), "commands": {}, "modules": {}}
+    for name, argv in COMMANDS.items():
+        results["commands"][name] = _time_process(argv, repeat)
+    for module in MODULES:
+        results["modules"][module] = {"seconds": _time_process(["-c", f"import {module}"], repeat),
+                                      "heavy": _heavy_imports(module)}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure CLI and module import times")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    print(f"Bare interpreter: {results['interpreter_s'] * 1000:.0f} ms")
+    for name, seconds in results["commands"].items():
+        print(f"{name:32s} {seconds * 1000:8.0f} ms")
+    for module, entry in results["modules"].items():
+        heavy = ", ".join(entry["heavy"]) or "-"
+        print(f"import {module:25s} {entry['seconds'] * 1000:8.0f} ms   {heavy}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Checkpointing for training runs.
+
+Checkpoint manager: the training loop hands over in-memory snapshots (best weights whenever the loss improves,
+full resumable state every epoch) and a background thread writes them at a bounded rate, each atomically through a
+temporary file and a rename, so neither a slow disk nor a kill in the middle of a write can stall or corrupt a run.
+"""
+
+import os
+import threading
+import time
+import torch
+
+RESUME_SUFFIX = ".resume.pt"
+
+
+def resume_path(model_path: str) -> str:
+    """
+    Path of the resumable state that belongs to a weights file ("2-64/2-64.pth" -> "2-64/2-64.resume.pt").
+    """
+    return os.path.splitext(model_path)[0] + RESUME_SUFFIX
+
+
+def _snapshot(obj):
+    """
+    Copy of a (nested) state dict whose tensors no longer change with the live model or optimizer.
+    """
+    if torch.is_tensor(obj):
+        return obj.detach().clone()
+    if isinstance(obj, dict):
+        return {k: _snapshot(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_snapshot(v) for v in obj)
+    return obj
+
+
+def _to_cpu(obj):
+    if torch.is_tensor(obj):
+        return obj.cpu()
+    if isinstance(obj, dict):
+        return {k: _to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_to_cpu(v) for v in obj)
+    return obj
+
+
+def atomic_save(obj, path: str):
+    """
+    torch.save to a temporary file in the same directory, fsync, then rename over `path`.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        torch.save(_to_cpu(obj), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CheckpointManager:
+    """
+    Background, throttled writer of best weights and resumable training state.
+
+    update_best() and save_state() only take device-side snapshots; a writer thread saves the newest snapshot
+    of each file at most once every `min_interval` seconds (older, unwritten snapshots are simply replaced).
+    save_latest_state() forces out the last resumable snapshot, e.g. when a run is interrupted mid-epoch.
+    flush() blocks until everything submitted is on disk.
+
+    Args:
+        path (str): best-weights file, a plain state dict as before (utils.load_model reads it)
+        state_path (str): resumable state file, default resume_path(path)
+        min_interval (float): minimum seconds between two writes of the same file
+    """
+
+    def __init__(self, path: str, state_path: str = None, min_interval: float = 10.0):
+        self.path = path
+        self.state_path = state_path or resume_path(path)
+        self.min_interval = float(min_interval)
+        self.best_state = None
+        self.latest_state = None
+        self._latest_submitted = True
+        self.writes = 0
+        self._pending = {}
+        self._last_write = {}
+        self._last_state = float("-inf")
+        self._writing = False
+        self._flushing = False
+        self._closed = False
+        self._error = None
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    # ---------- Producer side (training loop) ----------
+    def update_best(self, model):
+        """
+        Remember the current weights as the best ones and schedule writing them to `path`.
+        """
+        self.best_state = _snapshot(model.state_dict())
+        self._submit(self.path, self.best_state)
+
+    def state_due(self) -> bool:
+        return time.monotonic() - self._last_state >= self.min_interval
+
+    def save_state(self, state, force: bool = False) -> bool:
+        """
+        Snapshot a resumable state (call it at a consistent point, e.g. the end of an epoch) and schedule
+        writing it when the interval has passed (or `force`).
+
+        Args:
+            state (dict | callable): state dict, or a function returning it
+
+        Returns:
+            bool: whether the snapshot was scheduled for writing
+        """
+        state = state() if callable(state) else state
+        self.latest_state = {**_snapshot(state), "best_model": self.best_state}
+        self._latest_submitted = False
+        if not force and not self.state_due():
+            return False
+        return self.save_latest_state()
+
+    def save_latest_state(self) -> bool:
+        """
+        Schedule writing the last snapshot taken by save_state() unless it was already scheduled.
+
+        Returns:
+            bool: whether anything was scheduled
+        """
+        if self.latest_state is None or self._latest_submitted:
+            return False
+        self._last_state = time.monotonic()
+        self._latest_submitted = True
+        self._submit(self.state_path, self.latest_state)
+        return True
+
+    def load_state(self, map_location=None):
+        """
+        Resumable state written by an earlier run, or None if there is none. Restores `best_state` as well.
+
+        The two files are throttled independently, so a run killed in between can leave `path` older than the
+        best weights inside the state; those are scheduled for writing again.
+        """
+        if not os.path.exists(self.state_path):
+            return None
+        state = torch.load(self.state_path, map_location=map_location)
+        self.best_state = state.get("best_model")
+        if self.best_state is not None:
+            self._submit(self.path, self.best_state)
+        return state
+
+    def _submit(self, path, payload):
+        with self._cond:
+            self._raise_error()
+            if self._closed:
+                raise RuntimeError("CheckpointManager is closed")
+            self._pending[path] = payload
+            self._cond.notify_all()
+
+    # ---------- Writer thread ----------
+    def _next_ready(self):
+        """
+        (path, wait seconds) of the pending file that may be written soonest.
+        """
+        now = time.monotonic()
+        best = None
+        for path in self._pending:
+            wait = 0.0 if self._flushing else self._last_write.get(path, float("-inf")) + self.min_interval - now
+            if best is None or wait < best[1]:
+                best = (path, wait)
+        return best
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    ready = self._next_ready()
+                    if ready is None and self._closed:
+                        return
+                    if ready is not None and ready[1] <= 0:
+                        path = ready[0]
+                        payload = self._pending.pop(path)
+                        self._writing = True
+                        break
+                    self._cond.wait(None if ready is None else ready[1])
+            try:
+                atomic_save(payload, path)
+            except Exception as error:     # surfaced to the training loop on the next call
+                self._error = error
+            with self._cond:
+                self._writing = False
+                self._last_write[path] = time.monotonic()
+                self.writes += 1
+                self._cond.notify_all()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError(f"Writing a checkpoint failed: {error}") from error
+
+    def flush(self):
+        """
+        Write everything pending now and wait for it.
+        """
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+            while self._pending or self._writing:
+                self._cond.wait()
+            self._flushing = False
+        self._raise_error()
+
+    def close(self):
+        """
+        Flush and stop the writer thread.
+        """
+        if self._closed:
+            return
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
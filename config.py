@@ -6,6 +6,14 @@ Configuration registry: centrally manage different model configurations and prov
 
 DEFAULT_CONFIG_NAME = "2-64"  # Default config name / default config name
 
+# Choices of string-valued options. They live here, next to the defaults, so the CLI can build its
+# argument parser without importing torch; the implementing modules import them from this file.
+TRAINING_MODES = ("sample", "batch", "full")          # train.train
+OPTIMIZERS = ("adam", "lbfgs")                        # train.build_optimizer
+INTEGRATOR_NAMES = ("euler", "velocity-verlet", "leapfrog")   # molecular_simulation.INTEGRATORS
+AL_STRATEGIES = ("disagreement", "gradient", "combined")      # active_learning acquisition functions
+SOFTWARE_ORACLES = ("gaussian", "qe", "cp2k")                 # active_learning input generators
+
 
 def list_config_names():
     """
@@ -33,6 +41,24 @@ def get_config(config_name):
         "scheduler_mode": "min",
         "scheduler_patience": 10,
         "scheduler_factor": 0.67,
+        # "sample" reproduces the original one-sample-per-step loop,
+        # "batch" trains on mini-batches of `batch_size` rows,
+        # "full" keeps the whole dataset on the device and takes one step per epoch
+        "training_mode": "sample",
+        "batch_size": 256,
+        # "adam" (with ReduceLROnPlateau) or "lbfgs" (strong-Wolfe line search)
+        "optimizer": "adam",
+        "lbfgs_lr": 1.0,
+        "lbfgs_max_iter": 20,
+        "lbfgs_history_size": 100,
+        # epochs between full-dataset R^2/MAE/max-error evaluations (0 disables)
+        "eval_every": 10,
+        # minimum seconds between background writes of the best weights / resumable state
+        "checkpoint_interval": 10.0,
+        # active learning: ensemble size, full-batch Adam steps per member, points requested per round
+        "al_members": 5,
+        "al_epochs": 1500,
+        "al_batch_size": 64,
     }
 
     specific_config = _MODEL_CONFIGS[config_name]
@@ -1,31 +1,45 @@
 """
 Data loading helpers.
 
-Data loading utilities: read from CSV and build PyTorch DataLoader.
+Data loading utilities: read from CSV (or the binary `.npy` format) and build PyTorch DataLoader.
 """
 
-import pandas as pd
-from torch.utils.data import TensorDataset, DataLoader
+from dataset_io import read_table
+from torch.utils.data import TensorDataset, DataLoader, BatchSampler, RandomSampler, SequentialSampler
 import torch
 
-def load_data(file_path, shuffle=True):
+def load_data(file_path, shuffle=True, batch_size=1):
     """
-    Load training data from CSV into a DataLoader.
+    Load training data from CSV or a binary `.npy` dataset into a DataLoader.
 
-    Load training data from CSV and build DataLoader.
+    Load training data from CSV / memory-mapped `.npy` and build DataLoader.
 
     The CSV is expected to contain columns: x, y, z1, z2, z3, z4.
     Expected CSV columns: x, y, z1, z2, z3, z4.
+
+    With batch_size > 1 the loader yields whole index batches sliced straight
+    from the tensors instead of collating rows one by one.
     """
-    data = pd.read_csv(file_path)
+    data = read_table(file_path)
     X = data[['x', 'y']]
     y = data[['z1','z2','z3','z4']]
-    # Convert to torch tensors
-    X_train = torch.tensor(X.to_numpy(), dtype=torch.float32, requires_grad=True)
+    # Convert to torch tensors; no requires_grad here, the training loops ask for input gradients on
+    # their own copies, so backward passes never scatter into a gradient of the whole dataset
+    X_train = torch.tensor(X.to_numpy(), dtype=torch.float32)
     y_train = torch.tensor(y.to_numpy(), dtype=torch.float32)
     train_data = TensorDataset(X_train, y_train)
-    # Return one sample at a time (no batching concept)
-    train_loader = DataLoader(train_data, shuffle=shuffle)
+    batch_size = int(batch_size)
+    if batch_size <= 1:
+        # Return one sample at a time (no batching concept)
+        train_loader = DataLoader(train_data, shuffle=shuffle)
+    else:
+        # TensorDataset supports list indexing, so each batch is a single gather
+        sampler = RandomSampler(train_data) if shuffle else SequentialSampler(train_data)
+        train_loader = DataLoader(
+            train_data,
+            sampler=BatchSampler(sampler, batch_size=batch_size, drop_last=False),
+            batch_size=None,
+        )
 
     return train_loader, data
-    
+
@@ -0,0 +1,153 @@
+"""
+Binary PES dataset format.
+
+Binary PES dataset: a raw float32/float64 `.npy` matrix (columns x, y, z1..z4) next to a small JSON header
+describing atoms, units and grid spacing. The `.npy` is opened with np.memmap, so loading is O(1) and
+several processes (training, GUI) share the same page-cache pages instead of each parsing the CSV.
+"""
+
+import json
+import os
+import numpy as np
+import pandas as pd
+
+DATA_COLUMNS = ["x", "y", "z1", "z2", "z3", "z4"]
+DEFAULT_UNITS = {
+    "x": "angstrom",
+    "y": "angstrom",
+    "z1": "hartree",
+    "z2": "hartree/bohr",
+    "z3": "hartree/bohr",
+    "z4": "hartree/bohr",
+}
+FORMAT_NAME = "pes-dataset"
+FORMAT_VERSION = 1
+BINARY_SUFFIX = ".npy"
+
+
+def header_path(npy_path: str) -> str:
+    """
+    Path of the JSON header belonging to a `.npy` dataset.
+    """
+    return os.path.splitext(npy_path)[0] + ".json"
+
+
+def is_binary_dataset(path: str) -> bool:
+    """
+    Whether `path` points to a binary dataset rather than a CSV.
+    """
+    return str(path).lower().endswith(BINARY_SUFFIX)
+
+
+def _infer_grid_spacing(values):
+    """
+    Smallest positive spacing between distinct coordinate values, or None.
+    """
+    unique = np.unique(np.round(np.asarray(values, dtype=np.float64), 6))
+    if unique.size < 2:
+        return None
+    return float(np.round(np.diff(unique).min(), 6))
+
+
+def save_dataset(df, out_path: str, dtype: str = "float32", atoms=None, units=None, grid_spacing=None):
+    """
+    Write a DataFrame with x, y, z1..z4 columns as `.npy` + JSON header.
+
+    Args:
+        df (pd.DataFrame): dataset with at least the x, y, z1 columns
+        out_path (str): target `.npy` path
+        dtype (str): "float32" or "float64"
+        atoms (list[str]): atom types, e.g. ["H", "H", "Ne"]
+        units (dict): per-column units, defaults to DEFAULT_UNITS
+        grid_spacing (float): grid step in Angstrom, inferred from x/y when omitted
+
+    Returns:
+        str: the `.npy` path
+    """
+    if dtype not in ("float32", "float64"):
+        raise ValueError(f"Unsupported dtype: {dtype}")
+    columns = [c for c in DATA_COLUMNS if c in df.columns]
+    if columns[:3] != DATA_COLUMNS[:3]:
+        raise ValueError(f"Dataset needs at least columns {DATA_COLUMNS[:3]}, got {list(df.columns)}")
+    array = np.ascontiguousarray(df[columns].to_numpy(dtype=dtype))
+    if grid_spacing is None:
+        spacings = [s for s in (_infer_grid_spacing(df["x"]), _infer_grid_spacing(df["y"])) if s]
+        grid_spacing = min(spacings) if spacings else None
+
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    np.save(out_path, array)
+    header = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "columns": columns,
+        "dtype": dtype,
+        "shape": list(array.shape),
+        "atoms": list(atoms) if atoms else None,
+        "units": {c: (units or DEFAULT_UNITS).get(c) for c in columns},
+        "grid_spacing": grid_spacing,
+    }
+    with open(header_path(out_path), "w") as f:
+        json.dump(header, f, indent=2)
+    return out_path
+
+
+def convert_csv(csv_path: str, out_path: str = None, dtype: str = "float32", atoms=None, units=None,
+                grid_spacing=None):
+    """
+    Convert an x, y, z1..z4 CSV into the binary format.
+
+    The output defaults to the CSV path with a `.npy` suffix.
+    """
+    if out_path is None:
+        out_path = os.path.splitext(csv_path)[0] + BINARY_SUFFIX
+    df = pd.read_csv(csv_path)
+    return save_dataset(df, out_path, dtype=dtype, atoms=atoms, units=units, grid_spacing=grid_spacing)
+
+
+def read_header(npy_path: str):
+    """
+    Read the JSON header of a binary dataset.
+
+    A missing header falls back to the default column layout.
+    """
+    path = header_path(npy_path)
+    if not os.path.exists(path):
+        return {"format": FORMAT_NAME, "version": FORMAT_VERSION, "columns": None,
+                "atoms": None, "units": dict(DEFAULT_UNITS), "grid_spacing": None}
+    with open(path) as f:
+        header = json.load(f)
+    if header.get("format") != FORMAT_NAME:
+        raise ValueError(f"{path} is not a {FORMAT_NAME} header")
+    if header.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"{path} has unsupported version {header['version']}")
+    return header
+
+
+def load_array(npy_path: str, mmap: bool = True):
+    """
+    Open a binary dataset.
+
+    Returns:
+        tuple: (array, header) where array is a read-only np.memmap when `mmap` is True
+    """
+    array = np.load(npy_path, mmap_mode="r" if mmap else None)
+    header = read_header(npy_path)
+    if header.get("columns") is None:
+        header["columns"] = DATA_COLUMNS[:array.shape[1]]
+    if len(header["columns"]) != array.shape[1]:
+        raise ValueError(f"{npy_path}: header lists {len(header['columns'])} columns, array has {array.shape[1]}")
+    return array, header
+
+
+def read_table(path: str) -> pd.DataFrame:
+    """
+    Read a PES dataset as a DataFrame, from either CSV or the binary format.
+
+    Binary datasets are wrapped without copying the memory-mapped array.
+    """
+    if not is_binary_dataset(path):
+        return pd.read_csv(path)
+    array, header = load_array(path)
+    return pd.DataFrame(array, columns=header["columns"], copy=False)
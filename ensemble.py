@@ -0,0 +1,227 @@
+"""
+Vectorized ensembles of PES networks.
+
+Vectorized ensemble: K NeuralNetworks of the same architecture (different random initialisations) are stacked into
+one set of (K, ...) parameters and trained together with torch.func.functional_call + vmap on the same batches, so
+K small networks cost about as much as one wider network. The ensemble mean is the prediction and the spread
+across members the uncertainty estimate.
+"""
+
+import copy
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.func import functional_call, stack_module_state, vmap
+
+from loss import CustomLoss
+from model import NeuralNetwork, activation_and_derivative
+from train import forces_from_gradient
+
+
+class _EnergyAndGradient(nn.Module):
+    """
+    NeuralNetwork whose forward is energy_and_gradient, so functional_call can swap in each member's parameters.
+
+    Activations without an analytic derivative use torch.func.grad, which (unlike autograd.grad) works under vmap.
+    """
+
+    def __init__(self, net):
+        super().__init__()
+        self.net = net
+        self.analytic = activation_and_derivative(net.activation, torch.zeros(1)) is not None
+
+    def forward(self, x):
+        if self.analytic:
+            return self.net.energy_and_gradient(x)
+
+        def total(inputs):
+            output = self.net(inputs)
+            return output.sum(), output
+
+        gradient, output = torch.func.grad(total, has_aux=True)(x)
+        return output, gradient
+
+
+class VectorizedEnsemble:
+    """
+    K NeuralNetworks trained simultaneously on energies and forces.
+
+    Member i is initialised under torch.manual_seed(seed + i), exactly like a separately built model, and
+    since Adam updates every parameter element on its own, training the stacked members on the summed loss
+    gives each member the same updates it would get alone.
+
+    Args:
+        cfg (dict): model config (input_dim, hidden_dim, num_layers, output_dim, activation_function,
+            learning_rate, weight)
+        members (int): ensemble size K
+        device: torch device, defaults to CUDA when available
+        seed (int): base random seed
+        dropout_ratio (float): dropout of every member (sampled independently per member)
+    """
+
+    def __init__(self, cfg, members: int = 5, device=None, seed: int = 0, dropout_ratio: float = 0.0):
+        self.cfg = cfg
+        self.members = int(members)
+        self.device = torch.device(device) if device is not None else torch.device(
+            "cuda" if torch.cuda.is_available() else "cpu")
+        self.seed = seed
+        self.dropout_ratio = dropout_ratio
+        nets = []
+        for member in range(self.members):
+            torch.manual_seed(seed + member)
+            nets.append(_EnergyAndGradient(self._build()).to(self.device))
+        self.params, self.buffers = stack_module_state(nets)
+        self._base = copy.deepcopy(nets[0]).to("meta").eval()
+        self.energy_mean = 0.0
+        self.energy_scale = 1.0
+        self.history = None
+
+    def _build(self):
+        cfg = self.cfg
+        return NeuralNetwork(
+            cfg['input_dim'], cfg['hidden_dim'], cfg['num_layers'], cfg['output_dim'], cfg['activation_function'],
+            dropout_ratio=self.dropout_ratio,
+        )
+
+    def _member(self, params, buffers, x):
+        return functional_call(self._base, (params, buffers), (x,))
+
+    def _vmapped(self, x):
+        """
+        Standardised energies (K, N, output_dim) and gradients (K, N, input_dim) of all members.
+        """
+        return vmap(self._member, in_dims=(0, 0, None), randomness="different")(self.params, self.buffers, x)
+
+    def fit(self, X, energy, forces, epochs: int = 1500, lr: float = None, weight: float = None,
+            batch_size: int = None, standardize: bool = True, shuffle: bool = True):
+        """
+        Train all members with Adam on the same (mini-)batches.
+
+        Args:
+            X (array-like): (N, 2) inputs
+            energy (array-like): (N,) energies (z1)
+            forces (array-like): (N, 3) forces in dataset order (z2, z3, z4)
+            epochs (int): passes over the data
+            lr (float): Adam learning rate, default cfg['learning_rate']
+            weight (float): force term weight of CustomLoss, default cfg['weight']
+            batch_size (int): rows per step, None trains full-batch
+            standardize (bool): train on energies standardised to zero mean / unit variance (forces scaled alike)
+            shuffle (bool): reshuffle mini-batches every epoch
+
+        Returns:
+            VectorizedEnsemble: self; `history` holds the (epochs, K) per-member losses of the last batch
+        """
+        lr = self.cfg['learning_rate'] if lr is None else lr
+        weight = self.cfg['weight'] if weight is None else weight
+        energy = torch.tensor(np.asarray(energy), dtype=torch.float64).reshape(-1, 1)
+        forces = torch.tensor(np.asarray(forces), dtype=torch.float64)
+        if standardize:
+            self.energy_mean = float(energy.mean())
+            self.energy_scale = float(energy.std(unbiased=False)) or 1.0
+        X = torch.tensor(np.asarray(X), dtype=torch.float32, device=self.device)
+        energy = ((energy - self.energy_mean) / self.energy_scale).to(torch.float32).to(self.device)
+        forces = (forces / self.energy_scale).to(torch.float32).to(self.device)
+        criterion = CustomLoss()
+
+        def member_loss(params, buffers, xb, eb, fb):
+            output, gradient = self._member(params, buffers, xb)
+            return criterion(output, eb, forces_from_gradient(gradient), fb, weight)
+
+        batched_loss = vmap(member_loss, in_dims=(0, 0, None, None, None), randomness="different")
+        optimizer = torch.optim.Adam(self.params.values(), lr=lr)
+        n = X.shape[0]
+        batch_size = n if not batch_size else int(batch_size)
+        history = []
+        self._base.train()
+        for _ in range(int(epochs)):
+            order = torch.randperm(n, device=self.device) if shuffle and batch_size < n else None
+            for start in range(0, n, batch_size):
+                idx = order[start:start + batch_size] if order is not None else slice(start, start + batch_size)
+                optimizer.zero_grad(set_to_none=True)
+                losses = batched_loss(self.params, self.buffers, X[idx], energy[idx], forces[idx])
+                losses.sum().backward()
+                optimizer.step()
+            history.append(losses.detach())
+        self._base.eval()
+        # one host sync for the whole run
+        self.history = torch.stack(history).cpu().numpy() if history else np.empty((0, self.members))
+        return self
+
+    def energy_and_gradient(self, points, chunk_size: int = 65536):
+        """
+        Energies (K, N) and dE/d(r12, r23) (K, N, 2) of every member, in the units of the training data.
+        """
+        X = torch.as_tensor(np.asarray(points), dtype=torch.float32, device=self.device).reshape(-1, 2)
+        energies, gradients = [], []
+        with torch.no_grad():
+            for start in range(0, X.shape[0], chunk_size):
+                output, gradient = self._vmapped(X[start:start + chunk_size])
+                energies.append(output[..., 0])
+                gradients.append(gradient)
+        energies = torch.cat(energies, dim=1) * self.energy_scale + self.energy_mean
+        return energies, torch.cat(gradients, dim=1) * self.energy_scale
+
+    def predict(self, points, chunk_size: int = 65536):
+        """
+        Ensemble mean and variance (across members, unbiased) of energies and forces.
+
+        Returns:
+            dict: "energy_mean", "energy_var" of shape (N,), "forces_mean", "forces_var" of shape (N, 3),
+                forces ordered like the z2, z3, z4 labels
+        """
+        energies, gradients = self.energy_and_gradient(points, chunk_size)
+        forces = forces_from_gradient(gradients.reshape(-1, 2)).reshape(self.members, -1, 3)
+        return {
+            "energy_mean": energies.mean(0).cpu().numpy(),
+            "energy_var": energies.var(0).cpu().numpy(),
+            "forces_mean": forces.mean(0).cpu().numpy(),
+            "forces_var": forces.var(0).cpu().numpy(),
+        }
+
+    def member_models(self):
+        """
+        The members as separate NeuralNetworks in eval mode.
+
+        The energy standardisation is folded into each output layer, so the models predict energies in the
+        units of the training data like any other trained model (usable with simulate, neb, ...).
+        """
+        models = []
+        for member in range(self.members):
+            model = self._build().to(self.device)
+            state = {name[len("net."):]: value[member].detach().clone()
+                     for name, value in {**self.params, **self.buffers}.items()}
+            state["output_layer.weight"] *= self.energy_scale
+            state["output_layer.bias"] = state["output_layer.bias"] * self.energy_scale + self.energy_mean
+            model.load_state_dict(state)
+            models.append(model.eval())
+        return models
+
+    def save(self, path: str):
+        """
+        Write the stacked parameters, architecture and energy standardisation to one file.
+        """
+        torch.save({
+            "cfg": self.cfg,
+            "members": self.members,
+            "seed": self.seed,
+            "dropout_ratio": self.dropout_ratio,
+            "params": {k: v.detach().cpu() for k, v in self.params.items()},
+            "buffers": {k: v.cpu() for k, v in self.buffers.items()},
+            "energy_mean": self.energy_mean,
+            "energy_scale": self.energy_scale,
+        }, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str, device=None):
+        state = torch.load(path, map_location="cpu", weights_only=False)
+        ensemble = cls(state["cfg"], state["members"], device=device, seed=state["seed"],
+                       dropout_ratio=state["dropout_ratio"])
+        with torch.no_grad():
+            for name, value in state["params"].items():
+                ensemble.params[name].copy_(value)
+            for name, value in state["buffers"].items():
+                ensemble.buffers[name].copy_(value)
+        ensemble.energy_mean = state["energy_mean"]
+        ensemble.energy_scale = state["energy_scale"]
+        return ensemble
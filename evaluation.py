@@ -0,0 +1,102 @@
+"""
+On-device evaluation during training.
+
+Evaluation helpers: cache the evaluation set on the device once and compute R^2 / MAE / max error
+with torch reductions, optionally on a side CUDA stream so the host never waits for it.
+"""
+
+import torch
+
+
+def regression_metrics(y_true, y_pred):
+    """
+    Compute R^2, MAE and max absolute error as 0-dim tensors.
+
+    Reductions run in float64 on the tensors' device; nothing is copied to the host.
+    """
+    y_true = y_true.reshape(-1).double()
+    y_pred = y_pred.reshape(-1).double()
+    error = y_pred - y_true
+    ss_res = torch.sum(error ** 2)
+    ss_tot = torch.sum((y_true - y_true.mean()) ** 2)
+    return {
+        "r2": 1.0 - ss_res / ss_tot,
+        "mae": error.abs().mean(),
+        "max_error": error.abs().max(),
+    }
+
+
+class Evaluator:
+    """
+    Periodic full-dataset evaluation of a model on a device-resident copy of the data.
+
+    Results are kept as device tensors until `collect` is called, which is the only
+    place a host-device synchronisation happens.
+    """
+
+    def __init__(self, model, data, device, every: int = 10, use_stream: bool = True):
+        """
+        Args:
+            model: torch model to evaluate
+            data (pd.DataFrame): dataframe with x, y, z1 columns
+            device: torch device holding the model
+            every (int): evaluate every `every` epochs, 0 disables evaluation
+            use_stream (bool): run on a side CUDA stream when CUDA is available
+        """
+        self.model = model
+        self.device = torch.device(device)
+        self.every = int(every)
+        self.X = torch.tensor(data[['x', 'y']].to_numpy(), dtype=torch.float32, device=self.device)
+        self.y = torch.tensor(data['z1'].to_numpy(), dtype=torch.float32, device=self.device)
+        if use_stream and self.device.type == "cuda":
+            self.stream = torch.cuda.Stream(device=self.device)
+        else:
+            self.stream = None
+        self._pending = []
+
+    def due(self, epoch: int) -> bool:
+        """
+        Whether an evaluation should be scheduled after `epoch`.
+        """
+        return self.every > 0 and epoch % self.every == 0
+
+    @torch.no_grad()
+    def _evaluate(self):
+        was_training = self.model.training
+        self.model.eval()
+        metrics = regression_metrics(self.y, self.model(self.X))
+        if was_training:
+            self.model.train()
+        return metrics
+
+    def submit(self, epoch: int):
+        """
+        Enqueue an evaluation of the current weights without blocking the host.
+        """
+        if self.stream is None:
+            self._pending.append((epoch, self._evaluate()))
+            return
+        main_stream = torch.cuda.current_stream(self.device)
+        # The side stream must see the finished optimizer step, and the next step
+        # must not overwrite the weights before the evaluation has read them.
+        self.stream.wait_stream(main_stream)
+        with torch.cuda.stream(self.stream):
+            metrics = self._evaluate()
+        main_stream.wait_stream(self.stream)
+        self._pending.append((epoch, metrics))
+
+    def evaluate(self):
+        """
+        Evaluate immediately and return the metrics as Python floats.
+        """
+        return {k: float(v) for k, v in self._evaluate().items()}
+
+    def collect(self):
+        """
+        Return finished evaluations as a list of (epoch, {name: float}) and clear them.
+        """
+        if self.stream is not None:
+            self.stream.synchronize()
+        results = [(epoch, {k: float(v) for k, v in metrics.items()}) for epoch, metrics in self._pending]
+        self._pending = []
+        return results
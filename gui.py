@@ -2,6 +2,7 @@
 Streamlit-based GUI for PES workflows.
 
 Simple graphical interface based on Streamlit: training, visualization and molecular simulation.
+Runs are submitted to a background job manager (gui_jobs.py) and followed on the Jobs tab.
 """
 
 import os
@@ -13,13 +14,8 @@ import pandas as pd
 import streamlit as st
 import torch
 from config import get_config, list_config_names, DEFAULT_CONFIG_NAME
-from model import NeuralNetwork
-from data_loader import load_data
-from train import train
-from utils import visualize_model, accuracy, load_model, ensure_dir
-from loss import CustomLoss
-from torch.optim.lr_scheduler import ReduceLROnPlateau
-from molecular_simulation import run_simulation
+from utils import ensure_dir
+from gui_jobs import JobManager
 
 st.set_page_config(page_title="PES GUI", layout="wide")
 
@@ -44,11 +40,9 @@ TEXT = {
         "tab_sim": "分子模拟",
         "train_model": "训练模型",
         "dataset": "数据集",
-        "upload_train": "上传训练 CSV (包含列 x, y, z1..z4)",
+        "upload_train": "上传训练 CSV 或 .npy (包含列 x, y, z1..z4)",
         "input_train_path": "或指定训练数据路径",
         "start_train": "开始训练",
-        "loading_data": "加载数据中...",
-        "training": "训练中，请稍候...（可在 logs/ 下用 TensorBoard 查看进度）",
         "train_done": "训练完成，R2 = {r2}",
         "train_fail": "训练失败: {err}",
         "cap_fit": "真实-预测一致性",
@@ -64,7 +58,6 @@ TEXT = {
         "steps": "步数",
         "dt": "时间步长",
         "start_sim": "开始模拟",
-        "sim_running": "运行模拟中...",
         "sim_done": "模拟完成",
         "cap_md": "MD 等高线轨迹",
         "cap_energy": "总能量曲线",
@@ -86,6 +79,22 @@ TEXT = {
         "adv_settings": "高级设置（可选）",
         "override_model_dir": "手动覆盖模型目录",
         "override_model_file": "手动覆盖模型文件名（目录下）",
+
+        "tab_jobs": "任务",
+        "job_queued": "任务 {id} 已加入队列，可在'任务'页查看进度（也可在 logs/ 下用 TensorBoard 查看）",
+        "jobs_empty": "暂无任务",
+        "job_cancel": "取消",
+        "refresh": "刷新",
+        "job_epoch": "轮次 {epoch}/{epochs}，损失 {loss}",
+        "job_step": "步数 {step}/{steps}",
+        "job_phase": "阶段: {phase}",
+        "job_fail": "任务失败: {err}",
+        "status_pending": "排队中",
+        "status_running": "运行中",
+        "status_done": "已完成",
+        "status_failed": "失败",
+        "status_cancelled": "已取消",
+        "status_interrupted": "已中断（服务器重启）",
     },
     "en": {
         "title": "PES GUI",
@@ -106,11 +115,9 @@ TEXT = {
         "tab_sim": "Simulate",
         "train_model": "Train Model",
         "dataset": "Dataset",
-        "upload_train": "Upload training CSV (columns: x, y, z1..z4)",
+        "upload_train": "Upload training CSV or .npy (columns: x, y, z1..z4)",
         "input_train_path": "Or specify training data path",
         "start_train": "Start Training",
-        "loading_data": "Loading data...",
-        "training": "Training... (Use TensorBoard under logs/)",
         "train_done": "Training done, R2 = {r2}",
         "train_fail": "Training failed: {err}",
         "cap_fit": "True vs Predict",
@@ -126,7 +133,6 @@ TEXT = {
         "steps": "steps",
         "dt": "dt",
         "start_sim": "Start Simulation",
-        "sim_running": "Running simulation...",
         "sim_done": "Simulation finished",
         "cap_md": "MD Contour Path",
         "cap_energy": "Total Energy",
@@ -148,6 +154,22 @@ TEXT = {
         "adv_settings": "Advanced (optional)",
         "override_model_dir": "Override model directory",
         "override_model_file": "Override model filename (in directory)",
+
+        "tab_jobs": "Jobs",
+        "job_queued": "Job {id} queued, follow it on the Jobs tab (or with TensorBoard under logs/)",
+        "jobs_empty": "No jobs yet",
+        "job_cancel": "Cancel",
+        "refresh": "Refresh",
+        "job_epoch": "epoch {epoch}/{epochs}, loss {loss}",
+        "job_step": "step {step}/{steps}",
+        "job_phase": "phase: {phase}",
+        "job_fail": "Job failed: {err}",
+        "status_pending": "pending",
+        "status_running": "running",
+        "status_done": "done",
+        "status_failed": "failed",
+        "status_cancelled": "cancelled",
+        "status_interrupted": "interrupted (server restart)",
     },
 }
 
@@ -251,6 +273,83 @@ def ensure_latest_alias(model_dir: str, cfg_default_model_name: str, latest_mode
     except Exception:
         return None
 
+JOB_REFRESH_SECONDS = 2
+JOB_KIND_TABS = {"train": "tab_train", "visualize": "tab_vis", "simulate": "tab_sim"}
+
+@st.cache_resource
+def get_job_manager():
+    """
+    One job manager per server, shared by all sessions and kept across reruns.
+    """
+    return JobManager()
+
+jobs = get_job_manager()
+
+def job_progress(job, lang_code: str):
+    """
+    (fraction or None, text) describing a job's latest progress.
+    """
+    progress = job.get("progress", {})
+    if job["kind"] == "train" and progress.get("epochs"):
+        loss = progress.get("loss")
+        text = t(lang_code, "job_epoch").format(epoch=progress.get("epoch", 0), epochs=progress["epochs"],
+                                                loss=f"{loss:.4g}" if loss is not None else "-")
+        return min(1.0, progress.get("epoch", 0) / progress["epochs"]), text
+    if job["kind"] == "simulate" and progress.get("steps"):
+        text = t(lang_code, "job_step").format(step=progress.get("step", 0), steps=progress["steps"])
+        return min(1.0, progress.get("step", 0) / progress["steps"]), text
+    return None, t(lang_code, "job_phase").format(phase=progress.get("phase", "-"))
+
+def render_job_result(job, lang_code: str):
+    result = job.get("result") or {}
+    if job["kind"] == "train":
+        st.success(t(lang_code, "train_done").format(r2=f"{result['r2']:.6f}"))
+        captions = [t(lang_code, "cap_fit"), t(lang_code, "cap_3d"), t(lang_code, "cap_2d")]
+    elif job["kind"] == "visualize":
+        st.success(t(lang_code, "vis_done").format(r2=f"{result['r2']:.6f}"))
+        captions = [t(lang_code, "cap_fit"), t(lang_code, "cap_3d"), t(lang_code, "cap_2d")]
+    else:
+        st.success(t(lang_code, "sim_done"))
+        captions = [t(lang_code, "cap_md"), t(lang_code, "cap_energy")]
+    images = [p for p in result.get("images", []) if os.path.exists(p)]
+    if images:
+        st.image(images, caption=captions[:len(images)], use_container_width=True)
+    if job["kind"] == "simulate":
+        st.write(t(lang_code, "exports"))
+        st.write({k: v for k, v in result.items() if k != "images"})
+
+def render_jobs(lang_code: str):
+    """
+    Job list with live progress, cancel buttons and the results of finished jobs.
+    """
+    job_list = jobs.jobs()
+    if not job_list:
+        st.info(t(lang_code, "jobs_empty"))
+        return
+    for job in job_list:
+        status = job["status"]
+        with st.container(border=True):
+            c1, c2, c3 = st.columns([5, 2, 1])
+            c1.markdown(f"**{job['label']}** · {t(lang_code, JOB_KIND_TABS[job['kind']])} · `{job['id']}`")
+            c2.write(t(lang_code, f"status_{status}"))
+            if status in ("pending", "running") and c3.button(t(lang_code, "job_cancel"), key=f"cancel-{job['id']}"):
+                jobs.cancel(job["id"])
+            if status == "running":
+                fraction, text = job_progress(job, lang_code)
+                if fraction is None:
+                    st.caption(text)
+                else:
+                    st.progress(fraction, text=text)
+            elif status == "done":
+                with st.expander(job["label"]):
+                    render_job_result(job, lang_code)
+            elif status == "failed":
+                st.error(t(lang_code, "job_fail").format(err=job.get("error", "")))
+
+# Streamlit >= 1.37 re-renders the job list on a timer; older versions refresh on interaction
+if hasattr(st, "fragment"):
+    render_jobs = st.fragment(run_every=JOB_REFRESH_SECONDS)(render_jobs)
+
 with st.sidebar:
     # language selection / Language selection
     lang_label = t("zh", "language")  # label itself bilingual
@@ -295,7 +394,9 @@ with st.sidebar:
 
 st.title(t(lang_code, "title"))
 
-TAB_TRAIN, TAB_VIS, TAB_SIM = st.tabs([t(lang_code, "tab_train"), t(lang_code, "tab_vis"), t(lang_code, "tab_sim")])
+TAB_TRAIN, TAB_VIS, TAB_SIM, TAB_JOBS = st.tabs(
+    [t(lang_code, "tab_train"), t(lang_code, "tab_vis"), t(lang_code, "tab_sim"), t(lang_code, "tab_jobs")]
+)
 
 
 # =========================
@@ -322,7 +423,7 @@ with TAB_TRAIN:
     st.markdown("---")
 
     st.write(t(lang_code, "dataset"))
-    uploaded_train = st.file_uploader(t(lang_code, "upload_train"), type=["csv"], key="train_csv")
+    uploaded_train = st.file_uploader(t(lang_code, "upload_train"), type=["csv", "npy"], key="train_csv")
     default_data_path = cfg["train_data_path"]
     data_path_text = st.text_input(t(lang_code, "input_train_path"), value=default_data_path)
 
@@ -346,65 +447,19 @@ with TAB_TRAIN:
 
             # Training data path
             if uploaded_train is not None:
-                data_path = os.path.join(out_dir, "uploaded_train.csv")
+                data_path = os.path.join(out_dir, "uploaded_train" + os.path.splitext(uploaded_train.name)[1])
                 save_uploaded_to(data_path, uploaded_train)
             else:
                 data_path = data_path_text
 
-            save_model_path = f"{out_dir}/{cfg['save_model_path']}"
-            savepath = f"{out_dir}/{cfg['saveaxpath']}"
-            savepath2 = f"{out_dir}/{cfg['saveaxpath2']}"
-            saverocpath = f"{out_dir}/{cfg['assesspath']}"
-
-            # Data loading
-            with st.spinner(t(lang_code, "loading_data")):
-                train_loader, data = load_data(data_path)
-
-            # Build model
-            device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            model = NeuralNetwork(
-                cfg['input_dim'],
-                cfg['hidden_dim'],
-                cfg['num_layers'],
-                cfg['output_dim'],
-                cfg['activation_function']
-            ).to(device)
-
-            # Optimizer and scheduler
-            criterion = CustomLoss()
-            optimizer = torch.optim.Adam(model.parameters(), lr=cfg['learning_rate'])
-            scheduler = ReduceLROnPlateau(
-                optimizer,
-                cfg['scheduler_mode'],
-                patience=cfg['scheduler_patience'],
-                factor=cfg['scheduler_factor']
+            # Training, evaluation and plots run in a background job (Jobs tab)
+            job_id = jobs.submit(
+                "train",
+                {"cfg": cfg, "data_path": data_path, "out_dir": out_dir,
+                 "atoms": [atom1_type, atom2_type, atom3_type]},
+                label=out_dir,
             )
-
-            # Training
-            with st.spinner(t(lang_code, "training")):
-                train(
-                    model,
-                    train_loader,
-                    criterion,
-                    optimizer,
-                    scheduler,
-                    save_model_path,
-                    data,
-                    cfg['weight'],
-                    selected_config,
-                    epochs=cfg['epochs'],
-                    patience=cfg['patience'],
-                    min_delta=cfg['min_delta'],
-                )
-
-            # Evaluation and visualization
-            model = load_model(model, save_model_path)
-            visualize_model(model, data, savepath, savepath2, saverocpath, atom1_type, atom2_type, atom3_type)
-            r2 = accuracy(model, data)
-            st.success(t(lang_code, "train_done").format(r2=f"{r2:.6f}"))
-            st.image([saverocpath, savepath, savepath2],
-                     caption=[t(lang_code, "cap_fit"), t(lang_code, "cap_3d"), t(lang_code, "cap_2d")],
-                     use_container_width=True)
+            st.success(t(lang_code, "job_queued").format(id=job_id))
         except Exception as e:
             st.error(t(lang_code, "train_fail").format(err=e))
 
@@ -440,7 +495,7 @@ with TAB_VIS:
             auto_model_path = os.path.join(auto_dir, override_file.strip()) if auto_dir else None
 
     # data input
-    uploaded_vis = st.file_uploader(t(lang_code, "upload_vis"), type=["csv"], key="vis_csv")
+    uploaded_vis = st.file_uploader(t(lang_code, "upload_vis"), type=["csv", "npy"], key="vis_csv")
     data_path_text = st.text_input(t(lang_code, "input_data_path"),
                                    value=cfg["train_data_path"], key="vis_path")
 
@@ -460,25 +515,11 @@ with TAB_VIS:
 
                 # Data preparation
                 if uploaded_vis is not None:
-                    data_path = os.path.join(auto_dir, "uploaded_visualize.csv")
+                    data_path = os.path.join(auto_dir, "uploaded_visualize" + os.path.splitext(uploaded_vis.name)[1])
                     save_uploaded_to(data_path, uploaded_vis)
                 else:
                     data_path = data_path_text
 
-                device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-                model = NeuralNetwork(
-                    cfg['input_dim'],
-                    cfg['hidden_dim'],
-                    cfg['num_layers'],
-                    cfg['output_dim'],
-                    cfg['activation_function']
-                ).to(device)
-
-                # Directly use auto-selected .pth
-                model = load_model(model, auto_model_path)
-
-                _, data = load_data(data_path)
-
                 # Output image paths (overwrite/update visualization plots in this directory)
                 cfg["saveaxpath"] = f"{stem_no_ts}-3d.png"
                 cfg["saveaxpath2"] = f"{stem_no_ts}-2d.png"
@@ -487,12 +528,14 @@ with TAB_VIS:
                 savepath2 = os.path.join(auto_dir, cfg["saveaxpath2"])
                 saverocpath = os.path.join(auto_dir, cfg["assesspath"])
 
-                visualize_model(model, data, savepath, savepath2, saverocpath, atom1_type, atom2_type, atom3_type)
-                r2 = accuracy(model, data)
-                st.success(t(lang_code, "vis_done").format(r2=f"{r2:.6f}"))
-                st.image([saverocpath, savepath, savepath2],
-                         caption=[t(lang_code, "cap_fit"), t(lang_code, "cap_3d"), t(lang_code, "cap_2d")],
-                         use_container_width=True)
+                # Directly use auto-selected .pth; loading and plotting run in a background job
+                job_id = jobs.submit(
+                    "visualize",
+                    {"cfg": cfg, "model_path": auto_model_path, "data_path": data_path,
+                     "images": [saverocpath, savepath, savepath2], "atoms": [atom1_type, atom2_type, atom3_type]},
+                    label=f"{os.path.basename(auto_dir)} ({os.path.basename(data_path)})",
+                )
+                st.success(t(lang_code, "job_queued").format(id=job_id))
         except Exception as e:
             st.error(t(lang_code, "vis_fail").format(err=e))
 
@@ -545,21 +588,14 @@ with TAB_SIM:
             if not auto_dir or not auto_model_path or not os.path.exists(auto_model_path):
                 st.error(t(lang_code, "no_model_found"))
             else:
-                with st.spinner(t(lang_code, "sim_running")):
-                    # Compatible with run_simulation possibly using cfg['save_model_path']:
-                    default_model_name = get_config(selected_config).get("save_model_path", "model.pth")
-                    alias_path = ensure_latest_alias(auto_dir, default_model_name, auto_model_path)
-
-                    # Parse directory name to get structure (remove timestamp)
-                    dir_base = os.path.basename(auto_dir)
-                    stem_no_ts = TS_SUFFIX.sub("", dir_base)
-                    arch = parse_stem_to_arch(stem_no_ts)
-                    if arch:
-                        cfg["num_layers"] = arch["num_layers"]
-                        cfg["hidden_dim"] = arch["hidden_dim"]
-                        cfg["activation_function"] = arch["activation_function"]
-
-                    outputs = run_simulation(
+                # Compatible with run_simulation possibly using cfg['save_model_path']:
+                default_model_name = get_config(selected_config).get("save_model_path", "model.pth")
+                alias_path = ensure_latest_alias(auto_dir, default_model_name, auto_model_path)
+
+                # run_simulation reads the architecture from the directory name itself; the MD runs in a background job
+                job_id = jobs.submit(
+                    "simulate",
+                    {"kwargs": dict(
                         config_name=selected_config,
                         model_dir=auto_dir,  # Use auto-selected directory
                         steps=int(steps),
@@ -570,12 +606,17 @@ with TAB_SIM:
                         init_v1=float(v1),
                         init_v2=float(v2),
                         init_v3=float(v3),
-                    )
-                st.success(t(lang_code, "sim_done"))
-                st.image([outputs["md_plot"], outputs["energy_plot"]],
-                         caption=[t(lang_code, "cap_md"), t(lang_code, "cap_energy")],
-                         use_container_width=True)
-                st.write(t(lang_code, "exports"))
-                st.write(outputs)
+                    )},
+                    label=f"{os.path.basename(auto_dir)} ({int(steps)} steps)",
+                )
+                st.success(t(lang_code, "job_queued").format(id=job_id))
         except Exception as e:
             st.error(t(lang_code, "sim_fail").format(err=e))
+
+
+# =========================
+# TAB 4: JOBS
+# =========================
+with TAB_JOBS:
+    st.button(t(lang_code, "refresh"))
+    render_jobs(lang_code)
@@ -0,0 +1,290 @@
+"""
+Background jobs for the Streamlit GUI.
+
+GUI job manager: training, visualization and MD runs are queued as jobs and executed in spawned worker
+processes (at most `workers` at a time), so a long run neither freezes the page nor dies with a rerun. Every job
+has a persistent ID and a directory gui_jobs/<id>/ holding job.json (kind, parameters, status), progress.json
+(written by the worker: phase, epoch/loss or MD step) and result.json, so any session can list, follow and
+cancel the jobs, and finished results survive a server restart.
+"""
+
+import json
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from datetime import datetime
+
+JOB_KINDS = ("train", "visualize", "simulate")
+STATUSES = ("pending", "running", "done", "failed", "cancelled", "interrupted")
+FINISHED = ("done", "failed", "cancelled", "interrupted")
+JOB_FILE = "job.json"
+PROGRESS_FILE = "progress.json"
+RESULT_FILE = "result.json"
+
+
+def _write_json(path, obj):
+    """
+    Write JSON through a temporary file and a rename, so readers never see a half-written file.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class ProgressWriter:
+    """
+    Worker-side progress file, rewritten at most every `min_interval` seconds.
+    """
+
+    def __init__(self, path: str, min_interval: float = 0.5):
+        self.path = path
+        self.min_interval = float(min_interval)
+        self.state = {}
+        self._last = float("-inf")
+
+    def update(self, force: bool = False, **fields):
+        self.state.update(fields)
+        now = time.monotonic()
+        if force or now - self._last >= self.min_interval:
+            self._last = now
+            _write_json(self.path, {**self.state, "updated": time.time()})
+
+
+# ---------- Tasks (run in the worker process) ----------
+def _train_task(params, progress):
+    from train import train_from_config
+
+    cfg, out_dir = params["cfg"], params["out_dir"]
+    progress.update(force=True, phase="training", epoch=0, epochs=cfg["epochs"])
+
+    def on_epoch(epoch, metrics):
+        progress.update(epoch=epoch + 1, loss=metrics["loss"], best_loss=metrics["best_loss"], lr=metrics["lr"])
+
+    result = train_from_config(cfg, params["data_path"], out_dir, progress=False, on_epoch=on_epoch,
+                               atoms=params["atoms"], resume=params.get("resume", False))
+    images = [os.path.join(out_dir, cfg[key]) for key in ("assesspath", "saveaxpath", "saveaxpath2")]
+    return {"r2": result["r2"], "best_loss": result["best_loss"], "epochs_run": result["epochs_run"],
+            "model_path": result["model_path"], "images": images}
+
+
+def _visualize_task(params, progress):
+    import torch
+    from data_loader import load_data
+    from model import NeuralNetwork
+    from utils import visualize_model, accuracy, load_model
+
+    cfg = params["cfg"]
+    progress.update(force=True, phase="loading")
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = NeuralNetwork(
+        cfg['input_dim'], cfg['hidden_dim'], cfg['num_layers'], cfg['output_dim'], cfg['activation_function']
+    ).to(device)
+    model = load_model(model, params["model_path"])
+    _, data = load_data(params["data_path"])
+    progress.update(force=True, phase="plotting")
+    visualize_model(model, data, *params["images"][1:], params["images"][0], *params["atoms"])
+    progress.update(force=True, phase="evaluation")
+    return {"r2": float(accuracy(model, data)), "images": params["images"]}
+
+
+def _simulate_task(params, progress):
+    from molecular_simulation import run_simulation
+
+    steps = params["kwargs"]["steps"]
+    progress.update(force=True, phase="integration", step=0, steps=steps)
+    outputs = run_simulation(**params["kwargs"], on_progress=lambda step: progress.update(step=step))
+    progress.update(force=True, phase="done", step=steps)
+    return {**outputs, "images": [outputs["md_plot"], outputs["energy_plot"]]}
+
+
+TASKS = {"train": _train_task, "visualize": _visualize_task, "simulate": _simulate_task}
+
+
+def _job_main(job_dir, kind, params, threads):
+    """
+    Worker entry point: run one task and record its outcome in result.json, never raise.
+    """
+    # Cancellation sends SIGTERM; unwinding like Ctrl-C lets training write its resumable state
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    import torch
+
+    torch.set_num_threads(threads)
+    progress = ProgressWriter(os.path.join(job_dir, PROGRESS_FILE))
+    try:
+        outcome = {"status": "done", "result": TASKS[kind](params, progress)}
+    except KeyboardInterrupt:
+        outcome = {"status": "cancelled"}
+    except Exception:
+        outcome = {"status": "failed", "error": traceback.format_exc(limit=3).strip().splitlines()[-1]}
+    progress.update(force=True)
+    _write_json(os.path.join(job_dir, RESULT_FILE), {**outcome, "finished": time.time()})
+
+
+# ---------- Manager (GUI process) ----------
+class JobManager:
+    """
+    Queue of GUI jobs executed in at most `workers` spawned processes.
+
+    A watcher thread starts pending jobs as slots free up and records the outcome of finished ones. Jobs left
+    pending or running by an earlier server are marked "interrupted" when the manager starts.
+
+    Args:
+        root (str): directory holding one sub-directory per job
+        workers (int): concurrent jobs
+        threads (int): torch threads per job, default cores / workers
+        poll_interval (float): seconds between checks of the worker processes
+    """
+
+    def __init__(self, root: str = "gui_jobs", workers: int = 2, threads: int = None, poll_interval: float = 0.5):
+        self.root = root
+        self.workers = max(1, int(workers))
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.workers)
+        self.poll_interval = float(poll_interval)
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._running = {}          # job id -> Process
+        self._cancelled = set()
+        os.makedirs(root, exist_ok=True)
+        self._recover()
+        self._thread = threading.Thread(target=self._watch, name="gui-jobs", daemon=True)
+        self._thread.start()
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    def _update(self, job_id, **fields):
+        path = os.path.join(self._job_dir(job_id), JOB_FILE)
+        job = _read_json(path) or {}
+        job.update(fields)
+        _write_json(path, job)
+        return job
+
+    def _recover(self):
+        for job_id in os.listdir(self.root):
+            job = _read_json(os.path.join(self._job_dir(job_id), JOB_FILE))
+            if job is not None and job.get("status") in ("pending", "running"):
+                self._update(job_id, status="interrupted", finished=time.time())
+
+    def submit(self, kind: str, params: dict, label: str = None) -> str:
+        """
+        Queue a job and return its ID.
+
+        Args:
+            kind (str): one of JOB_KINDS
+            params (dict): JSON-serialisable task parameters (see the _*_task functions)
+            label (str): short description shown in the job list
+        """
+        if kind not in TASKS:
+            raise ValueError(f"Unknown job kind: {kind} (choose from {', '.join(JOB_KINDS)})")
+        job_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        os.makedirs(self._job_dir(job_id))
+        job = {"id": job_id, "kind": kind, "label": label or kind, "params": params, "status": "pending",
+               "created": time.time()}
+        with self._lock:
+            _write_json(os.path.join(self._job_dir(job_id), JOB_FILE), job)
+            self._queue.append(job_id)
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Drop a pending job or terminate a running one; returns False if the job is not active.
+        """
+        with self._lock:
+            if job_id in self._queue:
+                self._queue.remove(job_id)
+                self._update(job_id, status="cancelled", finished=time.time())
+                return True
+            process = self._running.get(job_id)
+            if process is None:
+                return False
+            self._cancelled.add(job_id)
+            process.terminate()
+            return True
+
+    def get(self, job_id: str):
+        """
+        job.json merged with the latest progress (key "progress") and outcome (keys "result" / "error").
+        """
+        job_dir = self._job_dir(job_id)
+        job = _read_json(os.path.join(job_dir, JOB_FILE))
+        if job is None:
+            return None
+        job["progress"] = _read_json(os.path.join(job_dir, PROGRESS_FILE)) or {}
+        outcome = _read_json(os.path.join(job_dir, RESULT_FILE)) or {}
+        job.update({key: outcome[key] for key in ("result", "error") if key in outcome})
+        return job
+
+    def jobs(self):
+        """
+        All jobs with a complete job.json, newest first.
+        """
+        jobs = (self.get(job_id) for job_id in sorted(os.listdir(self.root), reverse=True))
+        return [job for job in jobs if job is not None and "kind" in job]
+
+    def _watch(self):
+        while True:
+            with self._lock:
+                try:
+                    self._reap()
+                    self._start_pending()
+                except Exception:       # e.g. a job directory removed by hand; keep serving the other jobs
+                    traceback.print_exc()
+            time.sleep(self.poll_interval)
+
+    def _fail(self, job_id, error):
+        """
+        Record a job that could not be started as failed.
+        """
+        _write_json(os.path.join(self._job_dir(job_id), RESULT_FILE),
+                    {"status": "failed", "error": f"{type(error).__name__}: {error}", "finished": time.time()})
+        self._update(job_id, status="failed", finished=time.time())
+
+    def _reap(self):
+        for job_id, process in list(self._running.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            del self._running[job_id]
+            outcome = _read_json(os.path.join(self._job_dir(job_id), RESULT_FILE))
+            if outcome is not None:
+                status = outcome.get("status", "failed")
+            else:
+                status = "cancelled" if job_id in self._cancelled else "failed"
+                _write_json(os.path.join(self._job_dir(job_id), RESULT_FILE),
+                            {"status": status, "error": f"worker exited with code {process.exitcode}",
+                             "finished": time.time()})
+            self._cancelled.discard(job_id)
+            self._update(job_id, status=status, finished=time.time())
+
+    def _start_pending(self):
+        while self._queue and len(self._running) < self.workers:
+            job_id = self._queue.popleft()
+            try:
+                job = _read_json(os.path.join(self._job_dir(job_id), JOB_FILE))
+                if job is None:
+                    raise ValueError(f"{JOB_FILE} is missing or unreadable")
+                process = self._context.Process(
+                    target=_job_main, args=(self._job_dir(job_id), job["kind"], job["params"], self.threads),
+                    name=f"gui-job-{job_id}", daemon=True,
+                )
+                process.start()
+            except Exception as error:
+                self._fail(job_id, error)
+                continue
+            self._running[job_id] = process
+            self._update(job_id, status="running", started=time.time(), pid=process.pid)
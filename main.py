@@ -1,23 +1,28 @@
 """
 Command-line entrypoint for PES project.
 
-Command line entry: provides four subcommands: train / visualize / simulate / list-configs,
-used for training models, visualization and molecular dynamics simulation.
+Command line entry: provides subcommands train / sweep / train-ensemble / visualize / simulate / build-spline / find-minima / neb / export-npz / convert-data / active-learn / list-configs,
+used for training models, visualization, molecular dynamics simulation and adaptive sampling.
+
+Only argparse and the torch-free config registry are imported at start-up; each subcommand imports the
+modules it needs (torch, pandas, matplotlib, ...) when it runs, so cheap commands return immediately.
 """
 import os
 import argparse
-from mkdir import create_folders
-from data_loader import load_data
-from model import NeuralNetwork
-from loss import CustomLoss
-from config import get_config, list_config_names, DEFAULT_CONFIG_NAME
-from train import train
-from utils import visualize_model, accuracy, load_model, ensure_dir
-import numpy as np
-import pandas as pd
-import torch
-from torch.optim.lr_scheduler import ReduceLROnPlateau
-from molecular_simulation import run_simulation
+from config import (
+    get_config, list_config_names, DEFAULT_CONFIG_NAME,
+    TRAINING_MODES, OPTIMIZERS, INTEGRATOR_NAMES, AL_STRATEGIES, SOFTWARE_ORACLES,
+)
+
+
+def _add_profile_args(parser, steps=None, unit=None):
+    parser.add_argument("--profile", action="store_true",
+                        help="Run under torch.profiler; trace, operator table and phase timings go to the output directory")
+    parser.add_argument("--profile-top", type=int, default=30, help="Operators listed in profile_ops.txt")
+    if steps is not None:
+        parser.add_argument("--profile-steps", type=int, default=steps,
+                            help=f"{unit} recorded by the operator profiler after one warm-up (0: all; "
+                                 f"phase timings always cover the whole run)")
 
 
 def cli():
@@ -32,7 +37,7 @@ def cli():
     # train command
     p_train = subparsers.add_parser("train", help="Train model")
     p_train.add_argument("--config", default=DEFAULT_CONFIG_NAME, choices=list_config_names())
-    p_train.add_argument("--data", default=None, help="Training data CSV path, default reads from config")
+    p_train.add_argument("--data", default=None, help="Training data CSV or .npy path, default reads from config")
     p_train.add_argument("--out", default=None, help="Output directory (default uses config name)")
     p_train.add_argument("--epochs", type=int, default=None)
     p_train.add_argument("--patience", type=int, default=None)
@@ -41,12 +46,55 @@ def cli():
     p_train.add_argument("--hidden-dim", type=int, default=None)
     p_train.add_argument("--num-layers", type=int, default=None)
     p_train.add_argument("--activation", type=str, default=None)
+    p_train.add_argument("--mode", choices=TRAINING_MODES, default=None, help="Training mode, default reads from config")
+    p_train.add_argument("--batch-size", type=int, default=None, help="Mini-batch size used by --mode batch")
+    p_train.add_argument("--optimizer", choices=OPTIMIZERS, default=None, help="Optimizer, lbfgs is meant for --mode full")
+    p_train.add_argument("--eval-every", type=int, default=None, help="Epochs between evaluations (0 disables)")
+    p_train.add_argument("--threads", type=int, default=None, help="CPU threads for torch (default: torch's choice)")
+    p_train.add_argument("--resume", action="store_true",
+                         help="Continue an interrupted run from <out>/<weights>.resume.pt (same --config/--out)")
+    p_train.add_argument("--checkpoint-interval", type=float, default=None,
+                         help="Minimum seconds between checkpoint writes (default reads from config)")
+    _add_profile_args(p_train, steps=5, unit="Epochs")
+
+    # sweep command
+    p_sweep = subparsers.add_parser("sweep", help="Train a grid of hyperparameters in parallel and rank the results")
+    p_sweep.add_argument("--config", default=DEFAULT_CONFIG_NAME, choices=list_config_names(),
+                         help="Base config for everything that is not swept")
+    p_sweep.add_argument("--data", default=None, help="Training data CSV or .npy path, default reads from config")
+    p_sweep.add_argument("--out", default="sweep", help="Sweep directory (runs and leaderboard.csv)")
+    p_sweep.add_argument("--num-layers", type=int, nargs="+", default=None)
+    p_sweep.add_argument("--hidden-dim", type=int, nargs="+", default=None)
+    p_sweep.add_argument("--activation", nargs="+", default=None)
+    p_sweep.add_argument("--lr", type=float, nargs="+", default=None)
+    p_sweep.add_argument("--weight", type=float, nargs="+", default=None)
+    p_sweep.add_argument("--epochs", type=int, default=None)
+    p_sweep.add_argument("--patience", type=int, default=None)
+    p_sweep.add_argument("--mode", choices=TRAINING_MODES, default=None, help="Training mode, default reads from config")
+    p_sweep.add_argument("--batch-size", type=int, default=None, help="Mini-batch size used by --mode batch")
+    p_sweep.add_argument("--workers", type=int, default=None, help="Concurrent runs (default: one per core, at most one per run)")
+    p_sweep.add_argument("--threads", type=int, default=None, help="Torch threads per run (default: cores / workers)")
+    p_sweep.add_argument("--figures", action="store_true", help="Also write the fit/3D/contour figures of every run")
+
+    # train-ensemble command
+    p_ens = subparsers.add_parser("train-ensemble", help="Train several networks at once (vectorized) for uncertainty estimates")
+    p_ens.add_argument("--config", default=DEFAULT_CONFIG_NAME, choices=list_config_names())
+    p_ens.add_argument("--data", default=None, help="Training data CSV or .npy path, default reads from config")
+    p_ens.add_argument("--out", default=None, help="Output directory (default <config>-ensemble)")
+    p_ens.add_argument("--members", type=int, default=8, help="Ensemble size")
+    p_ens.add_argument("--epochs", type=int, default=None)
+    p_ens.add_argument("--lr", type=float, default=None)
+    p_ens.add_argument("--weight", type=float, default=None)
+    p_ens.add_argument("--batch-size", type=int, default=None, help="Rows per step (default: full batch)")
+    p_ens.add_argument("--seed", type=int, default=0, help="Member i is initialised with seed + i")
+    p_ens.add_argument("--export-members", action="store_true", help="Also save every member as member-<i>.pth")
 
     # visualize command
     p_vis = subparsers.add_parser("visualize", help="Load trained model and visualize")
     p_vis.add_argument("--config", default=DEFAULT_CONFIG_NAME, choices=list_config_names())
-    p_vis.add_argument("--data", required=True, help="Data CSV path")
+    p_vis.add_argument("--data", required=True, help="Data CSV or .npy path")
     p_vis.add_argument("--model-dir", required=True, help="Model directory (contains saved weights)")
+    _add_profile_args(p_vis)
 
     # simulate command
     p_sim = subparsers.add_parser("simulate", help="Run molecular dynamics simulation")
@@ -60,6 +108,86 @@ def cli():
     p_sim.add_argument("--v1", type=float, default=-20000)
     p_sim.add_argument("--v2", type=float, default=0.0)
     p_sim.add_argument("--v3", type=float, default=0.0)
+    p_sim.add_argument("--integrator", choices=INTEGRATOR_NAMES, default="euler",
+                       help="euler reproduces the original update; velocity-verlet/leapfrog allow larger --dt")
+    p_sim.add_argument("--adaptive", action="store_true", help="Adaptive time step with --dt as the upper bound")
+    p_sim.add_argument("--max-displacement", type=float, default=5e-4,
+                       help="Largest per-step displacement of any atom with --adaptive (Angstrom)")
+    p_sim.add_argument("--save-every", type=int, default=None,
+                       help="Save every k-th step (default 1; ensembles save only the summary unless set)")
+    p_sim.add_argument("--spline", action="store_true",
+                       help="Use the tabulated spline surrogate (<model-dir>/<config>_spline.npz, built if missing or stale)")
+    p_sim.add_argument("--trajectories", type=int, default=1,
+                       help="Number of trajectories; >1 runs a batched ensemble with sampled initial conditions")
+    p_sim.add_argument("--v-spread", type=float, default=0.0, help="Std. dev. of the impact velocity v1 (ensemble)")
+    p_sim.add_argument("--vib-amplitude", type=float, default=0.0, help="H-H vibrational amplitude in Angstrom (ensemble)")
+    p_sim.add_argument("--vib-wavenumber", type=float, default=0.0, help="H-H vibrational wavenumber in cm^-1 (ensemble)")
+    p_sim.add_argument("--seed", type=int, default=None, help="Random seed for the ensemble initial conditions")
+    _add_profile_args(p_sim, steps=500, unit="MD steps")
+
+    # build-spline command
+    p_spl = subparsers.add_parser("build-spline", help="Tabulate a trained model as a bicubic spline surrogate for MD")
+    p_spl.add_argument("--config", default=DEFAULT_CONFIG_NAME, choices=list_config_names())
+    p_spl.add_argument("--model-dir", required=True, help="Model directory (contains saved weights)")
+    p_spl.add_argument("--spacing", type=float, default=0.01, help="Table node spacing in Angstrom")
+
+    # find-minima command
+    p_min = subparsers.add_parser("find-minima", help="Batched multi-start search for all local minima of a trained model")
+    p_min.add_argument("--config", default=DEFAULT_CONFIG_NAME, choices=list_config_names())
+    p_min.add_argument("--model-dir", required=True, help="Model directory (contains saved weights)")
+    p_min.add_argument("--x-range", type=float, nargs=2, default=(0.5, 1.5), metavar=("MIN", "MAX"), help="r12 search box")
+    p_min.add_argument("--y-range", type=float, nargs=2, default=(0.5, 1.5), metavar=("MIN", "MAX"), help="r23 search box")
+    p_min.add_argument("--starts", type=int, default=48, help="Random starting points (the 4 box corners are added)")
+    p_min.add_argument("--adam-steps", type=int, default=600)
+    p_min.add_argument("--newton-steps", type=int, default=50)
+    p_min.add_argument("--min-distance", type=float, default=1e-3, help="Minima closer than this are merged (Angstrom)")
+    p_min.add_argument("--seed", type=int, default=None, help="Random seed for the starting points")
+    p_min.add_argument("--out", default=None, help="Output CSV (default <model-dir>/minima.csv)")
+
+    # neb command
+    p_neb = subparsers.add_parser("neb", help="Minimum energy path and saddle point between two geometries (climbing-image NEB)")
+    p_neb.add_argument("--config", default=DEFAULT_CONFIG_NAME, choices=list_config_names())
+    p_neb.add_argument("--model-dir", required=True, help="Model directory (contains saved weights)")
+    p_neb.add_argument("--start", type=float, nargs=2, required=True, metavar=("R12", "R23"), help="Reactant geometry")
+    p_neb.add_argument("--end", type=float, nargs=2, required=True, metavar=("R12", "R23"), help="Product geometry")
+    p_neb.add_argument("--images", type=int, default=17, help="Images including the endpoints")
+    p_neb.add_argument("--spring", type=float, default=None, help="Spring constant (default from the initial energy span)")
+    p_neb.add_argument("--fmax", type=float, default=None, help="Force tolerance (default 1e-3 of the largest initial force)")
+    p_neb.add_argument("--steps", type=int, default=2000, help="Maximum FIRE iterations")
+    p_neb.add_argument("--no-climb", action="store_true", help="Plain NEB without the climbing image")
+    p_neb.add_argument("--spline", action="store_true",
+                       help="Use the tabulated spline surrogate (<model-dir>/<config>_spline.npz, built if missing or stale)")
+    p_neb.add_argument("--out", default=None, help="Output directory for neb_path.csv and neb_summary.json (default <model-dir>)")
+
+    # export-npz command
+    p_exp = subparsers.add_parser("export-npz", help="Export a trained model to .npz for torch-free inference (numpy_pes.py)")
+    p_exp.add_argument("--config", default=DEFAULT_CONFIG_NAME, choices=list_config_names())
+    p_exp.add_argument("--model-dir", required=True, help="Model directory (contains saved weights)")
+    p_exp.add_argument("--out", default=None, help="Output path (default <model-dir>/<config>.npz)")
+
+    # convert-data command
+    p_conv = subparsers.add_parser("convert-data", help="Convert an x,y,z1..z4 CSV to the binary .npy dataset format")
+    p_conv.add_argument("--csv", required=True, help="Input CSV path")
+    p_conv.add_argument("--out", default=None, help="Output .npy path (default: CSV path with .npy suffix)")
+    p_conv.add_argument("--dtype", choices=["float32", "float64"], default="float32")
+    p_conv.add_argument("--atoms", nargs=3, default=None, metavar=("ATOM1", "ATOM2", "ATOM3"))
+    p_conv.add_argument("--grid-spacing", type=float, default=None, help="Grid step in Angstrom (inferred if omitted)")
+
+    # active-learn command
+    p_al = subparsers.add_parser("active-learn", help="Adaptive sampling of the PES grid with a model ensemble")
+    p_al.add_argument("--config", default=DEFAULT_CONFIG_NAME, choices=list_config_names())
+    p_al.add_argument("--oracle", choices=("leps",) + SOFTWARE_ORACLES, default="leps",
+                      help="leps runs the whole loop on an analytic potential; gaussian/qe/cp2k write the next batch of inputs")
+    p_al.add_argument("--data", default=None, help="Extracted CSV or .npy of the points computed so far (software oracles)")
+    p_al.add_argument("--root", default=None, help="Calculation folder (default: the generator's folder in run-big)")
+    p_al.add_argument("--out", default="active_learning", help="Output directory (leps oracle)")
+    p_al.add_argument("--rounds", type=int, default=8, help="Acquisition rounds (leps oracle)")
+    p_al.add_argument("--batch-size", type=int, default=None, help="Points requested per round")
+    p_al.add_argument("--initial-stride", type=int, default=10, help="Grid stride of the initial coarse design")
+    p_al.add_argument("--strategy", choices=AL_STRATEGIES, default="combined")
+    p_al.add_argument("--members", type=int, default=None, help="Ensemble size")
+    p_al.add_argument("--epochs", type=int, default=None, help="Full-batch training steps per ensemble member")
+    p_al.add_argument("--min-separation", type=float, default=0.1, help="Minimum distance between points of one batch (Angstrom)")
 
     # list-configs command
     subparsers.add_parser("list-configs", help="List available configuration names")
@@ -70,9 +198,155 @@ def cli():
         print("Available configurations:", ", ".join(list_config_names()))
         return
 
+    if args.command == "convert-data":
+        from dataset_io import convert_csv, header_path
+
+        out_path = convert_csv(args.csv, args.out, dtype=args.dtype, atoms=args.atoms, grid_spacing=args.grid_spacing)
+        print(f"Binary dataset written: {out_path} (+ {header_path(out_path)})")
+        return
+
+    if args.command == "export-npz":
+        from molecular_simulation import load_simulation_model
+        from numpy_pes import export_npz
+
+        model, _ = load_simulation_model(args.config, args.model_dir)
+        out_path = export_npz(model, args.out or os.path.join(args.model_dir, f"{args.config}.npz"))
+        print(f"NumPy weights written: {out_path}")
+        return
+
+    if args.command == "build-spline":
+        from molecular_simulation import load_simulation_model, load_or_build_spline
+
+        model, _ = load_simulation_model(args.config, args.model_dir)
+        load_or_build_spline(model, args.config, args.model_dir, spacing=args.spacing, rebuild=True)
+        return
+
+    if args.command == "find-minima":
+        import torch
+        import pandas as pd
+        from molecular_simulation import load_simulation_model
+        from minimumCheck import batched_search_min
+
+        if args.seed is not None:
+            torch.manual_seed(args.seed)
+        model, _ = load_simulation_model(args.config, args.model_dir, device="cpu")
+        model.requires_grad_(False)
+        x_bounds = torch.tensor(args.x_range, dtype=torch.float32)
+        y_bounds = torch.tensor(args.y_range, dtype=torch.float32)
+        minima = batched_search_min(model, x_bounds, y_bounds, n_starts=args.starts, steps_adam=args.adam_steps,
+                                    steps_newton=args.newton_steps, min_distance=args.min_distance)
+        out_path = args.out or os.path.join(args.model_dir, "minima.csv")
+        pd.DataFrame(minima).to_csv(out_path, index=False)
+        print(f"{len(minima)} distinct minima from {args.starts + 4} starts:")
+        for m in minima:
+            note = "  (box edge)" if m["on_boundary"] else ""
+            print(f"  E = {m['E']:.6f} at r12 = {m['x']:.5f}, r23 = {m['y']:.5f}  [{m['count']} starts]{note}")
+        print(f"Minima written: {out_path}")
+        return
+
+    if args.command == "neb":
+        from molecular_simulation import load_simulation_model, load_or_build_spline
+        from neb import run_neb, save_neb
+
+        model, _ = load_simulation_model(args.config, args.model_dir)
+        pes = load_or_build_spline(model, args.config, args.model_dir) if args.spline else model
+        # images stay on the training grid, outside it the network is extrapolating
+        result = run_neb(pes, args.start, args.end, n_images=args.images, spring=args.spring, climb=not args.no_climb,
+                         fmax=args.fmax, max_steps=args.steps, bounds=((0.5, 4.0), (0.5, 4.0)))
+        csv_path, json_path = save_neb(result, args.out or args.model_dir)
+        saddle = result["saddle"]
+        state = "converged" if result["converged"] else "NOT converged"
+        print(f"NEB {state} after {result['steps']} steps (max force {result['max_force']:.3g})")
+        print(f"Saddle (image {saddle['image']}): r12 = {saddle['x']:.5f}, r23 = {saddle['y']:.5f}, E = {saddle['E']:.6f}")
+        print(f"Barrier: forward {result['barrier_forward']:.6f}, reverse {result['barrier_reverse']:.6f}")
+        print(f"Path written: {csv_path} (+ {json_path})")
+        return
+
+    if args.command == "active-learn":
+        from active_learning import LEPSPotential, run_active_learning, propose_batch
+        from utils import ensure_dir
+
+        cfg = get_config(args.config)
+        options = dict(
+            batch_size=args.batch_size or cfg["al_batch_size"],
+            initial_stride=args.initial_stride,
+            strategy=args.strategy,
+            members=args.members or cfg["al_members"],
+            epochs=args.epochs or cfg["al_epochs"],
+            min_separation=args.min_separation,
+        )
+        if args.oracle == "leps":
+            data, history = run_active_learning(LEPSPotential(), cfg, rounds=args.rounds, **options)
+            ensure_dir(args.out)
+            data.to_csv(f"{args.out}/labelled.csv", index=False)
+            history.to_csv(f"{args.out}/history.csv", index=False)
+            print(f"{len(data)} of 5041 grid points labelled, results in {args.out}/")
+        else:
+            points = propose_batch(args.oracle, cfg, data_path=args.data, root=args.root, **options)
+            print(f"Wrote {len(points)} {args.oracle} inputs; run them, extract the results and call again with --data")
+        return
+
+    if args.command == "sweep":
+        from sweep import run_sweep
+
+        cfg = get_config(args.config)
+        for key, value in (("epochs", args.epochs), ("patience", args.patience), ("training_mode", args.mode),
+                           ("batch_size", args.batch_size)):
+            if value is not None:
+                cfg[key] = value
+        grid = {
+            "num_layers": args.num_layers,
+            "hidden_dim": args.hidden_dim,
+            "activation_function": args.activation,
+            "learning_rate": args.lr,
+            "weight": args.weight,
+        }
+        rows = run_sweep(cfg, grid, data_path=args.data, out_dir=args.out, workers=args.workers,
+                         threads=args.threads, visualize=args.figures)
+        print("Top runs:")
+        for row in rows[:5]:
+            if row.get("r2") is not None:
+                print(f"  {row['rank']}. {row['run']}: R2 {row['r2']:.6f} ({row['model_dir']})")
+        return
+
+    if args.command == "train-ensemble":
+        import numpy as np
+        import torch
+        from dataset_io import DATA_COLUMNS, read_table
+        from ensemble import VectorizedEnsemble
+        from utils import ensure_dir
+
+        cfg = get_config(args.config)
+        out_dir = args.out or f"{args.config}-ensemble"
+        ensure_dir(out_dir)
+        table = read_table(args.data or cfg['train_data_path'])[DATA_COLUMNS].to_numpy(dtype=np.float64)
+        ensemble = VectorizedEnsemble(cfg, args.members, seed=args.seed)
+        ensemble.fit(table[:, :2], table[:, 2], table[:, 3:], epochs=args.epochs or cfg['epochs'], lr=args.lr,
+                     weight=args.weight, batch_size=args.batch_size)
+        path = ensemble.save(os.path.join(out_dir, "ensemble.pt"))
+        prediction = ensemble.predict(table[:, :2])
+        residual = table[:, 2] - prediction["energy_mean"]
+        r2 = 1 - np.sum(residual ** 2) / np.sum((table[:, 2] - table[:, 2].mean()) ** 2)
+        print(f"Final loss per member: {np.array2string(ensemble.history[-1], precision=6)}")
+        print(f"Ensemble-mean R2: {r2:.6f}, mean energy std across members: "
+              f"{np.sqrt(prediction['energy_var']).mean():.6g}")
+        if args.export_members:
+            for i, model in enumerate(ensemble.member_models()):
+                torch.save(model.state_dict(), os.path.join(out_dir, f"member-{i}.pth"))
+        print(f"Ensemble written: {path}")
+        return
+
     if args.command == "train":
         # Train a model with optional overrides.
         # Train model: supports overriding default hyperparameters via command line.
+        import signal
+        import sys
+        import pandas as pd
+        import torch
+        from checkpoint import resume_path
+        from profiling import profile_run
+        from train import train_from_config
+
         if torch.cuda.is_available():
             torch.cuda.init()
         cfg = get_config(args.config)
@@ -91,57 +365,28 @@ def cli():
             cfg["epochs"] = args.epochs
         if args.patience is not None:
             cfg["patience"] = args.patience
+        if args.mode is not None:
+            cfg["training_mode"] = args.mode
+        if args.batch_size is not None:
+            cfg["batch_size"] = args.batch_size
+        if args.optimizer is not None:
+            cfg["optimizer"] = args.optimizer
+        if args.eval_every is not None:
+            cfg["eval_every"] = args.eval_every
+        if args.checkpoint_interval is not None:
+            cfg["checkpoint_interval"] = args.checkpoint_interval
 
-        train_data_path = args.data or cfg['train_data_path']
         out_dir = args.out or args.config
-        ensure_dir(out_dir)
-        save_model_path = f"{out_dir}/{cfg['save_model_path']}"
-        savepath = f"{out_dir}/{cfg['saveaxpath']}"
-        savepath2 = f"{out_dir}/{cfg['saveaxpath2']}"
-        saverocpath = f"{out_dir}/{cfg['assesspath']}"
-
-        # Data
-        # Data loading
-        train_loader, data = load_data(train_data_path)
-
-        # Model
-        # Build model
-        model = NeuralNetwork(
-            cfg['input_dim'], cfg['hidden_dim'], cfg['num_layers'], cfg['output_dim'], cfg['activation_function']
-        )
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        model = model.to(device)
-
-        # Optimization
-        # Optimizer and learning rate scheduler
-        criterion = CustomLoss()
-        optimizer = torch.optim.Adam(model.parameters(), lr=cfg['learning_rate'])
-        scheduler = ReduceLROnPlateau(
-            optimizer, cfg['scheduler_mode'], patience=cfg['scheduler_patience'], factor=cfg['scheduler_factor']
-        )
-
-        run_name = cfg['save_model_path'].replace(".pth", "")
-        # train
-        train(
-            model,
-            train_loader,
-            criterion,
-            optimizer,
-            scheduler,
-            save_model_path,
-            data,
-            cfg['weight'],
-            trainname = run_name,
-            epochs=cfg['epochs'],
-            patience=cfg['patience'],
-            min_delta=cfg['min_delta'],
-        )
-
-        # Evaluation & Visualization
-        # Evaluation and visualization
-        model = load_model(model, save_model_path)
-        visualize_model(model, data, savepath, savepath2, saverocpath)
-        r2 = accuracy(model, data)
+        # a scheduler's SIGTERM (preemption) unwinds like Ctrl-C, so the resumable state gets written
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            with profile_run(out_dir, top=args.profile_top, enabled=args.profile, steps=args.profile_steps):
+                result = train_from_config(cfg, args.data, out_dir, num_threads=args.threads, resume=args.resume)
+        except KeyboardInterrupt:
+            state_path = resume_path(f"{out_dir}/{cfg['save_model_path']}")
+            print(f"Training interrupted, state saved to {state_path}; continue with --resume")
+            sys.exit(130)
+        r2 = result["r2"]
         print(f"R2: {r2:.6f}")
         # write to a CSV summary
         # Write results summary
@@ -151,39 +396,80 @@ def cli():
     if args.command == "visualize":
         # Load a trained model and generate plots.
         # Load trained model and generate plots.
+        import torch
+        from data_loader import load_data
+        from model import NeuralNetwork
+        from profiling import phase, profile_run
+        from utils import visualize_model, accuracy, load_model
+
         cfg = get_config(args.config)
         device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        model = NeuralNetwork(
-            cfg['input_dim'], cfg['hidden_dim'], cfg['num_layers'], cfg['output_dim'], cfg['activation_function']
-        ).to(device)
-        model_path = f"{args.model_dir}/{cfg['save_model_path']}"
-        model = load_model(model, model_path)
-        _, data = load_data(args.data)
-        savepath = f"{args.model_dir}/{cfg['saveaxpath']}"
-        savepath2 = f"{args.model_dir}/{cfg['saveaxpath2']}"
-        saverocpath = f"{args.model_dir}/{cfg['assesspath']}"
-        visualize_model(model, data, savepath, savepath2, saverocpath)
-        r2 = accuracy(model, data)
+        with profile_run(args.model_dir, top=args.profile_top, enabled=args.profile):
+            with phase("model_load"):
+                model = NeuralNetwork(
+                    cfg['input_dim'], cfg['hidden_dim'], cfg['num_layers'], cfg['output_dim'], cfg['activation_function']
+                ).to(device)
+                model_path = f"{args.model_dir}/{cfg['save_model_path']}"
+                model = load_model(model, model_path)
+            with phase("data_load"):
+                _, data = load_data(args.data)
+            savepath = f"{args.model_dir}/{cfg['saveaxpath']}"
+            savepath2 = f"{args.model_dir}/{cfg['saveaxpath2']}"
+            saverocpath = f"{args.model_dir}/{cfg['assesspath']}"
+            with phase("plotting"):
+                visualize_model(model, data, savepath, savepath2, saverocpath)
+            with phase("evaluation"):
+                r2 = accuracy(model, data)
         print(f"R2: {r2:.6f}")
         return
 
     if args.command == "simulate":
         # Run molecular dynamics simulation driven by the trained PES.
         # Run molecular dynamics simulation driven by the trained PES.
-        run_simulation(
-            config_name=args.config,
-            model_dir=args.model_dir,
-            steps=args.steps,
-            dt=args.dt,
-            init_x1=args.x1,
-            init_x2=args.x2,
-            init_x3=args.x3,
-            init_v1=args.v1,
-            init_v2=args.v2,
-            init_v3=args.v3,
-        )
-        return
+        from molecular_simulation import run_simulation, run_ensemble_simulation
+        from profiling import profile_run
 
+        with profile_run(args.model_dir, top=args.profile_top, enabled=args.profile, steps=args.profile_steps):
+            if args.trajectories > 1:
+                run_ensemble_simulation(
+                    config_name=args.config,
+                    model_dir=args.model_dir,
+                    n_trajectories=args.trajectories,
+                    steps=args.steps,
+                    dt=args.dt,
+                    init_x1=args.x1,
+                    init_x2=args.x2,
+                    init_x3=args.x3,
+                    v_impact=args.v1,
+                    v_spread=args.v_spread,
+                    vib_amplitude=args.vib_amplitude,
+                    vib_wavenumber=args.vib_wavenumber,
+                    seed=args.seed,
+                    integrator=args.integrator,
+                    adaptive=args.adaptive,
+                    max_displacement=args.max_displacement,
+                    use_spline=args.spline,
+                    save_every=args.save_every or 0,
+                )
+            else:
+                run_simulation(
+                    config_name=args.config,
+                    model_dir=args.model_dir,
+                    steps=args.steps,
+                    dt=args.dt,
+                    init_x1=args.x1,
+                    init_x2=args.x2,
+                    init_x3=args.x3,
+                    init_v1=args.v1,
+                    init_v2=args.v2,
+                    init_v3=args.v3,
+                    integrator=args.integrator,
+                    adaptive=args.adaptive,
+                    max_displacement=args.max_displacement,
+                    use_spline=args.spline,
+                    save_every=1 if args.save_every is None else args.save_every,
+                )
+        return
 
 if __name__ == '__main__':
     cli()
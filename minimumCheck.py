@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 """
-连续空间的神经网络势能面最小值搜索（多起点 + Adam + LBFGS）
+连续空间的神经网络势能面最小值搜索（批量多起点 + Adam + 牛顿精调，去重后列出全部局部极小值）
 - 自动从 state_dict 推断 MLP 结构：layers.N.* + output_layer.*
 
 用法：
@@ -15,6 +15,8 @@ import torch
 import torch.nn as nn
 import pandas as pd
 
+from model import mlp_energy_and_gradient
+
 # ---------- 配置 ----------
 csv_path = "input_force_filtered.csv"
 model_path = "3-32-Mish-20250829-121636/3-32-Mish-20250829-121636.pth"
@@ -22,6 +24,8 @@ seed_count = 48
 adam_steps = 600
 lbfgs_steps = 50
 adam_lr = 0.05
+grad_tol = 1e-5      # 收敛判据：|dE/d(x, y)|
+min_distance = 1e-3  # 极小值去重距离
 
 # ---------- 动态模型 ----------
 def _infer_linear_shapes_from_state_dict(state_dict):
@@ -84,6 +88,10 @@ class InferredMishMLP(nn.Module):
         x = self.output_layer(x)
         return x
 
+    def energy_and_gradient(self, x):
+        """能量与 dE/dx，一次前向传播（与 model.NeuralNetwork 相同的前向雅可比）"""
+        return mlp_energy_and_gradient(self.layers, self.output_layer, self.act, x)
+
 def load_model(path: str) -> nn.Module:
     obj = torch.load(path, map_location="cpu")
     if isinstance(obj, nn.Module):
@@ -116,6 +124,21 @@ def invert_sigmoid(z: torch.Tensor, eps=1e-7):
     z = torch.clamp(z, eps, 1 - eps)
     return torch.log(z) - torch.log(1 - z)
 
+def energy_and_backward(model: nn.Module, u: torch.Tensor, x_bounds: torch.Tensor, y_bounds: torch.Tensor):
+    """
+    E(x(u), y(u))，并把 dE/du 累加到 u.grad。
+    网络部分用融合的能量+梯度前向传播（无需反向图），只对 sigmoid 变换做 autograd。
+    """
+    x, y = param_to_xy(u, x_bounds, y_bounds)
+    if not hasattr(model, "energy_and_gradient"):
+        E = model(torch.stack([x, y]).unsqueeze(0)).squeeze()
+        E.backward()
+        return E
+    with torch.no_grad():
+        E, g = model.energy_and_gradient(torch.stack([x, y]).unsqueeze(0))
+    torch.autograd.backward([x, y], [g[0, 0], g[0, 1]])
+    return E.squeeze()
+
 def refine_one_start(
     model: nn.Module,
     x_bounds: torch.Tensor,
@@ -136,20 +159,14 @@ def refine_one_start(
     opt = torch.optim.Adam([u], lr=adam_lr)
     for _ in range(steps_adam):
         opt.zero_grad(set_to_none=True)
-        x, y = param_to_xy(u, x_bounds, y_bounds)
-        inp = torch.stack([x, y]).unsqueeze(0)
-        E = model(inp).squeeze()
-        E.backward()
+        energy_and_backward(model, u, x_bounds, y_bounds)
         opt.step()
 
     # LBFGS 精调
     opt_lbfgs = torch.optim.LBFGS([u], lr=0.5, max_iter=steps_lbfgs, line_search_fn="strong_wolfe")
     def closure():
         opt_lbfgs.zero_grad(set_to_none=True)
-        x, y = param_to_xy(u, x_bounds, y_bounds)
-        E = model(torch.stack([x, y]).unsqueeze(0)).squeeze()
-        E.backward()
-        return E
+        return energy_and_backward(model, u, x_bounds, y_bounds)
     opt_lbfgs.step(closure)
 
     with torch.no_grad():
@@ -157,13 +174,19 @@ def refine_one_start(
         E = model(torch.stack([x, y]).unsqueeze(0)).squeeze().item()
     return float(E), float(x.item()), float(y.item())
 
-def global_search_min(
-    model: nn.Module,
-    x_bounds: torch.Tensor,
-    y_bounds: torch.Tensor,
-    n_starts: int = seed_count,
-    device="cpu",
-):
+# ---------- 批量多起点搜索 ----------
+def params_to_xy(u: torch.Tensor, x_bounds: torch.Tensor, y_bounds: torch.Tensor):
+    """
+    param_to_xy 的批量版本：u 形状 (N, 2) -> 坐标 (N, 2)，同样的 sigmoid 盒约束。
+    """
+    lo = torch.stack([x_bounds[0], y_bounds[0]])
+    span = torch.stack([x_bounds[1] - x_bounds[0], y_bounds[1] - y_bounds[0]])
+    return lo + span * torch.sigmoid(u)
+
+def start_points(n_starts: int, x_bounds: torch.Tensor, y_bounds: torch.Tensor, device="cpu"):
+    """
+    n_starts 个随机起点 + 搜索框的 4 个角点，形状 (n_starts + 4, 2)。
+    """
     seeds = grid_seed_samples(n_starts, x_bounds, y_bounds, device)
     corners = torch.tensor([
         [x_bounds[0], y_bounds[0]],
@@ -171,14 +194,181 @@ def global_search_min(
         [x_bounds[1], y_bounds[0]],
         [x_bounds[1], y_bounds[1]],
     ], dtype=torch.float32, device=device)
-    seeds = torch.cat([seeds, corners], dim=0)
+    return torch.cat([seeds, corners], dim=0)
 
-    best = {"E": float("inf"), "x": None, "y": None}
-    for i in range(seeds.shape[0]):
-        E, x, y = refine_one_start(model, x_bounds, y_bounds, seeds[i], device=device)
-        if E < best["E"]:
-            best = {"E": E, "x": x, "y": y}
-    return best
+def _batch_energy_and_gradient(model: nn.Module, xy: torch.Tensor, create_graph: bool = False):
+    """
+    能量 (N,) 与 dE/d(x, y) (N, 2)；优先用模型的融合前向，否则走 autograd。
+    """
+    if hasattr(model, "energy_and_gradient"):
+        E, g = model.energy_and_gradient(xy)
+        return E.reshape(-1), g
+    with torch.enable_grad():
+        r = xy if xy.requires_grad else xy.detach().requires_grad_(True)
+        E = model(r).reshape(-1)
+        g = torch.autograd.grad(E.sum(), r, create_graph=create_graph)[0]
+    return E, g
+
+def batch_energy_and_backward(model: nn.Module, u: torch.Tensor, x_bounds: torch.Tensor, y_bounds: torch.Tensor):
+    """
+    energy_and_backward 的批量版本：u 形状 (N, 2)，把每个起点的 dE/du 写入 u.grad。
+    各起点能量互不耦合，对总和求导即逐点梯度，因此 Adam（逐元素更新）与逐个优化完全等价。
+    """
+    xy = params_to_xy(u, x_bounds, y_bounds)
+    with torch.no_grad():
+        E, g = _batch_energy_and_gradient(model, xy.detach())
+    xy.backward(g)
+    return E
+
+def _energy_gradient_hessian(model: nn.Module, u: torch.Tensor, x_bounds: torch.Tensor, y_bounds: torch.Tensor):
+    """
+    u 空间中每个起点的能量 (N,)、梯度 (N, 2)、2x2 Hessian (N, 2, 2)，以及 (x, y) 空间梯度。
+    对求和后的梯度分量再求一次导，得到的就是逐点的 Hessian 行。
+    """
+    with torch.enable_grad():
+        u = u.detach().requires_grad_(True)
+        xy = params_to_xy(u, x_bounds, y_bounds)
+        E, g_xy = _batch_energy_and_gradient(model, xy, create_graph=True)
+        g_u = torch.autograd.grad(xy, u, g_xy, create_graph=True)[0]
+        rows = [torch.autograd.grad(g_u[:, k].sum(), u, retain_graph=k == 0)[0] for k in range(2)]
+    return E.detach(), g_u.detach(), torch.stack(rows, dim=1), g_xy.detach()
+
+@torch.no_grad()
+def _batch_energy(model: nn.Module, u: torch.Tensor, x_bounds: torch.Tensor, y_bounds: torch.Tensor):
+    return model(params_to_xy(u, x_bounds, y_bounds)).reshape(-1)
+
+def newton_refine(
+    model: nn.Module,
+    u: torch.Tensor,
+    x_bounds: torch.Tensor,
+    y_bounds: torch.Tensor,
+    steps: int = lbfgs_steps,
+    grad_tol: float = grad_tol,
+    max_step: float = 1.0,
+):
+    """
+    批量精调：每个起点做带回溯线搜索的 2x2 牛顿迭代（替代逐点 LBFGS）。
+
+    LBFGS 的曲率历史和线搜索会把所有起点耦合在一起，而牛顿步在每个起点上独立求解；
+    Hessian 非正定时退回到按曲率缩放的梯度方向，步长上限 max_step（u 空间）。
+
+    返回: (u, E, g_xy)，g_xy 为 (x, y) 空间梯度
+    """
+    u = u.detach().clone()
+    for _ in range(steps):
+        E, g, H, g_xy = _energy_gradient_hessian(model, u, x_bounds, y_bounds)
+        # 已收敛：物理梯度足够小，或贴边时 u 空间梯度消失
+        done = (g_xy.norm(dim=1) < grad_tol) | (g.norm(dim=1) < grad_tol)
+        if bool(done.all()):
+            return u, E, g_xy
+
+        a, b, c = H[:, 0, 0], 0.5 * (H[:, 0, 1] + H[:, 1, 0]), H[:, 1, 1]
+        det = a * c - b * b
+        positive = (a > 0) & (det > 0)
+        det = torch.where(positive, det, torch.ones_like(det))
+        newton = -torch.stack([c * g[:, 0] - b * g[:, 1], a * g[:, 1] - b * g[:, 0]], dim=1) / det[:, None]
+        curvature = (a.abs() + c.abs()).clamp_min(1e-6)
+        d = torch.where(positive[:, None], newton, -g / curvature[:, None])
+        d = d * (max_step / d.norm(dim=1).clamp_min(max_step))[:, None]
+
+        # 逐点 Armijo 回溯
+        slope = (g * d).sum(dim=1)
+        t = torch.ones_like(E)
+        for _ in range(20):
+            trial = u + t[:, None] * d
+            ok = _batch_energy(model, trial, x_bounds, y_bounds) <= E + 1e-4 * t * slope
+            accept = ok & ~done
+            u = torch.where(accept[:, None], trial, u)
+            done = done | ok
+            if bool(done.all()):
+                break
+            t = torch.where(done, t, 0.5 * t)
+
+    E, _, _, g_xy = _energy_gradient_hessian(model, u, x_bounds, y_bounds)
+    return u, E, g_xy
+
+def deduplicate_minima(points: torch.Tensor, energies: torch.Tensor, min_distance: float):
+    """
+    按能量从低到高贪心聚类：与已保留极小值距离小于 min_distance 的点归入该极小值。
+
+    返回: [(保留点的索引, 收敛到该点的起点数), ...]，按能量升序
+    """
+    kept, counts = [], []
+    for i in torch.argsort(energies).tolist():
+        if kept:
+            dist = (points[kept] - points[i]).norm(dim=1)
+            j = int(torch.argmin(dist))
+            if float(dist[j]) < min_distance:
+                counts[j] += 1
+                continue
+        kept.append(i)
+        counts.append(1)
+    return list(zip(kept, counts))
+
+def batched_search_min(
+    model: nn.Module,
+    x_bounds: torch.Tensor,
+    y_bounds: torch.Tensor,
+    n_starts: int = seed_count,
+    steps_adam: int = adam_steps,
+    steps_newton: int = lbfgs_steps,
+    min_distance: float = min_distance,
+    grad_tol: float = grad_tol,
+    starts: torch.Tensor = None,
+    device="cpu",
+):
+    """
+    批量多起点最小值搜索：全部起点作为一个 (N, 2) 参数张量，在同一个 sigmoid 盒约束下
+    先 Adam 粗调，再批量牛顿精调，最后按距离去重。
+
+    返回: 所有不同的局部极小值（按能量升序），每项为
+        {"E", "x", "y", "count"（收敛到此处的起点数）, "grad_norm", "on_boundary"}
+    """
+    if starts is None:
+        starts = start_points(n_starts, x_bounds, y_bounds, device)
+    lo = torch.stack([x_bounds[0], y_bounds[0]])
+    span = torch.stack([x_bounds[1] - x_bounds[0], y_bounds[1] - y_bounds[0]])
+    u = torch.nn.Parameter(invert_sigmoid((starts.to(device) - lo) / span))
+
+    # Adam 粗调（逐元素更新，与逐个起点优化等价）
+    opt = torch.optim.Adam([u], lr=adam_lr)
+    for _ in range(steps_adam):
+        opt.zero_grad(set_to_none=True)
+        batch_energy_and_backward(model, u, x_bounds, y_bounds)
+        opt.step()
+
+    # 批量牛顿精调
+    u, E, g_xy = newton_refine(model, u, x_bounds, y_bounds, steps=steps_newton, grad_tol=grad_tol)
+
+    with torch.no_grad():
+        xy = params_to_xy(u, x_bounds, y_bounds)
+        s = torch.sigmoid(u)
+        on_boundary = ((s < 1e-4) | (s > 1 - 1e-4)).any(dim=1)
+    minima = []
+    for i, count in deduplicate_minima(xy, E, min_distance):
+        minima.append({
+            "E": float(E[i]),
+            "x": float(xy[i, 0]),
+            "y": float(xy[i, 1]),
+            "count": count,
+            "grad_norm": float(g_xy[i].norm()),
+            "on_boundary": bool(on_boundary[i]),
+        })
+    return minima
+
+def global_search_min(
+    model: nn.Module,
+    x_bounds: torch.Tensor,
+    y_bounds: torch.Tensor,
+    n_starts: int = seed_count,
+    device="cpu",
+):
+    """
+    多起点全局最小值：批量搜索所有局部极小值并返回能量最低者，"minima" 中保留完整列表。
+    """
+    minima = batched_search_min(model, x_bounds, y_bounds, n_starts=n_starts, device=device)
+    best = minima[0]
+    return {"E": best["E"], "x": best["x"], "y": best["y"], "minima": minima}
 
 # ---------- 主程序 ----------
 def main():
@@ -204,6 +394,7 @@ def main():
         "y": result["y"],
         "x_bounds": [x0, x1],
         "y_bounds": [y0, y1],
+        "minima": result["minima"],
     }
     print(json.dumps(out, ensure_ascii=False, indent=2))
 
@@ -4,9 +4,74 @@ Neural network model definition.
 Neural network model definition: Multi-layer perceptron supporting safe activation function resolution by name (e.g., Mish, ReLU, LeakyReLU).
 """
 
+import math
 import torch
 import torch.nn as nn
 
+
+def activation_and_derivative(activation, z):
+    """
+    Value and derivative of an elementwise activation module at pre-activations z.
+
+    Returns None for activations without a closed form here, so callers can fall back to autograd.
+    Every branch is built from differentiable torch ops, so the result can itself be backpropagated
+    (needed when forces enter the training loss).
+    """
+    if isinstance(activation, nn.Mish):
+        t = torch.tanh(nn.functional.softplus(z))
+        return z * t, t + z * torch.sigmoid(z) * (1 - t * t)
+    if isinstance(activation, nn.ReLU):
+        return activation(z), (z > 0).to(z.dtype)
+    if isinstance(activation, nn.LeakyReLU):
+        return activation(z), torch.where(z > 0, torch.ones_like(z), torch.full_like(z, activation.negative_slope))
+    if isinstance(activation, nn.ELU):
+        return activation(z), torch.where(z > 0, torch.ones_like(z), activation.alpha * torch.exp(z))
+    if isinstance(activation, nn.GELU):
+        if activation.approximate == "tanh":
+            k = math.sqrt(2 / math.pi)
+            t = torch.tanh(k * (z + 0.044715 * z ** 3))
+            return 0.5 * z * (1 + t), 0.5 * (1 + t) + 0.5 * z * (1 - t * t) * k * (1 + 3 * 0.044715 * z * z)
+        cdf = 0.5 * (1 + torch.erf(z / math.sqrt(2)))
+        return z * cdf, cdf + z * torch.exp(-0.5 * z * z) / math.sqrt(2 * math.pi)
+    if isinstance(activation, nn.SiLU):
+        s = torch.sigmoid(z)
+        return z * s, s * (1 + z * (1 - s))
+    if isinstance(activation, nn.Tanh):
+        t = torch.tanh(z)
+        return t, 1 - t * t
+    return None
+
+
+def mlp_energy_and_gradient(layers, output_layer, activation, x, dropout=None):
+    """
+    Output of a Linear/activation stack and the gradient of its summed output w.r.t. the input, in one pass.
+
+    The input Jacobian is carried forward next to the activations as a (input_dim, N, width) tensor, so each
+    layer costs one extra matmul instead of a full reverse-mode pass; for the 2-input PES networks this is
+    cheaper than autograd.grad and keeps no graph when gradients are disabled.
+
+    Returns:
+        tuple: (output (N, output_dim), gradient (N, input_dim)), or None if the activation is unsupported
+    """
+    h, jacobian = x, None
+    for layer in layers:
+        z = layer(h)
+        pair = activation_and_derivative(activation, z)
+        if pair is None:
+            return None
+        h, slope = pair
+        # dz/dx: first layer is the weight itself, later layers chain through the previous Jacobian
+        jacobian = layer.weight.t().unsqueeze(1) if jacobian is None else jacobian @ layer.weight.t()
+        jacobian = jacobian * slope
+        if dropout is not None and dropout.training:
+            mask = dropout(torch.ones_like(h))
+            h = h * mask
+            jacobian = jacobian * mask
+    output = output_layer(h)
+    gradient = jacobian @ output_layer.weight.sum(dim=0)
+    return output, gradient.t()
+
+
 class NeuralNetwork(nn.Module):
     def __init__(
         self,
@@ -79,3 +144,25 @@ class NeuralNetwork(nn.Module):
         # Pass the output layer
         x = self.output_layer(x)
         return x
+
+    def energy_and_gradient(self, x):
+        """
+        Energy and dE/dx in a single forward pass.
+
+        Propagates the input Jacobian alongside the activations (see mlp_energy_and_gradient), matching
+        autograd.grad(self(x).sum(), x) to rounding. The result stays differentiable with respect to the
+        parameters, so it can be used inside the training loss; activations without an analytic derivative
+        fall back to autograd.
+
+        Returns:
+            tuple: (energy (N, output_dim), gradient (N, input_dim))
+        """
+        result = mlp_energy_and_gradient(self.layers, self.output_layer, self.activation, x, self.dropout)
+        if result is not None:
+            return result
+        create_graph = torch.is_grad_enabled()
+        inputs = x if x.requires_grad else x.detach().requires_grad_(True)
+        with torch.enable_grad():
+            output = self(inputs)
+            gradient, = torch.autograd.grad(output.sum(), inputs, create_graph=create_graph)
+        return (output, gradient) if create_graph else (output.detach(), gradient)
@@ -6,14 +6,18 @@ Molecular dynamics simulation based on trained potential energy surface (PES).
 
 import os
 import re
+import time
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import torch
 import torch.nn as nn
 from model import NeuralNetwork
 from config import get_config
-from utils import ensure_dir
+from utils import ensure_dir, setup_logging, log_metrics, MetricsRecorder
+from pes_evaluator import PESEvaluator
+from profiling import phase, mark_step
+from spline_surrogate import SplinePES, model_fingerprint
+from trajectory_io import TrajectoryWriter, save_trajectory, write_xyz
 
 # ---------- Helpers for picking correct arch & weights ----------
 ACTIVATIONS = {"Mish", "ReLU", "LeakyReLU", "ELU", "GELU"}
@@ -50,22 +54,29 @@ def _latest_pth_in_dir(dirpath: str):
 # ---------------------------------------------------------------
 
 
-def run_simulation(
-    config_name: str,
-    model_dir: str,
-    steps: int = 60000,
-    dt: float = 10e-19,
-    init_x1: float = 3.0,
-    init_x2: float = 0.0,
-    init_x3: float = -1.108,
-    init_v1: float = -20000,
-    init_v2: float = 0.0,
-    init_v3: float = 0.0,
-):
+# ---------- Physical constants ----------
+ENERGY_UNIT = 4.3597e-8          # force unit conversion used for the accelerations
+ATOMIC_MASS = 1.661e-27          # kg per amu
+MASSES = (20.1797, 1.0079, 1.0079)   # Ne, H, H (amu)
+SPEED_OF_LIGHT_CM = 2.99792458e10    # cm/s, for vibrational wavenumbers
+ELECTRON_VOLT = 1.602176634e-19      # J
+# Potential energy (eV) per network output unit, consistent with the forces used in the integration:
+# F = -dE/dr / 0.529 in units of ENERGY_UNIT (N per output unit per Angstrom)
+POTENTIAL_TO_EV = ENERGY_UNIT * 1e-10 / 0.529 / ELECTRON_VOLT
+R12_MAX, R23_MAX = 4.0, 3.99     # training domain, trajectories leaving it are stopped
+# Exit codes per trajectory
+OUTCOMES = ("running", "r12_exit", "r23_exit", "collapsed")
+
+
+def load_simulation_model(config_name: str, model_dir: str, device=None):
     """
-    Run an MD trajectory using gradients from the neural PES.
+    Build the network for a model directory and load its weights.
 
-    Use neural network potential energy gradients to advance MD trajectory.
+    The architecture comes from the config, overridden by a "<layers>-<hidden>-<activation>" directory
+    name (timestamp suffix ignored); weights are cfg['save_model_path'] or the newest .pth in the directory.
+
+    Returns:
+        tuple: (model in eval mode, merged cfg)
     """
     # 1) Read base config and override structure based on directory name (parse after removing timestamp suffix)
     cfg = get_config(config_name)
@@ -79,12 +90,6 @@ def run_simulation(
         cfg["hidden_dim"] = arch["hidden_dim"]
         cfg["activation_function"] = arch["activation_function"]
 
-    input_dim = cfg["input_dim"]
-    output_dim = cfg["output_dim"]
-    hidden_dim = cfg["hidden_dim"]
-    num_layers = cfg["num_layers"]
-    activation_name = cfg["activation_function"]
-
     # 2) Select weights to load: prioritize cfg['save_model_path'], otherwise latest .pth in directory
     preferred_path = os.path.join(model_dir, cfg.get("save_model_path", "model.pth"))
     if os.path.exists(preferred_path):
@@ -96,127 +101,626 @@ def run_simulation(
         model_path = cand
 
     # 3) Build model and load matching weights
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model = NeuralNetwork(input_dim, hidden_dim, num_layers, output_dim, activation_name).to(device)
+    device = device or torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = NeuralNetwork(
+        cfg["input_dim"], cfg["hidden_dim"], cfg["num_layers"], cfg["output_dim"], cfg["activation_function"]
+    ).to(device)
 
     # Use map_location to be compatible with CPU/GPU scenarios
     state = torch.load(model_path, map_location=device)
     model.load_state_dict(state)
     model.eval()
+    return model, cfg
+
+
+def spline_path(model_dir: str, config_name: str) -> str:
+    """
+    Default location of a model's tabulated surrogate.
+    """
+    return os.path.join(model_dir, f"{config_name}_spline.npz")
+
+
+def load_or_build_spline(model, config_name: str, model_dir: str, spacing: float = 0.01, rebuild: bool = False):
+    """
+    Load `<model_dir>/<config>_spline.npz`, or tabulate the model, report the interpolation error and save it.
+
+    A saved table is only reused if it was built from the same weights (see spline_surrogate.model_fingerprint);
+    after a retrain, or for tables without a fingerprint, it is rebuilt.
+    """
+    path = spline_path(model_dir, config_name)
+    if os.path.exists(path) and not rebuild:
+        spline = SplinePES.load(path, device=next(model.parameters()).device)
+        if spline.source == model_fingerprint(model):
+            return spline
+        print(f"Spline table {path} does not match the current weights, rebuilding")
+    spline = SplinePES.from_model(model, spacing=spacing)
+    report = spline.error_report(model)
+    print(f"Spline table ({report['nodes']} nodes, spacing {spacing} Å): "
+          f"energy max error {report['energy_max']:.2e}, gradient max error {report['gradient_max']:.2e}, "
+          f"{report['spline_us_per_point']:.2f} µs/point vs network {report['network_us_per_point']:.2f} µs/point")
+    spline.save(path)
+    print("Spline table saved: " + path)
+    return spline
+
+
+def sample_initial_conditions(
+    n: int,
+    x1: float = 3.0,
+    x2: float = 0.0,
+    x3: float = -1.108,
+    v_impact: float = -20000,
+    v_spread: float = 0.0,
+    vib_amplitude: float = 0.0,
+    vib_wavenumber: float = 0.0,
+    seed=None,
+):
+    """
+    Sample a reactive-scattering ensemble: Ne impact velocities and H-H vibrational phases.
+
+    The impact velocity of atom 1 is drawn from N(v_impact, v_spread). The H-H bond is displaced by
+    vib_amplitude * cos(phase) about its centre of mass with the matching harmonic velocity for a uniform
+    random phase, so the diatomic starts at a random point of its vibration.
+
+    Args:
+        n (int): number of trajectories
+        x1, x2, x3 (float): reference positions (Angstrom)
+        v_impact (float): mean velocity of atom 1 (m/s)
+        v_spread (float): standard deviation of the impact velocity (m/s)
+        vib_amplitude (float): H-H vibrational amplitude (Angstrom)
+        vib_wavenumber (float): H-H vibrational wavenumber (cm^-1)
+        seed (int): random seed
+
+    Returns:
+        tuple: (positions, velocities) as float64 arrays of shape (n, 3)
+    """
+    rng = np.random.default_rng(seed)
+    _, m2, m3 = MASSES
+    phase = rng.uniform(0.0, 2 * np.pi, n)
+    omega = 2 * np.pi * SPEED_OF_LIGHT_CM * vib_wavenumber
+    stretch = vib_amplitude * np.cos(phase)                          # Angstrom
+    stretch_rate = -vib_amplitude * 1e-10 * omega * np.sin(phase)    # m/s
+
+    positions = np.empty((n, 3))
+    positions[:, 0] = x1
+    positions[:, 1] = x2 + stretch * m3 / (m2 + m3)
+    positions[:, 2] = x3 - stretch * m2 / (m2 + m3)
+    velocities = np.zeros((n, 3))
+    velocities[:, 0] = rng.normal(v_impact, v_spread, n) if v_spread > 0 else v_impact
+    velocities[:, 1] = stretch_rate * m3 / (m2 + m3)
+    velocities[:, 2] = -stretch_rate * m2 / (m2 + m3)
+    return positions, velocities
+
+
+class Integrator:
+    """
+    One explicit time step of the equations of motion.
+
+    Velocities are stored in whatever form the scheme propagates (full- or half-step); `velocity` returns
+    the value synchronous with the positions, used for the kinetic energy. `accel` is always evaluated at
+    the current positions, so every scheme costs one network evaluation per step.
+    """
+
+    name = None
+
+    def start(self, v, accel, dt):
+        """Convert initial velocities to the stored form."""
+        return v
+
+    def velocity(self, v, accel, dt):
+        """Velocities at the same time as the positions."""
+        return v
+
+    def step(self, x, v, accel, dt):
+        """Advance positions (Angstrom) and stored velocities (m/s) by dt (s)."""
+        raise NotImplementedError
+
+    def finish(self, v, accel, dt):
+        """Complete the step once the accelerations at the new positions are known."""
+        return v
+
+
+class EulerIntegrator(Integrator):
+    """Explicit Euler: positions move with the old velocity, then velocities update (the original scheme)."""
+
+    name = "euler"
+
+    def step(self, x, v, accel, dt):
+        return x + v * dt * 1e10, v + accel * dt
+
+
+class VelocityVerletIntegrator(Integrator):
+    """Velocity Verlet: half kick, drift, half kick with the new forces. Symplectic, second order."""
+
+    name = "velocity-verlet"
+
+    def step(self, x, v, accel, dt):
+        v_half = v + 0.5 * accel * dt
+        return x + v_half * dt * 1e10, v_half
+
+    def finish(self, v, accel, dt):
+        return v + 0.5 * accel * dt
+
+
+class LeapfrogIntegrator(Integrator):
+    """
+    Leapfrog (kick-drift) with velocities stored at half steps.
+
+    Same trajectory as velocity Verlet; the synchronous velocity for the energy is reconstructed
+    from the half-step velocity.
+    """
+
+    name = "leapfrog"
+
+    def start(self, v, accel, dt):
+        return v - 0.5 * accel * dt
+
+    def velocity(self, v, accel, dt):
+        return v + 0.5 * accel * dt
+
+    def step(self, x, v, accel, dt):
+        v_next = v + accel * dt
+        return x + v_next * dt * 1e10, v_next
+
+
+# keys match config.INTEGRATOR_NAMES, which the CLI offers without importing this module
+INTEGRATORS = {
+    cls.name: cls for cls in (EulerIntegrator, VelocityVerletIntegrator, LeapfrogIntegrator)
+}
+
+
+def get_integrator(name: str) -> Integrator:
+    """
+    Integrator instance by name ("euler", "velocity-verlet", "leapfrog").
+    """
+    if name not in INTEGRATORS:
+        raise ValueError(f"Unknown integrator: {name} (choose from {', '.join(INTEGRATORS)})")
+    return INTEGRATORS[name]()
+
+
+def adaptive_timestep(v, accel, dt_max: float, max_displacement: float, dt_min: float = None):
+    """
+    Per-trajectory time step limiting the displacement of any atom to `max_displacement` Angstrom.
+
+    Both the velocity term |v| dt and the acceleration term |a| dt^2 / 2 are bounded; the result is
+    clipped to [dt_min, dt_max] with dt_min defaulting to dt_max / 100.
+    """
+    dt_min = dt_max / 100 if dt_min is None else dt_min
+    limit = max_displacement * 1e-10
+    speed = v.abs().amax(dim=1).clamp_min(1e-30)
+    acceleration = accel.abs().amax(dim=1).clamp_min(1e-30)
+    dt = torch.minimum(limit / speed, torch.sqrt(2 * limit / acceleration))
+    return dt.clamp(dt_min, dt_max)
+
 
-    # ---------- Physical constants and initial conditions ----------
-    F = 4.3597e-8
-    m = 1.661e-27
-    m1, m2, m3 = 20.1797, 1.0079, 1.0079
-    m11, m21, m31 = m1 * m / F, m2 * m / F, m3 * m / F
+def _potential_and_acceleration(evaluator, x, inverse_masses):
+    """
+    Network energy and accelerations for (N, 3) positions from one energy-and-gradient evaluation.
+
+    Returns:
+        tuple: (r (N, 2) float32, potential (N,) float32, accelerations (N, 3) float64 in m/s^2)
+    """
+    r = torch.stack((x[:, 0] - x[:, 1], x[:, 1] - x[:, 2]), dim=1).float()
+    output, gradients = evaluator.energy_and_gradient_tensor(r)
+    gradients = gradients.double() / 0.529
+    forces = torch.stack(
+        (-gradients[:, 0], gradients[:, 0] - gradients[:, 1], gradients[:, 1]), dim=1
+    )
+    return r, output, forces * inverse_masses
+
+
+def run_batch_trajectories(
+    model,
+    positions,
+    velocities,
+    steps: int = 60000,
+    dt: float = 10e-19,
+    integrator: str = "euler",
+    adaptive: bool = False,
+    max_displacement: float = 5e-4,
+    record_every: int = 0,
+    recorder=None,
+    check_every: int = 100,
+    device=None,
+    on_progress=None,
+):
+    """
+    Propagate N collinear Ne-H-H trajectories at once on the neural PES.
+
+    State is kept as (N, 3) float64 position/velocity tensors on the device; forces for all trajectories
+    come from a single fused energy-and-gradient pass per step. A trajectory that leaves the training domain is frozen
+    by its mask instead of breaking the loop, and the host only checks for "all finished" every
+    `check_every` steps.
 
-    x1, x2, x3 = init_x1, init_x2, init_x3
-    v1, v2, v3 = init_v1, init_v2, init_v3
+    Total energy (eV) is the network potential converted with POTENTIAL_TO_EV plus the kinetic energy, i.e.
+    the quantity the equations of motion conserve, so its drift measures the integration error.
 
-    time_list, rlist, coordinates_list, potential_list, Elist = [], [], [], [], []
+    Args:
+        model: PES network mapping (r12, r23) to energy, a PESEvaluator wrapping it, or a SplinePES table
+        positions (array-like): (N, 3) initial positions in Angstrom
+        velocities (array-like): (N, 3) initial velocities in m/s
+        steps (int): maximum number of steps
+        dt (float): time step in seconds (the upper bound when adaptive)
+        integrator (str): "euler", "velocity-verlet" or "leapfrog"
+        adaptive (bool): per-trajectory time steps from adaptive_timestep
+        max_displacement (float): per-step displacement bound for adaptive stepping (Angstrom)
+        record_every (int): store time, positions, potential and total energy every k steps (0 disables)
+        recorder (TrajectoryWriter): receives the recorded frames instead (its stride replaces record_every),
+            e.g. to stream a long run to disk; the caller closes it
+        check_every (int): steps between early-exit checks
+        device: torch device, defaults to the model's
+        on_progress (callable): called as on_progress(step) at every early-exit check
 
-    # ---------- Time advancement ----------
+    Returns:
+        dict: numpy arrays "positions", "velocities" (final), "time" (elapsed per trajectory),
+            "exit_step" (-1 while running), "outcome" (index into OUTCOMES), "energy_initial",
+            "energy_final", "energy_max_deviation", and with record_every "times" (T, N),
+            "trajectory" (T, N, 3), "potential" (T, N), "energy" (T, N), NaN after exit
+    """
+    # PESEvaluator, SplinePES or anything else providing energy_and_gradient_tensor
+    evaluator = model if hasattr(model, "energy_and_gradient_tensor") else PESEvaluator(model, device=device)
+    device = torch.device(device) if device is not None else evaluator.device
+    scheme = get_integrator(integrator)
+    x = torch.as_tensor(np.asarray(positions, dtype=np.float64), device=device).reshape(-1, 3).clone()
+    v = torch.as_tensor(np.asarray(velocities, dtype=np.float64), device=device).reshape(-1, 3).clone()
+    n = x.shape[0]
+    masses = torch.tensor(MASSES, dtype=torch.float64, device=device)
+    inverse_masses = ENERGY_UNIT / (masses * ATOMIC_MASS)
+    kinetic_factor = 0.5 * masses * ATOMIC_MASS / ELECTRON_VOLT
+
+    active = torch.ones(n, dtype=torch.bool, device=device)
+    exit_step = torch.full((n,), -1, dtype=torch.long, device=device)
+    outcome = torch.zeros(n, dtype=torch.long, device=device)
+    elapsed = torch.zeros(n, dtype=torch.float64, device=device)
+    energy_initial = torch.full((n,), float("nan"), dtype=torch.float64, device=device)
+    energy = energy_initial.clone()
+    max_deviation = torch.zeros(n, dtype=torch.float64, device=device)
+
+    # Frames go into chunk-sized device buffers that are handed to the writer whenever they fill up
+    writer = recorder
+    if writer is None and record_every:
+        writer = TrajectoryWriter(None, n, stride=record_every, dtype="float64")
+    if writer is not None:
+        stride = writer.stride
+        rows = max(1, min(writer.chunk_frames, (steps + stride - 1) // stride))
+        times = torch.empty((rows, n), dtype=torch.float64, device=device)
+        trajectory = torch.empty((rows, n, 3), dtype=torch.float64, device=device)
+        potential = torch.empty((rows, n), dtype=torch.float32, device=device)
+        energies = torch.empty((rows, n), dtype=torch.float64, device=device)
+        buffered = 0
+
+    def flush():
+        writer.write_chunk(times[:buffered].cpu().numpy(), trajectory[:buffered].cpu().numpy(),
+                           potential[:buffered].cpu().numpy(), energies[:buffered].cpu().numpy())
+
+    nan = torch.tensor(float("nan"), dtype=torch.float64, device=device)
+    r, output, accel = _potential_and_acceleration(evaluator, x, inverse_masses)
+    step_dt = adaptive_timestep(v, accel, dt, max_displacement) if adaptive else torch.full_like(elapsed, dt)
+    v = scheme.start(v, accel, step_dt.unsqueeze(1))
     for i in range(steps):
-        r12 = x1 - x2
-        r23 = x2 - x3
-        time_list.append(i * dt)
-        coordinates_list.append([x1, x2, x3])
-        rlist.append([r12, r23])
-
-        # Enable grad for input, use neural potential gradients as forces
-        input_tensor = torch.tensor([[r12, r23]], dtype=torch.float32, requires_grad=True, device=device)
-        output = model(input_tensor)                   # [1, 1] or [1], depending on your network output implementation
-        potential_list.append(float(output.detach().cpu().item()))
-
-        # If trajectory goes beyond training domain, end early
-        if r12 < 0 or r12 > 4.0 or r23 < 0 or r23 > 3.99:
-            print("break")
-            break
-
-        # Total energy (note output is tensor, convert to float for storage below)
-        E = (
-            output * 8.314
-            + 0.5 * m1 * m * abs(v1 ** 2) * 10e19 / 1.609
-            + 0.5 * m2 * m * abs(v2 ** 2) * 10e19 / 1.609
-            + 0.5 * m3 * m * abs(v3 ** 2) * 10e19 / 1.609
+        record = writer is not None and i % stride == 0
+        if record:
+            row = buffered
+            times[row] = torch.where(active, elapsed, nan)
+            trajectory[row] = torch.where(active.unsqueeze(1), x, nan)
+            potential[row] = torch.where(active, output, nan.float())
+
+        # Trajectories leaving the training domain stop here (the scalar version's `break`)
+        r12, r23 = r[:, 0], r[:, 1]
+        collapsed = (r12 < 0) | (r23 < 0)
+        code = torch.where(collapsed, 3, torch.where(r12 > R12_MAX, 1, torch.where(r23 > R23_MAX, 2, 0)))
+        leaving = active & (code > 0)
+        exit_step = torch.where(leaving, i, exit_step)
+        outcome = torch.where(leaving, code, outcome)
+        active = active & ~leaving
+
+        # Total energy and its deviation from the start of the trajectory
+        synchronous_v = scheme.velocity(v, accel, step_dt.unsqueeze(1))
+        total = output.double() * POTENTIAL_TO_EV + (kinetic_factor * synchronous_v ** 2).sum(dim=1)
+        if i == 0:
+            energy_initial = torch.where(active, total, energy_initial)
+        energy = torch.where(active, total, energy)
+        max_deviation = torch.where(active, torch.maximum(max_deviation, (total - energy_initial).abs()), max_deviation)
+        if record:
+            energies[row] = torch.where(active, total, nan)
+            buffered += 1
+            if buffered == rows:
+                flush()
+                buffered = 0
+
+        # Advance the trajectories still running; one network evaluation at the new positions
+        moving = active.unsqueeze(1)
+        x_next, v_next = scheme.step(x, v, accel, step_dt.unsqueeze(1))
+        x = torch.where(moving, x_next, x)
+        r, output, accel = _potential_and_acceleration(evaluator, x, inverse_masses)
+        v = torch.where(moving, scheme.finish(v_next, accel, step_dt.unsqueeze(1)), v)
+        elapsed = torch.where(active, elapsed + step_dt, elapsed)
+        if adaptive:
+            # Leapfrog keeps half-step velocities, so re-synchronise around a change of dt
+            new_dt = torch.where(active, adaptive_timestep(v, accel, dt, max_displacement), step_dt)
+            if scheme.name == "leapfrog":
+                v = scheme.start(scheme.velocity(v, accel, step_dt.unsqueeze(1)), accel, new_dt.unsqueeze(1))
+            step_dt = new_dt
+
+        mark_step()
+        if (i + 1) % check_every == 0:
+            if on_progress is not None:
+                on_progress(i + 1)
+            if not bool(active.any()):
+                break
+    if writer is not None and buffered:
+        flush()
+
+    result = {
+        "positions": x.cpu().numpy(),
+        "velocities": scheme.velocity(v, accel, step_dt.unsqueeze(1)).cpu().numpy(),
+        "time": elapsed.cpu().numpy(),
+        "exit_step": exit_step.cpu().numpy(),
+        "outcome": outcome.cpu().numpy(),
+        "energy_initial": energy_initial.cpu().numpy(),
+        "energy_final": energy.cpu().numpy(),
+        "energy_max_deviation": max_deviation.cpu().numpy(),
+    }
+    if recorder is None and record_every:
+        result.update(writer.arrays())
+    return result
+
+
+def energy_diagnostics(result):
+    """
+    Energy-conservation summary of a run_batch_trajectories result.
+
+    Returns:
+        dict: mean/max absolute final drift and maximum deviation (eV), mean relative drift,
+            and mean drift rate (eV per picosecond)
+    """
+    drift = result["energy_final"] - result["energy_initial"]
+    valid = np.isfinite(drift)
+    if not valid.any():
+        return {"mean_abs_drift": float("nan"), "max_abs_drift": float("nan"), "max_deviation": float("nan"),
+                "mean_relative_drift": float("nan"), "drift_rate_per_ps": float("nan")}
+    drift = drift[valid]
+    scale = np.abs(result["energy_initial"][valid]).clip(min=1e-12)
+    elapsed_ps = result["time"][valid] * 1e12
+    rate = np.divide(drift, elapsed_ps, out=np.zeros_like(drift), where=elapsed_ps > 0)
+    return {
+        "mean_abs_drift": float(np.abs(drift).mean()),
+        "max_abs_drift": float(np.abs(drift).max()),
+        "max_deviation": float(result["energy_max_deviation"][valid].max()),
+        "mean_relative_drift": float((np.abs(drift) / scale).mean()),
+        "drift_rate_per_ps": float(rate.mean()),
+    }
+
+
+def log_md_metrics(experiment_name: str, result, seconds: float, steps: int, record_every: int = 0,
+                   max_points: int = 1000):
+    """
+    Write MD throughput and energy conservation of a run_batch_trajectories result to TensorBoard ("MD/").
+
+    Logs steps/s (of the longest trajectory and summed over trajectories), the energy_diagnostics summary and,
+    when frames were recorded, the mean total-energy drift per recorded step (at most `max_points` values).
+    """
+    exit_step = result["exit_step"]
+    integrated = np.where(exit_step >= 0, exit_step + 1, steps)
+    drift = energy_diagnostics(result)
+    with MetricsRecorder(setup_logging(experiment_name)) as writer:
+        log_metrics(writer, {
+            "StepsPerSec": integrated.max() / seconds,
+            "TrajectoryStepsPerSec": integrated.sum() / seconds,
+            "Seconds": seconds,
+            "MaxAbsDrift": drift["max_abs_drift"],
+            "MaxDeviation": drift["max_deviation"],
+            "DriftRatePerPs": drift["drift_rate_per_ps"],
+        }, 0, "MD")
+        if record_every and "energy" in result:
+            deviation = result["energy"] - result["energy_initial"]
+            stride = max(1, len(deviation) // max_points)
+            for frame in range(0, len(deviation), stride):
+                row = deviation[frame][np.isfinite(deviation[frame])]
+                if len(row):
+                    writer.add_scalar("MD/EnergyDrift", row.mean(), frame * record_every)
+    return writer.log_dir
+
+
+def run_simulation(
+    config_name: str,
+    model_dir: str,
+    steps: int = 60000,
+    dt: float = 10e-19,
+    init_x1: float = 3.0,
+    init_x2: float = 0.0,
+    init_x3: float = -1.108,
+    init_v1: float = -20000,
+    init_v2: float = 0.0,
+    init_v3: float = 0.0,
+    integrator: str = "euler",
+    adaptive: bool = False,
+    max_displacement: float = 5e-4,
+    use_spline: bool = False,
+    save_every: int = 1,
+    on_progress=None,
+):
+    """
+    Run an MD trajectory using gradients from the neural PES.
+
+    Use neural network potential energy gradients to advance MD trajectory.
+    `integrator` selects "euler" (original scheme), "velocity-verlet" or "leapfrog"; with `adaptive`
+    the step shrinks below `dt` so no atom moves more than `max_displacement` Angstrom per step.
+    With `use_spline` forces come from the tabulated surrogate (see load_or_build_spline).
+    Every `save_every`-th step is written to the CSV, XYZ and binary `.trj` outputs.
+    `on_progress(step)` is called every 100 integration steps.
+    """
+    if save_every < 1:
+        raise ValueError(f"save_every must be at least 1, got {save_every}")
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    with phase("model_load"):
+        model, cfg = load_simulation_model(config_name, model_dir, device)
+        pes = load_or_build_spline(model, config_name, model_dir) if use_spline else model
+
+    # ---------- Time advancement (a batch of one trajectory) ----------
+    start = time.perf_counter()
+    with phase("integration"):
+        result = run_batch_trajectories(
+            pes,
+            [[init_x1, init_x2, init_x3]],
+            [[init_v1, init_v2, init_v3]],
+            steps=steps,
+            dt=dt,
+            integrator=integrator,
+            adaptive=adaptive,
+            max_displacement=max_displacement,
+            record_every=save_every,
+            device=device,
+            on_progress=on_progress,
         )
-        Elist.append(float(E.detach().cpu().item()))
-
-        # Calculate forces (gradient of potential with respect to r)
-        model.zero_grad(set_to_none=True)
-        if input_tensor.grad is not None:
-            input_tensor.grad.zero_()
-        output.backward()
-        predictions = input_tensor.grad / 0.529
-        F1 = -predictions[0][0]
-        F2 = predictions[0][0] - predictions[0][1]
-        F3 = predictions[0][1]
-
-        # Velocity-position update (simple explicit integration, consistent with original version)
-        x1 = float(x1 + v1 * dt * 1e10)
-        x2 = float(x2 + v2 * dt * 1e10)
-        x3 = float(x3 + v3 * dt * 1e10)
-        a1, a2, a3 = F1 / m11, F2 / m21, F3 / m31
-        v1 = v1 + float(a1) * dt
-        v2 = v2 + float(a2) * dt
-        v3 = v3 + float(a3) * dt
+    seconds = time.perf_counter() - start
+    # Steps up to and including the one that left the domain keep their coordinates and potential;
+    # the total energy is only recorded for steps that were integrated (NaN otherwise)
+    if int(result["exit_step"][0]) >= 0:
+        print("break")
+    kept = np.isfinite(result["times"][:, 0])
+    time_list = result["times"][kept, 0]
+    coordinates_list = result["trajectory"][kept, 0]
+    potential_list = result["potential"][kept, 0]
+    energy_kept = np.isfinite(result["energy"][:, 0])
+    Elist = result["energy"][energy_kept, 0]
+    rlist = np.column_stack(
+        (coordinates_list[:, 0] - coordinates_list[:, 1], coordinates_list[:, 1] - coordinates_list[:, 2])
+    )
+    drift = energy_diagnostics(result)
+    print(f"Energy drift ({integrator}{', adaptive' if adaptive else ''}): "
+          f"final {drift['max_abs_drift']:.3e} eV, max deviation {drift['max_deviation']:.3e} eV")
+    with phase("logging"):
+        log_md_metrics(f"MD_{config_name}", result, seconds, steps, record_every=save_every)
 
     # ---------- Save CSV trajectory ----------
-    df = pd.DataFrame(coordinates_list, columns=["Ne(x1)", "H(x2)", "H(x3)"])
-    df.insert(0, "Time", time_list)
-    df.insert(1, "Potential", potential_list)
-    csv_path = f"{model_dir}/simulation_results.csv"
-    df.to_csv(csv_path, index=False)
-
-    # ---------- XYZ export ----------
-    df_xyz = pd.read_csv(csv_path)
-    trajectory_path = f"{model_dir}/{config_name}_trajectory.xyz"
-    with open(trajectory_path, "w") as f:
-        for _, row in df_xyz.iterrows():
-            f.write("3\n")
-            f.write(f"Time = {row['Time']:.5e} seconds\n")
-            f.write(f"Ne {row['Ne(x1)']} 0 0\n")
-            f.write(f"H {row['H(x2)']} 0 0\n")
-            f.write(f"H {row['H(x3)']} 0 0\n")
-    print("XYZ file created successfully: " + trajectory_path)
+    with phase("output"):
+        df = pd.DataFrame(coordinates_list, columns=["Ne(x1)", "H(x2)", "H(x3)"])
+        df.insert(0, "Time", time_list)
+        df.insert(1, "Potential", potential_list)
+        csv_path = f"{model_dir}/simulation_results.csv"
+        df.to_csv(csv_path, index=False)
 
+        # ---------- XYZ and binary export, straight from the recorded arrays ----------
+        trajectory_path = write_xyz(f"{model_dir}/{config_name}_trajectory.xyz", time_list, coordinates_list)
+        print("XYZ file created successfully: " + trajectory_path)
+        trj_path = save_trajectory(
+            f"{model_dir}/{config_name}_trajectory.trj", result["times"], result["trajectory"], result["potential"],
+            result["energy"], stride=save_every, metadata={"dt": dt, "integrator": integrator, "adaptive": adaptive},
+        )
     # ---------- Contour + MD trajectory ----------
-    r12_values = np.linspace(0.5, 4.0, 100)
-    r23_values = np.linspace(0.5, 4.0, 100)
-    R12, R23 = np.meshgrid(r12_values, r23_values)
-    Potential = np.zeros_like(R12, dtype=np.float32)
-
-    # No gradient needed when evaluating potential, no_grad speeds up
-    with torch.no_grad():
-        for i in range(R12.shape[0]):
-            for j in range(R12.shape[1]):
-                input_tensor = torch.tensor([[R12[i, j], R23[i, j]]], dtype=torch.float32, device=device)
-                out = model(input_tensor)
-                Potential[i, j] = float(out.detach().cpu().item())
-
-    rlist1 = np.array(rlist)
-    plt.figure(figsize=(12, 9))
-    plt.contour(R12, R23, Potential, levels=100, cmap="viridis")
-    if len(rlist1) > 0:
-        plt.scatter(rlist1[:, 0], rlist1[:, 1], color="red")
-    plt.xlabel("Ne-H", fontsize=24, fontname="Arial", fontweight="bold")
-    plt.ylabel("H-H", fontsize=24, fontname="Arial", fontweight="bold")
-    plt.title("MD Simulation", fontsize=28, fontname="Arial", fontweight="bold")
-    plt.xticks(fontsize=18, fontname="Arial")
-    plt.yticks(fontsize=18, fontname="Arial")
-    plt.savefig(f"{model_dir}/{config_name}_MD.png")
-
-    # ---------- Energy curve ----------
-    plt.figure(figsize=(12, 9))
-    plt.plot(range(len(Elist)), Elist, marker='o', linestyle='-', color='b', label='Line')
-    plt.title('Total Energy')
-    plt.xlabel('iteration')
-    plt.ylabel('Total Energy')
-    plt.savefig(f"{model_dir}/{config_name}_Energy.png")
+    with phase("plotting"):
+        import matplotlib.pyplot as plt  # deferred: only single-trajectory runs plot
+
+        R12, R23, Potential = PESEvaluator(model).grid((0.5, 4.0), (0.5, 4.0), 100)
+
+        rlist1 = np.array(rlist)
+        plt.figure(figsize=(12, 9))
+        plt.contour(R12, R23, Potential, levels=100, cmap="viridis")
+        if len(rlist1) > 0:
+            plt.scatter(rlist1[:, 0], rlist1[:, 1], color="red")
+        plt.xlabel("Ne-H", fontsize=24, fontname="Arial", fontweight="bold")
+        plt.ylabel("H-H", fontsize=24, fontname="Arial", fontweight="bold")
+        plt.title("MD Simulation", fontsize=28, fontname="Arial", fontweight="bold")
+        plt.xticks(fontsize=18, fontname="Arial")
+        plt.yticks(fontsize=18, fontname="Arial")
+        plt.savefig(f"{model_dir}/{config_name}_MD.png")
+
+        # ---------- Energy curve ----------
+        plt.figure(figsize=(12, 9))
+        plt.plot(np.flatnonzero(energy_kept) * save_every, Elist, marker='o', linestyle='-', color='b', label='Line')
+        plt.title('Total Energy')
+        plt.xlabel('iteration')
+        plt.ylabel('Total Energy (eV)')
+        plt.savefig(f"{model_dir}/{config_name}_Energy.png")
 
     return {
         "csv_path": csv_path,
         "xyz_path": trajectory_path,
+        "trj_path": trj_path,
         "energy_plot": f"{model_dir}/{config_name}_Energy.png",
+        "energy_drift": drift,
         "md_plot": f"{model_dir}/{config_name}_MD.png",
     }
+
+
+def run_ensemble_simulation(
+    config_name: str,
+    model_dir: str,
+    n_trajectories: int = 1000,
+    steps: int = 60000,
+    dt: float = 10e-19,
+    init_x1: float = 3.0,
+    init_x2: float = 0.0,
+    init_x3: float = -1.108,
+    v_impact: float = -20000,
+    v_spread: float = 0.0,
+    vib_amplitude: float = 0.0,
+    vib_wavenumber: float = 0.0,
+    seed=None,
+    integrator: str = "euler",
+    adaptive: bool = False,
+    max_displacement: float = 5e-4,
+    use_spline: bool = False,
+    save_every: int = 0,
+):
+    """
+    Run a reactive-scattering ensemble and summarise the outcomes.
+
+    Samples initial conditions with sample_initial_conditions, propagates all trajectories together and
+    writes one row per trajectory (initial conditions, exit step, outcome, final positions, energy drift)
+    to `ensemble_results.csv` in the model directory. With `save_every` > 0 every k-th frame of all
+    trajectories is streamed to `ensemble_trajectory.trj` in chunks (read it with trajectory_io.read_trajectory).
+    """
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    with phase("model_load"):
+        model, _ = load_simulation_model(config_name, model_dir, device)
+        pes = load_or_build_spline(model, config_name, model_dir) if use_spline else model
+    positions, velocities = sample_initial_conditions(
+        n_trajectories, init_x1, init_x2, init_x3, v_impact, v_spread, vib_amplitude, vib_wavenumber, seed
+    )
+    recorder = None
+    if save_every:
+        recorder = TrajectoryWriter(
+            f"{model_dir}/ensemble_trajectory.trj", n_trajectories, stride=save_every,
+            metadata={"dt": dt, "integrator": integrator, "adaptive": adaptive},
+        )
+    start = time.perf_counter()
+    try:
+        with phase("integration"):
+            result = run_batch_trajectories(
+                pes, positions, velocities, steps=steps, dt=dt, integrator=integrator, adaptive=adaptive,
+                max_displacement=max_displacement, recorder=recorder, device=device,
+            )
+    finally:
+        if recorder is not None:
+            recorder.close()
+    seconds = time.perf_counter() - start
+
+    df = pd.DataFrame({
+        "x1_0": positions[:, 0], "x2_0": positions[:, 1], "x3_0": positions[:, 2],
+        "v1_0": velocities[:, 0], "v2_0": velocities[:, 1], "v3_0": velocities[:, 2],
+        "exit_step": result["exit_step"],
+        "outcome": [OUTCOMES[k] for k in result["outcome"]],
+        "x1": result["positions"][:, 0], "x2": result["positions"][:, 1], "x3": result["positions"][:, 2],
+        "time": result["time"],
+        "energy_drift": result["energy_final"] - result["energy_initial"],
+        "energy_max_deviation": result["energy_max_deviation"],
+    })
+    csv_path = f"{model_dir}/ensemble_results.csv"
+    with phase("output"):
+        df.to_csv(csv_path, index=False)
+
+    counts = df["outcome"].value_counts()
+    summary = {name: int(counts.get(name, 0)) for name in OUTCOMES}
+    print(f"Ensemble of {n_trajectories} trajectories: " + ", ".join(f"{k}={v}" for k, v in summary.items()))
+    drift = energy_diagnostics(result)
+    print(f"Energy drift ({integrator}{', adaptive' if adaptive else ''}): mean {drift['mean_abs_drift']:.3e} eV, "
+          f"max {drift['max_abs_drift']:.3e} eV, max deviation {drift['max_deviation']:.3e} eV")
+    with phase("logging"):
+        log_md_metrics(f"MD_ensemble_{config_name}", result, seconds, steps)
+    print("Ensemble results written: " + csv_path)
+    if recorder is not None:
+        print(f"Trajectory frames written: {recorder.path} ({recorder.frames} frames)")
+    return {"csv_path": csv_path, "trj_path": recorder.path if recorder else None, "outcomes": summary,
+            "energy_drift": drift}
+
@@ -0,0 +1,236 @@
+"""
+Minimum energy paths and transition states on a learned PES.
+
+Nudged elastic band: a chain of (r12, r23) images between two geometries is relaxed with FIRE, every iteration
+evaluating all images in one batched energy+gradient call (model.NeuralNetwork's fused pass, a PESEvaluator or a
+SplinePES table). Images feel only the perpendicular part of the true force plus a spring force along the
+improved tangent; once the band is close to converged, the highest image climbs to the saddle point. The result
+gives the barrier heights, the saddle geometry and the whole path.
+"""
+
+import json
+import os
+import numpy as np
+import torch
+
+from pes_evaluator import PESEvaluator
+
+PATH_FIELDS = ("image", "s", "x", "y", "E")
+
+
+def interpolate_path(start, end, n_images: int):
+    """
+    Straight line of `n_images` (r12, r23) images from `start` to `end`, endpoints included.
+    """
+    t = np.linspace(0.0, 1.0, n_images)[:, None]
+    start = np.asarray(start, dtype=np.float64)
+    end = np.asarray(end, dtype=np.float64)
+    return (1 - t) * start + t * end
+
+
+def _tangents(path, energy):
+    """
+    Improved tangents (Henkelman & Jonsson 2000) of the interior images, shape (n_images - 2, 2).
+
+    The tangent points to the higher neighbour; at extrema of the profile the two segment directions are
+    mixed by the energy differences, which keeps the band from kinking.
+    """
+    forward = path[2:] - path[1:-1]
+    backward = path[1:-1] - path[:-2]
+    e_prev, e_mid, e_next = energy[:-2], energy[1:-1], energy[2:]
+    d_next, d_prev = e_next - e_mid, e_mid - e_prev
+    d_max = torch.maximum(d_next.abs(), d_prev.abs())[:, None]
+    d_min = torch.minimum(d_next.abs(), d_prev.abs())[:, None]
+    mixed = torch.where((e_next > e_prev)[:, None], forward * d_max + backward * d_min,
+                        forward * d_min + backward * d_max)
+    tangent = torch.where(((e_next > e_mid) & (e_mid > e_prev))[:, None], forward,
+                          torch.where(((e_next < e_mid) & (e_mid < e_prev))[:, None], backward, mixed))
+    return tangent / tangent.norm(dim=1, keepdim=True).clamp_min(1e-12)
+
+
+def neb_forces(path, energy, gradient, spring: float, climbing: int = None):
+    """
+    NEB forces on the interior images.
+
+    Args:
+        path (torch.Tensor): (n_images, 2) image coordinates
+        energy (torch.Tensor): (n_images,) energies
+        gradient (torch.Tensor): (n_images, 2) dE/d(r12, r23)
+        spring (float): spring constant (energy / Angstrom^2)
+        climbing (int): interior index (0-based, without the first endpoint) of the climbing image, or None
+
+    Returns:
+        torch.Tensor: (n_images - 2, 2) forces
+    """
+    tangent = _tangents(path, energy)
+    g = gradient[1:-1]
+    g_parallel = (g * tangent).sum(dim=1, keepdim=True)
+    lengths = (path[1:] - path[:-1]).norm(dim=1)
+    spring_force = spring * (lengths[1:] - lengths[:-1])[:, None] * tangent
+    forces = -(g - g_parallel * tangent) + spring_force
+    if climbing is not None:
+        # no spring, inverted parallel force: the image moves uphill along the band and downhill across it
+        forces[climbing] = -g[climbing] + 2 * g_parallel[climbing] * tangent[climbing]
+    return forces
+
+
+def _hold_at_bounds(path, forces, lower, upper):
+    """
+    Drop force components pushing images that sit on the box further out, so pinned images count as relaxed.
+    """
+    interior = path[1:-1]
+    outward = ((interior <= lower) & (forces < 0)) | ((interior >= upper) & (forces > 0))
+    return forces.masked_fill(outward, 0.0)
+
+
+def run_neb(
+    model,
+    start,
+    end,
+    n_images: int = 17,
+    path=None,
+    spring: float = None,
+    climb: bool = True,
+    fmax: float = None,
+    climb_threshold: float = 10.0,
+    max_steps: int = 2000,
+    max_step: float = 0.02,
+    bounds=None,
+    device=None,
+):
+    """
+    Relax a nudged elastic band between two (r12, r23) geometries.
+
+    All images are evaluated in one batched call per iteration and moved together with FIRE. Forces are
+    scaled by the largest initial force for the integrator, so the same step settings serve networks in any
+    energy unit.
+
+    Args:
+        model: PES network, PESEvaluator or SplinePES (anything with energy_and_gradient_tensor)
+        start, end: (r12, r23) endpoints in Angstrom, kept fixed
+        n_images (int): images including the endpoints
+        path (array-like): initial (n_images, 2) path instead of the straight line
+        spring (float): spring constant; by default the initial energy span over (path length * segment length)
+        climb (bool): switch on the climbing image once the band is converged to climb_threshold * fmax
+        fmax (float): convergence threshold on the largest image force, default 1e-3 of the largest initial force
+        climb_threshold (float): see climb
+        max_steps (int): FIRE iterations
+        max_step (float): largest displacement of any image per iteration (Angstrom)
+        bounds (tuple): ((r12_min, r12_max), (r23_min, r23_max)) box the images are kept in, e.g. the
+            training grid outside which the network is meaningless; None leaves them free
+        device: torch device, defaults to the evaluator's
+
+    Returns:
+        dict: "path" (n_images, 2), "energy" (n_images,), "s" (arc length), "saddle" {"image", "x", "y", "E"},
+            "barrier_forward", "barrier_reverse", "max_force", "spring", "steps", "converged", "climbing"
+    """
+    # PESEvaluator, SplinePES or anything else providing energy_and_gradient_tensor
+    evaluator = model if hasattr(model, "energy_and_gradient_tensor") else PESEvaluator(model, device=device)
+    device = torch.device(device) if device is not None else evaluator.device
+
+    if path is None:
+        path = interpolate_path(start, end, n_images)
+    path = torch.as_tensor(np.asarray(path, dtype=np.float64), device=device).clone()
+    n_images = path.shape[0]
+    if n_images < 3:
+        raise ValueError("NEB needs at least one image between the endpoints")
+
+    if bounds is not None:
+        lower = torch.tensor([bounds[0][0], bounds[1][0]], dtype=path.dtype, device=device)
+        upper = torch.tensor([bounds[0][1], bounds[1][1]], dtype=path.dtype, device=device)
+
+    def evaluate(r):
+        energy, gradient = evaluator.energy_and_gradient_tensor(r)
+        return energy.double(), gradient.double()
+
+    energy, gradient = evaluate(path)
+    if spring is None:
+        length = (path[1:] - path[:-1]).norm(dim=1).sum()
+        span = (energy.max() - energy.min()).clamp_min(1e-12)
+        spring = float(span / (length * length / (n_images - 1)))
+    forces = neb_forces(path, energy, gradient, spring)
+    if bounds is not None:
+        forces = _hold_at_bounds(path, forces, lower, upper)
+    force_scale = float(forces.norm(dim=1).max().clamp_min(1e-12))
+    fmax = fmax if fmax is not None else 1e-3 * force_scale
+
+    # FIRE (Bitzek et al. 2006) on the whole band, in scaled forces
+    dt, dt_max, alpha, n_positive = 0.1, 1.0, 0.1, 0
+    velocity = torch.zeros_like(forces)
+    climbing, converged, step = None, False, 0
+    for step in range(1, max_steps + 1):
+        max_force = float(forces.norm(dim=1).max())
+        if climb and climbing is None and max_force < climb_threshold * fmax:
+            climbing = int(torch.argmax(energy[1:-1]))
+            forces = neb_forces(path, energy, gradient, spring, climbing)
+            if bounds is not None:
+                forces = _hold_at_bounds(path, forces, lower, upper)
+        elif max_force < fmax and (climbing is not None or not climb):
+            converged = True
+            break
+
+        scaled = forces / force_scale
+        power = float((scaled * velocity).sum())
+        if power > 0:
+            velocity = (1 - alpha) * velocity + alpha * velocity.norm() * scaled / scaled.norm().clamp_min(1e-12)
+            n_positive += 1
+            if n_positive > 5:
+                dt = min(dt * 1.1, dt_max)
+                alpha *= 0.99
+        else:
+            velocity = torch.zeros_like(velocity)
+            dt, alpha, n_positive = dt * 0.5, 0.1, 0
+        velocity = velocity + dt * scaled
+        displacement = dt * velocity
+        displacement = displacement * (max_step / displacement.norm(dim=1, keepdim=True).clamp_min(max_step))
+        path[1:-1] += displacement
+        if bounds is not None:
+            path[1:-1] = torch.maximum(torch.minimum(path[1:-1], upper), lower)
+
+        energy, gradient = evaluate(path)
+        if climbing is not None:
+            climbing = int(torch.argmax(energy[1:-1]))
+        forces = neb_forces(path, energy, gradient, spring, climbing)
+        if bounds is not None:
+            forces = _hold_at_bounds(path, forces, lower, upper)
+
+    path_np = path.cpu().numpy()
+    energy_np = energy.cpu().numpy()
+    saddle = climbing + 1 if climbing is not None else int(np.argmax(energy_np[1:-1])) + 1
+    s = np.concatenate(([0.0], np.cumsum(np.linalg.norm(np.diff(path_np, axis=0), axis=1))))
+    return {
+        "path": path_np,
+        "energy": energy_np,
+        "s": s,
+        "saddle": {"image": saddle, "x": float(path_np[saddle, 0]), "y": float(path_np[saddle, 1]),
+                   "E": float(energy_np[saddle])},
+        "barrier_forward": float(energy_np[saddle] - energy_np[0]),
+        "barrier_reverse": float(energy_np[saddle] - energy_np[-1]),
+        "max_force": float(forces.norm(dim=1).max()),
+        "spring": spring,
+        "steps": step,
+        "converged": converged,
+        "climbing": climbing is not None,
+    }
+
+
+def save_neb(result, out_dir: str, prefix: str = "neb"):
+    """
+    Write `<prefix>_path.csv` (image, s, x, y, E) and a `<prefix>_summary.json` with barrier and saddle.
+
+    Returns:
+        tuple: (csv path, json path)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    csv_path = os.path.join(out_dir, f"{prefix}_path.csv")
+    json_path = os.path.join(out_dir, f"{prefix}_summary.json")
+    table = np.column_stack((np.arange(len(result["s"])), result["s"], result["path"], result["energy"]))
+    np.savetxt(csv_path, table, delimiter=",", header=",".join(PATH_FIELDS), comments="",
+               fmt=["%d", "%.8f", "%.8f", "%.8f", "%.10g"])
+    summary = {k: result[k] for k in ("saddle", "barrier_forward", "barrier_reverse", "max_force", "spring",
+                                      "steps", "converged", "climbing")}
+    summary["start"] = result["path"][0].tolist()
+    summary["end"] = result["path"][-1].tolist()
+    with open(json_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    return csv_path, json_path
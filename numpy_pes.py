@@ -0,0 +1,290 @@
+"""
+Torch-free inference for trained PES networks.
+
+Torch-free inference: exports a NeuralNetwork state dict to a plain `.npz` (weights + architecture metadata),
+evaluates energies, gradients and forces with vectorized NumPy, and fans evaluation out to worker processes
+that never import torch. Command line use:
+
+    python numpy_pes.py 2-64/2-64.npz points.csv --out predictions.csv --processes 4
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import multiprocessing
+import os
+import numpy as np
+
+FORMAT_VERSION = 1
+BOHR = 0.529    # Angstrom, as in train.forces_from_gradient
+
+
+# ---------- Activations: value and derivative ----------
+def _erf(z):
+    """
+    erf via Abramowitz & Stegun 7.1.26 (absolute error < 1.5e-7, below float32 network noise).
+    """
+    s = np.sign(z)
+    a = np.abs(z)
+    t = 1.0 / (1.0 + 0.3275911 * a)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return s * (1.0 - poly * np.exp(-a * a))
+
+
+def _sigmoid(z):
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+
+def _softplus(z):
+    # stable log(1 + exp(z)); np.logaddexp is several times slower
+    return np.maximum(z, 0.0) + np.log1p(np.exp(-np.abs(z)))
+
+
+def _mish(z, **_):
+    t = np.tanh(_softplus(z))
+    return z * t, t + z * _sigmoid(z) * (1 - t * t)
+
+
+def _relu(z, **_):
+    return np.maximum(z, 0.0), (z > 0).astype(z.dtype)
+
+
+def _leaky_relu(z, negative_slope=0.01, **_):
+    return np.where(z > 0, z, negative_slope * z), np.where(z > 0, 1.0, negative_slope)
+
+
+def _elu(z, alpha=1.0, **_):
+    e = alpha * np.exp(np.minimum(z, 0.0))
+    return np.where(z > 0, z, e - alpha), np.where(z > 0, 1.0, e)
+
+
+def _gelu(z, approximate="none", **_):
+    if approximate == "tanh":
+        k = math.sqrt(2 / math.pi)
+        t = np.tanh(k * (z + 0.044715 * z ** 3))
+        return 0.5 * z * (1 + t), 0.5 * (1 + t) + 0.5 * z * (1 - t * t) * k * (1 + 3 * 0.044715 * z * z)
+    cdf = 0.5 * (1 + _erf(z / math.sqrt(2)))
+    return z * cdf, cdf + z * np.exp(-0.5 * z * z) / math.sqrt(2 * math.pi)
+
+
+def _silu(z, **_):
+    s = _sigmoid(z)
+    return z * s, s * (1 + z * (1 - s))
+
+
+def _tanh(z, **_):
+    t = np.tanh(z)
+    return t, 1 - t * t
+
+
+ACTIVATIONS = {
+    "Mish": _mish,
+    "ReLU": _relu,
+    "LeakyReLU": _leaky_relu,
+    "ELU": _elu,
+    "GELU": _gelu,
+    "SiLU": _silu,
+    "Tanh": _tanh,
+}
+# constructor arguments of the torch activation modules that change their shape
+_ACTIVATION_PARAMETERS = ("negative_slope", "alpha", "approximate")
+
+
+def forces_from_gradient(gradient):
+    """
+    NumPy twin of train.forces_from_gradient: dE/d(r12, r23) -> (F2, F3, F1) like the z2, z3, z4 labels.
+    """
+    gradient = np.asarray(gradient) / BOHR
+    return np.stack((gradient[:, 0] - gradient[:, 1], gradient[:, 1], -gradient[:, 0]), axis=1)
+
+
+# ---------- Export ----------
+def export_npz(model, path: str, activation: str = None):
+    """
+    Write a NeuralNetwork (or its state dict) as plain arrays plus JSON architecture metadata.
+
+    Only `.detach().cpu().numpy()` is called on the tensors, so this module itself never imports torch.
+
+    Args:
+        model: model.NeuralNetwork, or a state dict of one (then `activation` is required)
+        path (str): output `.npz` path
+        activation (str): activation name, defaults to the model's activation module
+    """
+    state = model.state_dict() if hasattr(model, "state_dict") else model
+    module = getattr(model, "activation", None)
+    name = activation or type(module).__name__
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Activation {name} has no NumPy implementation (supported: {', '.join(ACTIVATIONS)})")
+    params = {p: getattr(module, p) for p in _ACTIVATION_PARAMETERS if module is not None and hasattr(module, p)}
+
+    arrays = {k: v.detach().cpu().numpy() for k, v in state.items()}
+    num_layers = sum(1 for k in arrays if k.startswith("layers.") and k.endswith(".weight"))
+    metadata = {
+        "format_version": FORMAT_VERSION,
+        "activation": name,
+        "activation_parameters": params,
+        "num_layers": num_layers,
+        "input_dim": int(arrays["layers.0.weight"].shape[1]),
+        "hidden_dim": int(arrays["layers.0.weight"].shape[0]),
+        "output_dim": int(arrays["output_layer.weight"].shape[0]),
+    }
+    np.savez(path, metadata=np.array(json.dumps(metadata)), **arrays)
+    return path
+
+
+# ---------- Inference ----------
+class NumpyPES:
+    """
+    NumPy evaluator of an exported PES network.
+
+    Energies and input gradients come from one forward pass that carries the (input_dim, N, width) Jacobian
+    next to the activations, mirroring model.NeuralNetwork.energy_and_gradient.
+
+    Args:
+        weights (list): [(W, b), ...] hidden layers then the output layer, W of shape (out, in)
+        activation (str): key of ACTIVATIONS
+        activation_parameters (dict): e.g. {"negative_slope": 0.01}
+        chunk_size (int): rows evaluated at once; small chunks keep the temporaries in cache
+        dtype: compute precision, np.float32 roughly halves the time of large batches
+    """
+
+    def __init__(self, weights, activation: str = "Mish", activation_parameters=None, chunk_size: int = 1024,
+                 dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.weights = [(np.ascontiguousarray(W.T, dtype=self.dtype), b.astype(self.dtype)) for W, b in weights]
+        self.activation = activation
+        self.activation_parameters = dict(activation_parameters or {})
+        self._activate = ACTIVATIONS[activation]
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def load(cls, path: str, chunk_size: int = 1024, dtype=np.float64):
+        with np.load(path) as data:
+            metadata = json.loads(str(data["metadata"]))
+            weights = [(data[f"layers.{i}.weight"], data[f"layers.{i}.bias"]) for i in range(metadata["num_layers"])]
+            weights.append((data["output_layer.weight"], data["output_layer.bias"]))
+        return cls(weights, metadata["activation"], metadata["activation_parameters"], chunk_size, dtype)
+
+    def _forward(self, x, with_gradient):
+        h, jacobian = x, None
+        for W, b in self.weights[:-1]:
+            z = h @ W + b
+            h, slope = self._activate(z, **self.activation_parameters)
+            if with_gradient:
+                jacobian = W[:, None, :] if jacobian is None else jacobian @ W
+                jacobian = jacobian * slope
+        W, b = self.weights[-1]
+        energy = (h @ W + b)[:, 0]
+        if not with_gradient:
+            return energy, None
+        return energy, (jacobian @ W.sum(axis=1)).T
+
+    def _evaluate(self, points, with_gradient):
+        points = np.asarray(points, dtype=self.dtype).reshape(-1, self.weights[0][0].shape[0])
+        energy = np.empty(len(points))
+        gradient = np.empty(points.shape, dtype=np.float64) if with_gradient else None
+        for start in range(0, len(points), self.chunk_size):
+            end = start + self.chunk_size
+            e, g = self._forward(points[start:end], with_gradient)
+            energy[start:end] = e
+            if with_gradient:
+                gradient[start:end] = g
+        return energy, gradient
+
+    def energy(self, points):
+        """
+        Energies at (N, 2) points.
+        """
+        return self._evaluate(points, False)[0]
+
+    def energy_and_gradient(self, points):
+        """
+        Energies and dE/d(r12, r23) at (N, 2) points.
+
+        Returns:
+            tuple: (energy (N,), gradient (N, 2)) as float64 arrays
+        """
+        return self._evaluate(points, True)
+
+    def energy_and_forces(self, points):
+        """
+        Energies and forces ordered like the z2, z3, z4 dataset labels.
+        """
+        energy, gradient = self._evaluate(points, True)
+        return energy, forces_from_gradient(gradient)
+
+
+# ---------- Worker processes ----------
+_WORKER_PES = None
+_THREAD_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+@contextlib.contextmanager
+def _single_threaded_children():
+    """
+    One BLAS thread per spawned worker, so N workers use N cores. Children read these at NumPy import,
+    before any initializer runs, so they are set in the parent while the pool starts.
+    """
+    saved = {var: os.environ.get(var) for var in _THREAD_VARIABLES}
+    os.environ.update({var: "1" for var in _THREAD_VARIABLES})
+    try:
+        yield
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def _init_worker(path):
+    global _WORKER_PES
+    _WORKER_PES = NumpyPES.load(path)
+
+
+def _worker_energy_and_forces(points):
+    return _WORKER_PES.energy_and_forces(points)
+
+
+def parallel_energy_and_forces(path: str, points, processes: int = None, chunk_size: int = 65536):
+    """
+    Energies and forces of many points, split over worker processes.
+
+    Workers are started with the "spawn" method and import only this module and NumPy, so start-up costs
+    milliseconds instead of a torch import; each loads the `.npz` once.
+
+    Returns:
+        tuple: (energy (N,), forces (N, 3)) as float64 arrays
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    chunks = [points[i:i + chunk_size] for i in range(0, len(points), chunk_size)]
+    processes = max(1, min(processes or os.cpu_count() or 1, len(chunks)))
+    if processes == 1:
+        return NumpyPES.load(path).energy_and_forces(points)
+    context = multiprocessing.get_context("spawn")
+    with _single_threaded_children():
+        pool = context.Pool(processes, initializer=_init_worker, initargs=(os.path.abspath(path),))
+    with pool:
+        results = pool.map(_worker_energy_and_forces, chunks)
+    return np.concatenate([e for e, _ in results]), np.concatenate([f for _, f in results])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate an exported PES network (.npz) without torch")
+    parser.add_argument("weights", help="Exported network (.npz, see main.py export-npz)")
+    parser.add_argument("points", help="CSV with x and y columns")
+    parser.add_argument("--out", default="predictions.csv", help="Output CSV with x, y, z1..z4 columns")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes")
+    args = parser.parse_args(argv)
+
+    table = np.genfromtxt(args.points, delimiter=",", names=True)
+    points = np.column_stack((table["x"], table["y"]))
+    energy, forces = parallel_energy_and_forces(args.weights, points, processes=args.processes)
+    np.savetxt(args.out, np.column_stack((points, energy, forces)), delimiter=",",
+               header="x,y,z1,z2,z3,z4", comments="")
+    print(f"{len(points)} points evaluated, written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Batched PES evaluation.
+
+Batched PES evaluator: wraps a trained network and evaluates energies, gradients and forces for arbitrary
+point sets or regular grids in device-sized chunks under a memory budget, returning NumPy arrays.
+"""
+
+import contextlib
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+
+class PESEvaluator:
+    """
+    Evaluate a (r12, r23) -> energy network in fixed-size chunks.
+
+    The chunk size follows from `memory_budget_mb` and the widest layer of the network, so peak memory stays
+    bounded whatever the number of points; input and output buffers are allocated once per evaluator and reused.
+    Predictions run in eval mode, and a model that was in training mode is switched back afterwards.
+
+    Args:
+        model (nn.Module): trained network (e.g. model.NeuralNetwork)
+        device: torch device, defaults to the model's
+        memory_budget_mb (float): activation memory allowed per chunk
+        chunk_size (int): explicit chunk size, overrides the budget
+    """
+
+    def __init__(self, model, device=None, memory_budget_mb: float = 64, chunk_size: int = None):
+        self.model = model
+        params = next(model.parameters(), None)
+        self.device = torch.device(device) if device is not None else (
+            params.device if params is not None else torch.device("cpu"))
+        self.dtype = params.dtype if params is not None else torch.float32
+        self.memory_budget_mb = memory_budget_mb
+        self.chunk_size = int(chunk_size) if chunk_size else self._chunk_from_budget(memory_budget_mb)
+        self._inputs = None
+
+    def _chunk_from_budget(self, memory_budget_mb):
+        """
+        Rows per chunk such that forward + backward activations fit in the budget.
+        """
+        linear = [m for m in self.model.modules() if isinstance(m, nn.Linear)]
+        width = max((m.out_features for m in linear), default=64)
+        # every layer keeps pre- and post-activation values, doubled again by the backward pass
+        bytes_per_row = 4 * width * 2 * max(len(linear), 1) * 2
+        return max(1024, int(memory_budget_mb * 2 ** 20 // bytes_per_row))
+
+    @contextlib.contextmanager
+    def _eval_mode(self):
+        """
+        Evaluate without dropout, leaving the caller's model in the mode it was in.
+        """
+        was_training = self.model.training
+        if was_training:
+            self.model.eval()
+        try:
+            yield
+        finally:
+            if was_training:
+                self.model.train()
+
+    def _input_buffer(self, rows):
+        if self._inputs is None or self._inputs.shape[0] < rows:
+            self._inputs = torch.empty((rows, 2), dtype=self.dtype, device=self.device)
+        return self._inputs[:rows]
+
+    def _load_chunk(self, points, start, end):
+        """
+        Input buffer filled with points[start:end]; read-only arrays (e.g. memory-mapped .npy) are copied
+        chunk by chunk, since torch.from_numpy warns on non-writable memory.
+        """
+        inputs = self._input_buffer(end - start)
+        inputs.copy_(torch.from_numpy(np.require(points[start:end], requirements="W")))
+        return inputs
+
+    def _chunks(self, n):
+        for start in range(0, n, self.chunk_size):
+            yield start, min(start + self.chunk_size, n)
+
+    def energy_and_gradient_tensor(self, r):
+        """
+        Energies and dE/d(r12, r23) for a device tensor.
+
+        Uses the model's fused energy_and_gradient pass when it has one (model.NeuralNetwork), otherwise
+        one forward and one autograd.grad call. Used by the MD engine, which keeps its state on the device
+        and batches trajectories itself.
+
+        Returns:
+            tuple: (energy (N,), gradient (N, 2)), both detached
+        """
+        if hasattr(self.model, "energy_and_gradient"):
+            with self._eval_mode(), torch.no_grad():
+                output, gradient = self.model.energy_and_gradient(r.to(self.dtype))
+            return output.reshape(-1), gradient
+        r = r.to(self.dtype).detach().requires_grad_(True)
+        with self._eval_mode(), torch.enable_grad():
+            output = self.model(r).reshape(-1)
+            gradient = torch.autograd.grad(output.sum(), r)[0]
+        return output.detach(), gradient
+
+    def energy(self, points):
+        """
+        Energies at (N, 2) points.
+
+        Returns:
+            np.ndarray: float64 array of shape (N,)
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        out = np.empty(len(points))
+        out_view = torch.from_numpy(out)
+        with self._eval_mode(), torch.no_grad():
+            for start, end in self._chunks(len(points)):
+                inputs = self._load_chunk(points, start, end)
+                out_view[start:end].copy_(self.model(inputs).reshape(-1))
+        return out
+
+    def energy_and_gradient(self, points):
+        """
+        Energies and dE/d(r12, r23) at (N, 2) points.
+
+        Returns:
+            tuple: (energy (N,), gradient (N, 2)) as float64 arrays
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        energy = np.empty(len(points))
+        gradient = np.empty((len(points), 2))
+        energy_view, gradient_view = torch.from_numpy(energy), torch.from_numpy(gradient)
+        with self._eval_mode():
+            for start, end in self._chunks(len(points)):
+                inputs = self._load_chunk(points, start, end)
+                e, g = self.energy_and_gradient_tensor(inputs)
+                energy_view[start:end].copy_(e)
+                gradient_view[start:end].copy_(g)
+        return energy, gradient
+
+    def energy_and_forces(self, points):
+        """
+        Energies and forces at (N, 2) points, forces ordered like the z2, z3, z4 dataset labels.
+
+        Returns:
+            tuple: (energy (N,), forces (N, 3)) as float64 arrays
+        """
+        from train import forces_from_gradient  # train imports utils, which imports this module
+
+        energy, gradient = self.energy_and_gradient(points)
+        return energy, forces_from_gradient(torch.from_numpy(gradient)).numpy()
+
+    def grid(self, x_range=(0.5, 4.0), y_range=(0.5, 4.0), n=100):
+        """
+        Energies on a regular grid, with points generated chunk by chunk on the device.
+
+        Args:
+            x_range (tuple): (min, max) of the first input
+            y_range (tuple): (min, max) of the second input
+            n (int | tuple): points per axis, or (nx, ny)
+
+        Returns:
+            tuple: (X, Y, E) arrays of shape (ny, nx), as from np.meshgrid(x, y)
+        """
+        nx, ny = (n, n) if np.isscalar(n) else n
+        xs = np.linspace(x_range[0], x_range[1], nx)
+        ys = np.linspace(y_range[0], y_range[1], ny)
+        xs_dev = torch.as_tensor(xs, dtype=self.dtype, device=self.device)
+        ys_dev = torch.as_tensor(ys, dtype=self.dtype, device=self.device)
+        out = np.empty(nx * ny)
+        out_view = torch.from_numpy(out)
+        with self._eval_mode(), torch.no_grad():
+            for start, end in self._chunks(nx * ny):
+                idx = torch.arange(start, end, device=self.device)
+                inputs = self._input_buffer(end - start)
+                inputs[:, 0] = xs_dev[idx % nx]
+                inputs[:, 1] = ys_dev[idx // nx]
+                out_view[start:end].copy_(self.model(inputs).reshape(-1))
+        X, Y = np.meshgrid(xs, ys)
+        return X, Y, out.reshape(ny, nx)
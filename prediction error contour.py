@@ -5,6 +5,8 @@ import torch
 from matplotlib import rcParams
 from model import NeuralNetwork
 from config import get_config
+from dataset_io import read_table
+from pes_evaluator import PESEvaluator
 
 # Set the global font and size
 rcParams['font.family'] = 'Arial'
@@ -18,7 +20,7 @@ rcParams['ytick.labelsize'] = 10
 path = "3-64"
 
 # read the data
-data = pd.read_csv("input_force.csv")
+data = read_table("input_force.csv")
 
 # get config from config.py
 config = get_config(path)
@@ -38,15 +40,9 @@ model.load_state_dict(torch.load(path + "/" + path + ".pth"))
 # pretreatment of data
 X_real = data[['x', 'y']].values
 y_real = data['z1'].values
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-X_real_tensor = torch.tensor(X_real, dtype=torch.float32).to(device)
 
-# predict using model
-with torch.no_grad():
-    y_pred_tensor = model(X_real_tensor).cpu()
-
-# Convert the prediction results to a NumPy array.
-y_pred = y_pred_tensor.numpy().flatten()
+# predict using model (chunked, returns a NumPy array)
+y_pred = PESEvaluator(model).energy(X_real)
 
 # Calculate the difference between the predicted values and the actual values.
 error = y_pred - y_real
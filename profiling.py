@@ -0,0 +1,142 @@
+"""
+Profiling of CLI runs.
+
+Profiler mode: `main.py <command> --profile` runs the command under torch.profiler (CPU activities, plus CUDA
+when available) and writes a Chrome trace, a table of the top-N operators and per-phase wall timings to the
+run's output directory. The training, MD and plotting code marks its phases with `phase(name)` and the end of
+every epoch / MD step with `mark_step()`, so long runs record operators for a bounded window of steps only;
+outside a profiled run both only cost a global lookup.
+"""
+
+import contextlib
+import json
+import os
+import time
+
+TRACE_FILENAME = "profile_trace.json"
+TABLE_FILENAME = "profile_ops.txt"
+PHASES_FILENAME = "profile_phases.json"
+
+_active = None      # PhaseTimer of the running profile_run, if any
+_profiler = None    # its torch profiler when operators are recorded on a step schedule
+
+
+class PhaseTimer:
+    """
+    Accumulated wall time and call count per phase name.
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+
+    def add(self, name: str, seconds: float):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def summary(self):
+        """
+        {name: {"seconds", "calls"}}, slowest phase first.
+        """
+        names = sorted(self.seconds, key=self.seconds.get, reverse=True)
+        return {name: {"seconds": self.seconds[name], "calls": self.calls[name]} for name in names}
+
+
+@contextlib.contextmanager
+def phase(name: str):
+    """
+    Time a block as phase `name` of the running profile (and label it in the trace); a no-op otherwise.
+    """
+    timer = _active
+    if timer is None:
+        yield
+        return
+    import torch
+
+    start = time.perf_counter()
+    try:
+        with torch.profiler.record_function(f"phase:{name}"):
+            yield
+    finally:
+        timer.add(name, time.perf_counter() - start)
+
+
+def mark_step():
+    """
+    End of a training epoch or MD step: advances the operator profiler's schedule; a no-op otherwise.
+    """
+    if _profiler is not None:
+        _profiler.step()
+
+
+@contextlib.contextmanager
+def profile_run(out_dir: str, top: int = 30, enabled: bool = True, steps: int = None):
+    """
+    Profile the enclosed block and write the reports to `out_dir` when it ends (also when it is interrupted).
+
+    Files: profile_trace.json (open in chrome://tracing or Perfetto), profile_ops.txt (top `top` operators
+    by self time) and profile_phases.json (wall seconds and calls per phase, plus the total).
+
+    With `steps`, operators are only recorded for that many epochs / MD steps (delimited by mark_step())
+    after one warm-up step, so the trace stays small however long the run is; the phase timings always cover
+    the whole block.
+
+    Args:
+        out_dir (str): output directory of the run, created if missing
+        top (int): rows of the operator table
+        enabled (bool): False makes this a no-op, so callers can always wrap the run
+        steps (int): epochs / MD steps recorded by the operator profiler, None records the whole block
+    """
+    global _active, _profiler
+    if not enabled:
+        yield None
+        return
+    import torch
+    from torch.profiler import profile, schedule, ProfilerActivity
+
+    cuda = torch.cuda.is_available()
+    activities = [ProfilerActivity.CPU] + ([ProfilerActivity.CUDA] if cuda else [])
+    timer = PhaseTimer()
+    recorded = []
+
+    def on_trace_ready(prof):
+        # called once the recorded window ends (or at stop() without a schedule)
+        recorded.append(_write_operators(prof, out_dir, top, cuda))
+
+    window = schedule(wait=0, warmup=1, active=int(steps), repeat=1) if steps else None
+    start = time.perf_counter()
+    prof = profile(activities=activities, schedule=window, on_trace_ready=on_trace_ready)
+    prof.start()
+    _active, _profiler = timer, (prof if window is not None else None)
+    try:
+        yield timer
+    finally:
+        _active = _profiler = None
+        prof.stop()
+        _write_phases(timer, time.perf_counter() - start, out_dir, recorded)
+
+
+def _write_operators(prof, out_dir, top, cuda):
+    os.makedirs(out_dir, exist_ok=True)
+    trace_path = os.path.join(out_dir, TRACE_FILENAME)
+    prof.export_chrome_trace(trace_path)
+    sort_by = "self_cuda_time_total" if cuda else "self_cpu_time_total"
+    table = prof.key_averages().table(sort_by=sort_by, row_limit=top)
+    with open(os.path.join(out_dir, TABLE_FILENAME), "w") as f:
+        f.write(table + "\n")
+    return trace_path
+
+
+def _write_phases(timer, total, out_dir, recorded):
+    os.makedirs(out_dir, exist_ok=True)
+    phases = timer.summary()
+    with open(os.path.join(out_dir, PHASES_FILENAME), "w") as f:
+        json.dump({"total_seconds": total, "phases": phases}, f, indent=2)
+
+    print(f"Profile ({total:.2f} s wall):")
+    for name, entry in phases.items():
+        print(f"  {name:16s} {entry['seconds']:10.3f} s  {100 * entry['seconds'] / total:5.1f}%  ({entry['calls']} calls)")
+    if recorded:
+        print(f"Profile written: {recorded[0]}, {TABLE_FILENAME}, {PHASES_FILENAME}")
+    else:
+        print(f"Profile written: {PHASES_FILENAME} (the run ended before a profiled step, no operator trace)")
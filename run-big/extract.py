@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unified extraction engine for Gaussian / CP2K / QE outputs
+Streams every output file line by line through a small per-code state machine,
+fans the files out over a process pool and writes the usual x,y,z1..z4 CSV
+(or the binary .npy dataset) in deterministic grid order. Parsed results are
+cached, so re-runs only touch new or changed outputs.
+
+Usage:
+    python extract.py --software gaussian
+    python extract.py --software qe --atoms H H Ne --workers 16 --format npy
+"""
+
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from extraction_cache import ExtractionCache, file_digest
+
+NUMBER = r"[-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[EeDd][-+]?\d+)?"
+HARTREE_PER_RY = 0.5
+COLUMNS = ["x", "y", "z1", "z2", "z3", "z4"]
+EMPTY_RESULT = (None, None, None, None)
+
+
+def _to_float(text):
+    return float(text.replace("D", "E").replace("d", "e"))
+
+
+class OutputParser:
+    """
+    Base class of a per-code backend
+
+    Subclasses describe where the output file lives, which lines mark a failed
+    run and how to feed lines into the parse state. `parse` returns
+    (energy, force1_x, force2_x, force3_x) or (None, None, None, None).
+    """
+
+    software = None
+    parser_version = 1
+    folder_suffix = None
+    error_pattern = None
+    normal_termination = None
+
+    def output_path(self, point_dir):
+        raise NotImplementedError
+
+    def input_path(self, point_dir):
+        raise NotImplementedError
+
+    def new_state(self):
+        return {"energy": None, "alt_energy": None, "forces": None, "rows": None}
+
+    def feed(self, state, line):
+        raise NotImplementedError
+
+    def finish(self, state):
+        energy = state["energy"] if state["energy"] is not None else state["alt_energy"]
+        if energy is None:
+            return EMPTY_RESULT
+        forces = state["forces"]
+        if forces is None or len(forces) < 3:
+            return energy, None, None, None
+        return energy, forces[0], forces[1], forces[2]
+
+    def parse(self, output_path):
+        state = self.new_state()
+        try:
+            with open(output_path, "r", errors="replace") as f:
+                for line in f:
+                    if self.error_pattern.search(line):
+                        return EMPTY_RESULT
+                    self.feed(state, line)
+        except FileNotFoundError:
+            return EMPTY_RESULT
+        return self.finish(state)
+
+    def is_finished(self, output_path):
+        """Whether the output file shows a normally terminated run"""
+        try:
+            with open(output_path, "r", errors="replace") as f:
+                return any(self.normal_termination in line for line in f)
+        except FileNotFoundError:
+            return False
+
+
+class GaussianParser(OutputParser):
+    software = "gaussian"
+    folder_suffix = "gaussian_calculations"
+    error_pattern = re.compile(r"Aborted", re.IGNORECASE)
+    normal_termination = "Normal termination"
+    scf_pattern = re.compile(r"SCF Done:\s+E\([^)]*\)\s*=\s*(" + NUMBER + ")")
+
+    def output_path(self, point_dir):
+        return os.path.join(point_dir, os.path.basename(point_dir) + ".out")
+
+    def input_path(self, point_dir):
+        return os.path.join(point_dir, os.path.basename(point_dir) + ".gjf")
+
+    def feed(self, state, line):
+        rows = state["rows"]
+        if rows is not None:
+            # Inside "Center Atomic Forces" table: header, dashes, one row per atom, dashes
+            parts = line.split()
+            if len(parts) == 5 and parts[0].isdigit() and parts[1].isdigit():
+                rows.append(_to_float(parts[2]))
+            elif rows and line.lstrip().startswith("---"):
+                state["forces"], state["rows"] = rows, None
+        elif "SCF Done:" in line:
+            m = self.scf_pattern.search(line)
+            if m:
+                state["energy"] = _to_float(m.group(1))
+        elif "Forces (Hartrees/Bohr)" in line and "Atomic" in line:
+            state["rows"] = []
+
+
+class CP2KParser(OutputParser):
+    software = "cp2k"
+    folder_suffix = "cp2k_calculations"
+    error_pattern = re.compile(r"ERROR", re.IGNORECASE)
+    normal_termination = "PROGRAM ENDED AT"
+    energy_pattern = re.compile(r"ENERGY\|\s*Total FORCE_EVAL.*?energy \(a\.u\.\):\s*(" + NUMBER + ")")
+    alt_energy_pattern = re.compile(r"Total energy:\s*(" + NUMBER + r")")
+
+    def output_path(self, point_dir):
+        return os.path.join(point_dir, "cp2k.out")
+
+    def input_path(self, point_dir):
+        return os.path.join(point_dir, "cp2k.inp")
+
+    def feed(self, state, line):
+        rows = state["rows"]
+        if rows is not None:
+            # "# Atom Kind Element X Y Z" header, then one row per atom until "SUM OF ATOMIC FORCES"
+            parts = line.split()
+            if len(parts) >= 6 and parts[0].isdigit():
+                rows.append(_to_float(parts[-3]))
+            elif "SUM OF ATOMIC FORCES" in line or (rows and not parts):
+                state["forces"], state["rows"] = rows, None
+        elif "ENERGY|" in line:
+            m = self.energy_pattern.search(line)
+            if m:
+                state["energy"] = _to_float(m.group(1))
+        elif "ATOMIC FORCES" in line and "SUM" not in line:
+            state["rows"] = []
+        elif "Total energy:" in line:
+            m = self.alt_energy_pattern.search(line)
+            if m:
+                state["alt_energy"] = _to_float(m.group(1))
+
+
+class QEParser(OutputParser):
+    software = "qe"
+    folder_suffix = "qe_calculations"
+    error_pattern = re.compile(r"error|convergence NOT achieved", re.IGNORECASE)
+    normal_termination = "JOB DONE"
+    energy_pattern = re.compile(r"!\s+total energy\s*=\s*(" + NUMBER + r")\s+Ry")
+    alt_energy_pattern = re.compile(r"total energy\s*=\s*(" + NUMBER + r")\s+Ry")
+    force_pattern = re.compile(
+        r"atom\s+\d+\s+(?:type\s+\d+\s+force\s*=\s*)?(" + NUMBER + r")\s+" + NUMBER + r"\s+" + NUMBER
+    )
+
+    def output_path(self, point_dir):
+        return os.path.join(point_dir, "pw.out")
+
+    def input_path(self, point_dir):
+        return os.path.join(point_dir, "pw.in")
+
+    def feed(self, state, line):
+        rows = state["rows"]
+        if rows is not None:
+            m = self.force_pattern.search(line)
+            if m:
+                # Ry/bohr -> Hartree/bohr, same conversion as the energy
+                rows.append(_to_float(m.group(1)) * HARTREE_PER_RY)
+            elif rows:
+                state["forces"], state["rows"] = rows, None
+        elif "total energy" in line:
+            m = self.energy_pattern.search(line)
+            if m:
+                state["energy"] = _to_float(m.group(1)) * HARTREE_PER_RY
+            else:
+                m = self.alt_energy_pattern.search(line)
+                if m:
+                    state["alt_energy"] = _to_float(m.group(1)) * HARTREE_PER_RY
+        elif "Forces acting on atoms" in line:
+            state["rows"] = []
+
+
+BACKENDS = {
+    "gaussian": GaussianParser(),
+    "cp2k": CP2KParser(),
+    "qe": QEParser(),
+}
+
+
+def get_backend(software):
+    try:
+        return BACKENDS[software.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported software type: {software} (choose from {', '.join(BACKENDS)})")
+
+
+def main_folder_name(atom1, atom2, atom3, software):
+    return f"{atom1}_{atom2}_{atom3}_{get_backend(software).folder_suffix}"
+
+
+def discover_points(root, atom2, atom3):
+    """
+    List (m, n, point_dir) for every "<ATOM3><m>,<ATOM2><n>" directory under root
+
+    The list is sorted like the original 71x71 loops (m ascending, then n descending),
+    so the output order does not depend on the file system.
+    """
+    pattern = re.compile(r"^{}({}),{}({})$".format(re.escape(atom3), NUMBER, re.escape(atom2), NUMBER))
+    points = []
+    for name in os.listdir(root):
+        m = pattern.match(name)
+        if m and os.path.isdir(os.path.join(root, name)):
+            points.append((float(m.group(1)), float(m.group(2)), os.path.join(root, name)))
+    points.sort(key=lambda p: (p[0], -p[1]))
+    return points
+
+
+def _parse_one(job):
+    software, output_path = job
+    return BACKENDS[software].parse(output_path)
+
+
+def _parse_and_digest(job):
+    software, output_path = job
+    try:
+        digest = file_digest(output_path)
+    except FileNotFoundError:
+        digest = None
+    return BACKENDS[software].parse(output_path), digest
+
+
+def extract_results(software, output_paths, workers=None, chunksize=32, with_digest=False):
+    """
+    Parse output files in parallel, returning results in input order
+
+    With `with_digest` each result is a (result, content_hash) pair.
+    """
+    worker = _parse_and_digest if with_digest else _parse_one
+    jobs = [(software, p) for p in output_paths]
+    if workers == 1 or len(jobs) < 2:
+        return [worker(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(worker, jobs, chunksize=chunksize))
+
+
+def extract_cached(backend, root, output_paths, workers=None):
+    """
+    Like extract_results, but only parses files that are new or changed
+
+    Unchanged files are served from the extraction cache in `root`; the cache
+    is updated with the freshly parsed files.
+    """
+    cache = ExtractionCache(root, backend.software, backend.parser_version)
+    results = [None] * len(output_paths)
+    stale = []
+    for i, path in enumerate(output_paths):
+        hit, st = cache.lookup(path)
+        if st is None:
+            results[i] = EMPTY_RESULT
+        elif hit is not None:
+            results[i] = hit
+        else:
+            stale.append((i, st))
+
+    parsed = extract_results(backend.software, [output_paths[i] for i, _ in stale],
+                             workers=workers, with_digest=True)
+    for (i, st), (result, digest) in zip(stale, parsed):
+        results[i] = result
+        if digest is not None:
+            cache.store(output_paths[i], st, digest, result)
+    cache.save()
+    print(f"🗂️  Cache: {len(output_paths) - len(stale)} reused, {len(stale)} parsed")
+    return results
+
+
+def build_tables(points, results):
+    """
+    Turn parse results into the (data, errors) DataFrames of the read_*.py scripts
+    """
+    data_rows, error_rows = [], []
+    for (m, n, _), (energy, f1, f2, f3) in zip(points, results):
+        if energy is None:
+            error_rows.append((m, n))
+            continue
+        # Keep same as original script: y takes -n
+        if f1 is None or f2 is None or f3 is None:
+            data_rows.append([m, -n, energy, np.nan, np.nan, np.nan])
+        else:
+            data_rows.append([m, -n, energy, f1, f2, f3])
+    return pd.DataFrame(data_rows, columns=COLUMNS), pd.DataFrame(error_rows, columns=["x", "y"])
+
+
+def _output_filename(atoms, software, file_type, suffix):
+    try:
+        from config_reader import get_output_filename
+        name = get_output_filename(*atoms, software, file_type)
+    except ImportError:
+        name = f"{atoms[0].lower()}_{atoms[1].lower()}_{atoms[2].lower()}_{software}_{file_type}.csv"
+    return os.path.splitext(name)[0] + suffix
+
+
+def save_binary(df, out_path, atoms):
+    """
+    Write the dataset in the project's .npy + JSON header format (see ../dataset_io.py)
+    """
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from dataset_io import save_dataset
+    return save_dataset(df, out_path, dtype="float64", atoms=atoms)
+
+
+def run_extraction(software, atoms, root=None, workers=None, out_format="csv", output=None, use_cache=True):
+    """
+    Extract every grid point under `root` and write data + error tables
+
+    With `use_cache` only outputs that are new or changed since the last run
+    are parsed (see extraction_cache.py).
+
+    Returns:
+        tuple: (data DataFrame, errors DataFrame)
+    """
+    backend = get_backend(software)
+    atom1, atom2, atom3 = atoms
+    root = root or main_folder_name(atom1, atom2, atom3, software)
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"Calculation folder not found: {root}")
+
+    points = discover_points(root, atom2, atom3)
+    print(f"📁 {root}: {len(points)} calculation folders")
+    output_paths = [backend.output_path(p[2]) for p in points]
+    if use_cache:
+        results = extract_cached(backend, root, output_paths, workers=workers)
+    else:
+        results = extract_results(backend.software, output_paths, workers=workers)
+    df, dfe = build_tables(points, results)
+
+    if len(df):
+        if out_format == "npy":
+            output_filename = output or _output_filename(atoms, backend.software, "energy", ".npy")
+            save_binary(df, output_filename, atoms)
+        else:
+            output_filename = output or _output_filename(atoms, backend.software, "energy", ".csv")
+            df.to_csv(output_filename, index=False)
+        print(f"✅ Energy and force data saved to: {output_filename}")
+        print(f"📈 Data statistics:")
+        print(f"   Total rows: {len(df)}")
+        print(f"   Total columns: {len(df.columns)}")
+        complete = int(df["z2"].notna().sum())
+        print(f"   Force information completeness: {complete}/{len(df)} ({complete / len(df) * 100:.1f}%)")
+
+    if len(dfe):
+        error_filename = _output_filename(atoms, backend.software, "errors", ".csv")
+        dfe.to_csv(error_filename, index=False)
+        print(f"❌ Error data saved to: {error_filename}")
+
+    print(f"\n🎯 Processing completed!")
+    print(f"   ✅ Success: {len(df)} files")
+    print(f"   ❌ Failed: {len(dfe)} files")
+    return df, dfe
+
+
+def default_atoms(software):
+    try:
+        from config_reader import get_atom_config_by_software
+        return get_atom_config_by_software(software)
+    except ImportError:
+        print("⚠️ Unable to import config_reader module, using default configuration")
+        return 'H', 'H', 'Ne'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract energies and forces from Gaussian / CP2K / QE outputs")
+    parser.add_argument("--software", required=True, choices=sorted(BACKENDS))
+    parser.add_argument("--atoms", nargs=3, default=None, metavar=("ATOM1", "ATOM2", "ATOM3"),
+                        help="Atom types, default reads from the generate_*_input.py script")
+    parser.add_argument("--root", default=None, help="Calculation folder, default <A1>_<A2>_<A3>_<software>_calculations")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--format", dest="out_format", choices=["csv", "npy"], default="csv")
+    parser.add_argument("--output", default=None, help="Output file name")
+    parser.add_argument("--no-cache", action="store_true", help="Re-parse every output instead of using the extraction cache")
+    args = parser.parse_args(argv)
+
+    atoms = tuple(args.atoms) if args.atoms else default_atoms(args.software)
+    run_extraction(args.software, atoms, root=args.root, workers=args.workers,
+                   out_format=args.out_format, output=args.output, use_cache=not args.no_cache)
+
+
+if __name__ == "__main__":
+    main()
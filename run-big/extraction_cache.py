@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent extraction cache
+JSON index of already parsed output files, keyed by path and validated by
+size, mtime and content hash, so a re-run of extract.py only parses files
+that are new or changed since the last run.
+"""
+
+import hashlib
+import json
+import os
+
+CACHE_FILENAME = ".extraction_cache.json"
+CACHE_VERSION = 1
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Content hash (BLAKE2b) of a file"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Parsed (energy, force1_x, force2_x, force3_x) per output file
+
+    Entries are stored relative to the calculation folder, so the folder can be
+    moved or mounted elsewhere without invalidating the cache. A changed
+    `parser_version` (e.g. after a parser fix) drops all entries.
+    """
+
+    def __init__(self, root, software, parser_version=1, filename=CACHE_FILENAME):
+        self.root = root
+        self.software = software
+        self.parser_version = parser_version
+        self.path = os.path.join(root, filename)
+        self.entries = {}
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                payload = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if (payload.get("version") == CACHE_VERSION
+                and payload.get("software") == self.software
+                and payload.get("parser_version") == self.parser_version):
+            self.entries = payload.get("entries", {})
+        else:
+            print(f"⚠️ Ignoring outdated extraction cache: {self.path}")
+            self.dirty = True
+
+    def _key(self, output_path):
+        return os.path.relpath(output_path, self.root)
+
+    def lookup(self, output_path):
+        """
+        Return (hit, stat) for an output file
+
+        `hit` is the cached result when size and mtime are unchanged, or when they
+        changed but the content hash did not (e.g. a copied tree). `stat` is None for
+        missing files.
+        """
+        try:
+            st = os.stat(output_path)
+        except FileNotFoundError:
+            return None, None
+        entry = self.entries.get(self._key(output_path))
+        if entry is None:
+            return None, st
+        if entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return tuple(entry["result"]), st
+        if entry["size"] == st.st_size and entry["digest"] == file_digest(output_path):
+            entry["mtime_ns"] = st.st_mtime_ns
+            self.dirty = True
+            return tuple(entry["result"]), st
+        return None, st
+
+    def store(self, output_path, st, digest, result):
+        self.entries[self._key(output_path)] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "digest": digest,
+            "result": list(result),
+        }
+        self.dirty = True
+
+    def save(self):
+        """Atomically write the index (temp file + rename)"""
+        if not self.dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "version": CACHE_VERSION,
+                "software": self.software,
+                "parser_version": self.parser_version,
+                "entries": self.entries,
+            }, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
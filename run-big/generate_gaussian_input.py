@@ -26,43 +26,50 @@ Title Card Required
  {}                  0.00    0.00    0.00
 '''.format(CHARGE, MULTIPLICITY, ATOM1)
 
-def main():
+def grid_points():
+    """(m, n) of the full 71×71 grid: ATOM3 at m, ATOM2 at n, 0.05 Å steps from 0.5 Å"""
+    return [(round(0.5+0.05*i,6), round(-0.5-0.05*j,6)) for i in range(0,71) for j in range(0,71)]
+
+def write_gaussian_input(directory, m, n):
+    stringi=' {}             {}     0.00    0.00'.format(ATOM2, n)
+    stringj='\n {}            {}     0.00    0.00\n\n'.format(ATOM3, m)
+    string0=string1+stringi+stringj
+    filename = os.path.join(directory, "{}.gjf".format(os.path.basename(directory)))
+    with open(filename, 'w') as f:
+        f.write(string0)
+
+def write_points(points, root=MAIN_FOLDER):
+    """
+    Create one calculation folder with a .gjf input per (m, n) point
+
+    Used for the full grid by main() and for selected batches by active learning.
+    Returns the number of folders written.
+    """
     # Create main folder
-    if not os.path.exists(MAIN_FOLDER):
-        os.makedirs(MAIN_FOLDER)
-        print(f"Creating main folder: {MAIN_FOLDER}")
-    
-    # Enter main folder
-    os.chdir(MAIN_FOLDER)
-    
+    if not os.path.exists(root):
+        os.makedirs(root)
+        print(f"Creating main folder: {root}")
+
     # Counter for creating subfolders
     created_count = 0
-    
-    for i in range(0,71):
-        for j in range(0,71):
-            m=round(0.5+0.05*i,6)
-            n=round(-0.5-0.05*j,6)
-            stringi=' {}             {}     0.00    0.00'.format(ATOM2, n)
-            stringj='\n {}            {}     0.00    0.00\n\n'.format(ATOM3, m)
-            string0=string1+stringi+stringj
-            
-            # Create subfolder
-            subfolder_name = '{}{},{}{}'.format(ATOM3,m,ATOM2,n)
-            os.makedirs(subfolder_name, exist_ok=True)
-            
-            # Create input file
-            filename = "{}{},{}{}/{}{},{}{}.gjf".format(ATOM3,m,ATOM2,n,ATOM3,m,ATOM2,n)
-            with open(filename, 'w') as f:
-                f.write(string0)
-            
-            created_count += 1
-            
-            # Show progress
-            if created_count % 100 == 0:
-                print(f"🔄 Created {created_count} folders...")
-    
-    # Return to parent directory
-    os.chdir('..')
+
+    for m, n in points:
+        # Create subfolder
+        subfolder_name = os.path.join(root, '{}{},{}{}'.format(ATOM3,m,ATOM2,n))
+        os.makedirs(subfolder_name, exist_ok=True)
+
+        # Create input file
+        write_gaussian_input(subfolder_name, m, n)
+
+        created_count += 1
+
+        # Show progress
+        if created_count % 100 == 0:
+            print(f"🔄 Created {created_count} folders...")
+    return created_count
+
+def main():
+    created_count = write_points(grid_points())
     
     print(f"Completed! Created {created_count} calculation folders")
     print(f"All files organized in: {MAIN_FOLDER}/")
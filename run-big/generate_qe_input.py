@@ -149,34 +149,41 @@ def write_qe_input(directory: str, m: float, n: float) -> None:
         f.write(content)
 
 
-def main() -> None:
+def grid_points():
+    """(m, n) of the full 71×71 grid: ATOM3 at m, ATOM2 at n, 0.05 Å steps from 0.5 Å"""
+    return [(round(0.5 + 0.05 * i, 6), round(-0.5 - 0.05 * j, 6)) for i in range(0, 71) for j in range(0, 71)]
+
+
+def write_points(points, root: str = MAIN_FOLDER) -> int:
+    """
+    Create one calculation folder with a pw.in input per (m, n) point
+
+    Used for the full grid by main() and for selected batches by active learning.
+    Returns the number of folders written.
+    """
     # Create main folder
-    if not os.path.exists(MAIN_FOLDER):
-        os.makedirs(MAIN_FOLDER)
-        print(f"📁 Creating main folder: {MAIN_FOLDER}")
-    
-    # Enter main folder
-    os.chdir(MAIN_FOLDER)
-    
+    if not os.path.exists(root):
+        os.makedirs(root)
+        print(f"📁 Creating main folder: {root}")
+
     # Counter for creating subfolders
     created_count = 0
-    
-    for i in range(0, 71):
-        for j in range(0, 71):
-            m = round(0.5 + 0.05 * i, 6)
-            n = round(-0.5 - 0.05 * j, 6)
-            dirname = f"{ATOM3}{m},{ATOM2}{n}"
-            os.makedirs(dirname, exist_ok=True)
-            write_qe_input(dirname, m, n)
-            
-            created_count += 1
-            
-            # Show progress
-            if created_count % 100 == 0:
-                print(f"🔄 Created {created_count} folders...")
-    
-    # Return to parent directory
-    os.chdir('..')
+
+    for m, n in points:
+        dirname = os.path.join(root, f"{ATOM3}{m},{ATOM2}{n}")
+        os.makedirs(dirname, exist_ok=True)
+        write_qe_input(dirname, m, n)
+
+        created_count += 1
+
+        # Show progress
+        if created_count % 100 == 0:
+            print(f"🔄 Created {created_count} folders...")
+    return created_count
+
+
+def main() -> None:
+    created_count = write_points(grid_points())
     
     print(f"✅ Completed! Created {created_count} calculation folders")
     print(f"📁 All files organized in: {MAIN_FOLDER}/")
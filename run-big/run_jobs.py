@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parallel job runner for Gaussian / QE / CP2K calculation campaigns
+Python replacement for the serial g09.sh / qe.sh / cp2k.sh loops: packs several
+jobs onto the machine at once, skips jobs whose output already shows normal
+termination, retries failures and writes a JSONL progress/ETA journal.
+
+Usage:
+    python run_jobs.py --software gaussian --cores-per-job 4 --mem-per-job 4GB
+    python run_jobs.py --software qe --jobs 8 --launcher "mpirun -np {cores}"
+    python run_jobs.py --software gaussian --exe ./fake_g16.sh   # stub executable for testing
+"""
+
+import argparse
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from extract import default_atoms, discover_points, get_backend, main_folder_name
+
+DEFAULT_EXECUTABLES = {
+    "gaussian": ("g16", "g09", "g03"),
+    "qe": ("pw.x",),
+    "cp2k": ("cp2k.psmp", "cp2k.popt", "cp2k"),
+}
+JOURNAL_FILENAME = "run_journal.jsonl"
+NPROCS_PATTERN = re.compile(r"^%nproc(?:shared|s)?=.*$", re.IGNORECASE | re.MULTILINE)
+MEM_PATTERN = re.compile(r"^%mem=.*$", re.IGNORECASE | re.MULTILINE)
+
+
+def find_executable(software):
+    """First default executable of the software found in PATH"""
+    for name in DEFAULT_EXECUTABLES[software]:
+        if shutil.which(name):
+            return name
+    raise FileNotFoundError(
+        f"No {software} executable found in PATH (tried {', '.join(DEFAULT_EXECUTABLES[software])}), use --exe")
+
+
+def set_gaussian_resources(gjf_path, cores=None, mem=None):
+    """Rewrite the %nprocshared / %mem link-0 lines of a .gjf input in place, returns whether it changed"""
+    with open(gjf_path, "r") as f:
+        content = f.read()
+    updated = content
+    if cores is not None:
+        line = f"%nprocshared={cores}"
+        updated = NPROCS_PATTERN.sub(line, updated) if NPROCS_PATTERN.search(updated) else f"{line}\n{updated}"
+    if mem is not None:
+        line = f"%mem={mem}"
+        updated = MEM_PATTERN.sub(line, updated) if MEM_PATTERN.search(updated) else f"{line}\n{updated}"
+    if updated == content:
+        return False
+    with open(gjf_path, "w") as f:
+        f.write(updated)
+    return True
+
+
+def build_command(software, exe, point_dir, root, launcher=None, cores=1):
+    """
+    Describe how to launch one job
+
+    Returns:
+        dict: argv, cwd, stdin (path or None), stdout (path or None)
+    """
+    backend = get_backend(software)
+    prefix = shlex.split(launcher.format(cores=cores)) if launcher else []
+    if software == "gaussian":
+        # g16 < job.gjf > job.out, run inside the job folder so checkpoint files stay there
+        return {"argv": prefix + [exe], "cwd": point_dir,
+                "stdin": backend.input_path(point_dir), "stdout": backend.output_path(point_dir)}
+    if software == "qe":
+        # pw.in refers to ./pseudo and ./tmp relative to the calculation folder
+        return {"argv": prefix + [exe, "-in", os.path.relpath(backend.input_path(point_dir), root)], "cwd": root,
+                "stdin": None, "stdout": backend.output_path(point_dir)}
+    return {"argv": prefix + [exe, "-i", "cp2k.inp", "-o", "cp2k.out"], "cwd": point_dir,
+            "stdin": None, "stdout": None}
+
+
+class Journal:
+    """Thread-safe JSONL progress journal with a running ETA"""
+
+    def __init__(self, path, total):
+        self.path = path
+        self.total = total
+        self.finished = 0
+        self.start = time.time()
+        self.lock = threading.Lock()
+
+    def record(self, event, **fields):
+        with self.lock:
+            if event in ("done", "failed", "skipped"):
+                self.finished += 1
+            elapsed = time.time() - self.start
+            remaining = self.total - self.finished
+            eta = elapsed / self.finished * remaining if self.finished else None
+            entry = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "event": event,
+                     "finished": self.finished, "total": self.total,
+                     "elapsed_s": round(elapsed, 1), "eta_s": round(eta, 1) if eta is not None else None}
+            entry.update(fields)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            return entry
+
+
+class JobRunner:
+    """
+    Runs every job of a calculation folder with bounded concurrency
+
+    Args:
+        software (str): "gaussian", "qe" or "cp2k"
+        root (str): calculation folder with one sub-folder per grid point
+        atoms (tuple): (ATOM1, ATOM2, ATOM3), used to recognise job folders
+        exe (str): executable, default looked up in PATH
+        jobs (int): concurrent jobs, default CPU count // cores_per_job
+        cores_per_job (int): cores given to each job (OMP_NUM_THREADS / {cores}), default 1; when given,
+            also written to the %nprocshared line of Gaussian inputs
+        mem_per_job (str): Gaussian %mem value per job, e.g. "4GB"; inputs keep their own %mem if None
+        retries (int): extra attempts for a failed job
+        launcher (str): optional prefix such as "mpirun -np {cores}"
+        min_free_disk (float): stop launching when less than this fraction of the disk is free
+    """
+
+    def __init__(self, software, root, atoms, exe=None, jobs=None, cores_per_job=None, mem_per_job=None,
+                 retries=1, launcher=None, min_free_disk=0.10, journal_path=None):
+        self.software = software
+        self.backend = get_backend(software)
+        self.root = root
+        self.atoms = atoms
+        self.exe = exe or find_executable(software)
+        # Only explicitly requested resources are written into the users' .gjf files
+        self.gaussian_cores = cores_per_job
+        self.cores_per_job = max(1, int(cores_per_job or 1))
+        self.jobs = jobs or max(1, (os.cpu_count() or 1) // self.cores_per_job)
+        self.mem_per_job = mem_per_job
+        self.retries = max(0, int(retries))
+        self.launcher = launcher
+        self.min_free_disk = min_free_disk
+        self.journal_path = journal_path or os.path.join(root, JOURNAL_FILENAME)
+        self.stop_event = threading.Event()
+
+    def pending_jobs(self):
+        """Job folders with an input file whose output does not show normal termination"""
+        pending, finished = [], []
+        for _, _, point_dir in discover_points(self.root, self.atoms[1], self.atoms[2]):
+            if not os.path.exists(self.backend.input_path(point_dir)):
+                continue
+            if self.backend.is_finished(self.backend.output_path(point_dir)):
+                finished.append(point_dir)
+            else:
+                pending.append(point_dir)
+        return pending, finished
+
+    def _disk_ok(self):
+        usage = shutil.disk_usage(self.root)
+        return usage.free / usage.total >= self.min_free_disk
+
+    def _environment(self, point_dir):
+        """Job environment and its private scratch directory (None if the software needs none)"""
+        env = dict(os.environ)
+        env["OMP_NUM_THREADS"] = str(self.cores_per_job)
+        scratch = None
+        if self.software == "gaussian":
+            # Separate scratch per job so concurrent runs never share files
+            scratch = os.path.join(env.get("GAUSS_SCRDIR", "/tmp"), "pes_" + os.path.basename(point_dir))
+            os.makedirs(scratch, exist_ok=True)
+            env["GAUSS_SCRDIR"] = scratch
+        return env, scratch
+
+    def run_one(self, point_dir, journal):
+        name = os.path.relpath(point_dir, self.root)
+        if self.software == "gaussian" and (self.gaussian_cores is not None or self.mem_per_job is not None):
+            if set_gaussian_resources(self.backend.input_path(point_dir), self.gaussian_cores, self.mem_per_job):
+                print(f"   ✏️ {name}: set %nprocshared / %mem from --cores-per-job / --mem-per-job")
+        cmd = build_command(self.software, self.exe, point_dir, self.root, self.launcher, self.cores_per_job)
+        env, scratch = self._environment(point_dir)
+        try:
+            return self._attempts(name, point_dir, cmd, env, journal)
+        finally:
+            if scratch is not None:
+                shutil.rmtree(scratch, ignore_errors=True)
+
+    def _attempts(self, name, point_dir, cmd, env, journal):
+        for attempt in range(1, self.retries + 2):
+            if self.stop_event.is_set():
+                return journal.record("cancelled", job=name)
+            if not self._disk_ok():
+                self.stop_event.set()
+                return journal.record("cancelled", job=name, reason="disk space low")
+            journal.record("start", job=name, attempt=attempt)
+            start = time.time()
+            stdin = open(cmd["stdin"], "r") if cmd["stdin"] else subprocess.DEVNULL
+            stdout = open(cmd["stdout"], "w") if cmd["stdout"] else subprocess.DEVNULL
+            try:
+                proc = subprocess.run(cmd["argv"], cwd=cmd["cwd"], stdin=stdin, stdout=stdout,
+                                      stderr=subprocess.STDOUT, env=env)
+                returncode = proc.returncode
+            except OSError as e:
+                returncode = f"launch failed: {e}"
+            finally:
+                for handle in (stdin, stdout):
+                    if handle is not subprocess.DEVNULL:
+                        handle.close()
+            duration = round(time.time() - start, 1)
+            if returncode == 0 and self.backend.is_finished(self.backend.output_path(point_dir)):
+                return journal.record("done", job=name, attempt=attempt, duration_s=duration)
+            if attempt <= self.retries:
+                journal.record("retry", job=name, attempt=attempt, duration_s=duration, returncode=returncode)
+        return journal.record("failed", job=name, attempt=attempt, duration_s=duration, returncode=returncode)
+
+    def run(self):
+        pending, finished = self.pending_jobs()
+        journal = Journal(self.journal_path, len(pending) + len(finished))
+        for point_dir in finished:
+            journal.record("skipped", job=os.path.relpath(point_dir, self.root), reason="normal termination")
+        print(f"📁 {self.root}: {len(finished)} finished, {len(pending)} to run "
+              f"({self.jobs} concurrent x {self.cores_per_job} cores)")
+
+        summary = {"done": 0, "failed": 0, "cancelled": 0, "skipped": len(finished)}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            for entry in pool.map(lambda d: self.run_one(d, journal), pending):
+                summary[entry["event"]] += 1
+                eta = entry["eta_s"]
+                print(f"   [{entry['finished']}/{entry['total']}] {entry['event']:9s} {entry['job']}"
+                      + (f"  ETA {eta:.0f}s" if eta is not None else ""))
+        print(f"\n🎯 Done: {summary['done']}, failed: {summary['failed']}, "
+              f"skipped: {summary['skipped']}, cancelled: {summary['cancelled']}")
+        print(f"📝 Journal: {self.journal_path}")
+        return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Gaussian / QE / CP2K jobs of a calculation folder in parallel")
+    parser.add_argument("--software", required=True, choices=sorted(DEFAULT_EXECUTABLES))
+    parser.add_argument("--atoms", nargs=3, default=None, metavar=("ATOM1", "ATOM2", "ATOM3"))
+    parser.add_argument("--root", default=None, help="Calculation folder, default <A1>_<A2>_<A3>_<software>_calculations")
+    parser.add_argument("--exe", default=None, help="Executable (default: g16/g09/g03, pw.x or cp2k.psmp from PATH)")
+    parser.add_argument("--jobs", type=int, default=None, help="Concurrent jobs (default: CPU count // cores per job)")
+    parser.add_argument("--cores-per-job", type=int, default=None,
+                        help="Cores per job (default 1); when given, also sets %%nprocshared in Gaussian inputs")
+    parser.add_argument("--mem-per-job", default=None, help="Gaussian %%mem per job, e.g. 4GB (default: keep the input's)")
+    parser.add_argument("--retries", type=int, default=1)
+    parser.add_argument("--launcher", default=None, help='Command prefix, e.g. "mpirun -np {cores}"')
+    parser.add_argument("--min-free-disk", type=float, default=0.10, help="Minimum free disk fraction")
+    args = parser.parse_args(argv)
+
+    atoms = tuple(args.atoms) if args.atoms else default_atoms(args.software)
+    root = args.root or main_folder_name(*atoms, args.software)
+    runner = JobRunner(args.software, root, atoms, exe=args.exe, jobs=args.jobs, cores_per_job=args.cores_per_job,
+                       mem_per_job=args.mem_per_job, retries=args.retries, launcher=args.launcher,
+                       min_free_disk=args.min_free_disk)
+    summary = runner.run()
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Job runner test script
+Runs run_jobs.JobRunner against a stub g16 executable: a finished job is skipped,
+a new job succeeds, a failing job succeeds on its retry, and the journal records all of it.
+Run with `python test_run_jobs.py` or pytest.
+"""
+
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_jobs import JobRunner, JOURNAL_FILENAME
+
+ATOMS = ("H", "H", "Ne")
+GJF = "%nprocs=8\n%mem=10GB\n# sp b3lyp/6-311g** Force nosymm\n\nTitle\n\n0 1\n H 0.0 0.0 0.0\n"
+
+# Stub g16: reads the input from stdin, logs the call, fails once if a "fail_once" marker exists
+FAKE_G16 = '''#!{python}
+import os, sys
+sys.stdin.read()
+with open("calls.log", "a") as f:
+    f.write("call\\n")
+if os.path.exists("fail_once"):
+    os.remove("fail_once")
+    sys.exit(1)
+print(" SCF Done:  E(RB3LYP) =  -100.5  A.U. after 10 cycles")
+print(" Normal termination of Gaussian 16")
+'''
+
+
+def make_point(root, name, finished=False, fail_once=False):
+    point_dir = os.path.join(root, name)
+    os.makedirs(point_dir)
+    with open(os.path.join(point_dir, name + ".gjf"), "w") as f:
+        f.write(GJF)
+    if finished:
+        with open(os.path.join(point_dir, name + ".out"), "w") as f:
+            f.write(" Normal termination of Gaussian 16\n")
+    if fail_once:
+        open(os.path.join(point_dir, "fail_once"), "w").close()
+    return point_dir
+
+
+def calls(point_dir):
+    try:
+        with open(os.path.join(point_dir, "calls.log")) as f:
+            return len(f.read().split())
+    except FileNotFoundError:
+        return 0
+
+
+def test_skip_success_and_retry():
+    """Finished job skipped, new job done, failing job done on the second attempt"""
+    temp_dir = tempfile.mkdtemp()
+    old_scratch = os.environ.get("GAUSS_SCRDIR")
+    try:
+        root = os.path.join(temp_dir, "calc")
+        scratch = os.path.join(temp_dir, "scratch")
+        os.makedirs(scratch)
+        os.environ["GAUSS_SCRDIR"] = scratch
+        exe = os.path.join(temp_dir, "fake_g16")
+        with open(exe, "w") as f:
+            f.write(FAKE_G16.format(python=sys.executable))
+        os.chmod(exe, os.stat(exe).st_mode | stat.S_IXUSR)
+
+        finished = make_point(root, "Ne0.5,H-0.5", finished=True)
+        fresh = make_point(root, "Ne0.6,H-0.5")
+        flaky = make_point(root, "Ne0.7,H-0.5", fail_once=True)
+
+        runner = JobRunner("gaussian", root, ATOMS, exe=exe, jobs=2, retries=1, min_free_disk=0.0)
+        summary = runner.run()
+
+        assert summary == {"done": 2, "failed": 0, "cancelled": 0, "skipped": 1}, summary
+        assert (calls(finished), calls(fresh), calls(flaky)) == (0, 1, 2)
+        with open(os.path.join(root, JOURNAL_FILENAME)) as f:
+            entries = [json.loads(line) for line in f]
+        events = {(e["job"], e["event"]) for e in entries}
+        assert ("Ne0.5,H-0.5", "skipped") in events
+        assert ("Ne0.6,H-0.5", "done") in events
+        assert {("Ne0.7,H-0.5", "retry"), ("Ne0.7,H-0.5", "done")} <= events
+        assert entries[-1]["finished"] == entries[-1]["total"] == 3
+
+        # No --cores-per-job / --mem-per-job: the inputs keep their own link-0 lines
+        with open(os.path.join(fresh, "Ne0.6,H-0.5.gjf")) as f:
+            assert f.read() == GJF
+        # Per-job scratch directories are removed afterwards
+        assert os.listdir(scratch) == []
+
+        # A second run has nothing left to do
+        summary = JobRunner("gaussian", root, ATOMS, exe=exe, jobs=2, min_free_disk=0.0).run()
+        assert summary["skipped"] == 3 and summary["done"] == 0
+        assert (calls(fresh), calls(flaky)) == (1, 2)
+        print("✅ Job runner test passed!")
+    finally:
+        if old_scratch is None:
+            os.environ.pop("GAUSS_SCRDIR", None)
+        else:
+            os.environ["GAUSS_SCRDIR"] = old_scratch
+        shutil.rmtree(temp_dir)
+
+
+def test_explicit_resources_rewrite_gjf():
+    """--cores-per-job / --mem-per-job rewrite %nprocs / %mem"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        root = os.path.join(temp_dir, "calc")
+        point_dir = make_point(root, "Ne0.5,H-0.5")
+        exe = os.path.join(temp_dir, "fake_g16")
+        with open(exe, "w") as f:
+            f.write(FAKE_G16.format(python=sys.executable))
+        os.chmod(exe, os.stat(exe).st_mode | stat.S_IXUSR)
+
+        JobRunner("gaussian", root, ATOMS, exe=exe, jobs=1, cores_per_job=2, mem_per_job="2GB",
+                  min_free_disk=0.0).run()
+        with open(os.path.join(point_dir, "Ne0.5,H-0.5.gjf")) as f:
+            content = f.read()
+        assert "%nprocshared=2" in content and "%mem=2GB" in content and "%nprocs=8" not in content
+        print("✅ Resource rewrite test passed!")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    test_skip_success_and_retry()
+    test_explicit_resources_rewrite_gjf()
@@ -0,0 +1,239 @@
+"""
+Tabulated spline surrogate of a trained PES.
+
+Tabulated surrogate: samples a trained network (energy, gradient and cross derivative) on a dense (r12, r23) grid
+and interpolates it with bicubic Hermite patches, giving C1-continuous energies and analytic gradients from a few
+NumPy operations instead of a network forward/backward pass. Used by the MD engine in place of autograd.
+"""
+
+import copy
+import hashlib
+import time
+import numpy as np
+import torch
+
+# Hermite basis: coefficients = M @ [f0, f1, h*f'0, h*f'1]
+_HERMITE = np.array([
+    [1.0, 0.0, 0.0, 0.0],
+    [0.0, 0.0, 1.0, 0.0],
+    [-3.0, 3.0, -2.0, -1.0],
+    [2.0, -2.0, 1.0, 1.0],
+])
+
+
+def _node_derivatives(model, xs, ys, chunk_size=65536):
+    """
+    f, df/dx, df/dy and d2f/dxdy of the network at every grid node, in float64.
+
+    Returns:
+        np.ndarray: shape (4, len(xs), len(ys))
+    """
+    net = copy.deepcopy(model).double().eval()
+    device = next(net.parameters()).device
+    X, Y = np.meshgrid(xs, ys, indexing="ij")
+    points = torch.as_tensor(np.column_stack((X.ravel(), Y.ravel())), dtype=torch.float64, device=device)
+    values = np.empty((4, points.shape[0]))
+    for start in range(0, points.shape[0], chunk_size):
+        r = points[start:start + chunk_size].clone().requires_grad_(True)
+        output = net(r).reshape(-1)
+        gradient = torch.autograd.grad(output.sum(), r, create_graph=True)[0]
+        cross = torch.autograd.grad(gradient[:, 0].sum(), r)[0][:, 1]
+        end = start + r.shape[0]
+        values[0, start:end] = output.detach().cpu().numpy()
+        values[1, start:end] = gradient[:, 0].detach().cpu().numpy()
+        values[2, start:end] = gradient[:, 1].detach().cpu().numpy()
+        values[3, start:end] = cross.cpu().numpy()
+    return values.reshape(4, len(xs), len(ys))
+
+
+def model_fingerprint(model) -> str:
+    """
+    SHA-256 of a network's state dict (names, shapes and values), identifying the weights a table came from.
+    """
+    digest = hashlib.sha256()
+    for name, tensor in model.state_dict().items():
+        tensor = tensor.detach().cpu().contiguous()
+        digest.update(f"{name}:{tuple(tensor.shape)}:{tensor.dtype}".encode())
+        digest.update(tensor.numpy().tobytes())
+    return digest.hexdigest()
+
+
+class SplinePES:
+    """
+    Bicubic Hermite table of a PES over a rectangular (r12, r23) domain.
+
+    Each cell stores the 4x4 polynomial coefficients, so evaluation is a cell lookup and a Horner
+    evaluation in each direction. Points outside the table are extrapolated from the nearest edge cell.
+
+    Args:
+        coefficients (np.ndarray): (nx - 1, ny - 1, 4, 4) per-cell coefficients in local coordinates
+        x_range (tuple): (min, max) of r12
+        y_range (tuple): (min, max) of r23
+        device: torch device for energy_and_gradient_tensor
+        source (str): model_fingerprint of the tabulated network, None if unknown
+    """
+
+    def __init__(self, coefficients, x_range, y_range, device=None, source: str = None):
+        self.source = source
+        self.coefficients = np.ascontiguousarray(coefficients, dtype=np.float64)
+        self.x_range = (float(x_range[0]), float(x_range[1]))
+        self.y_range = (float(y_range[0]), float(y_range[1]))
+        self.cells = self.coefficients.shape[:2]
+        self.hx = (self.x_range[1] - self.x_range[0]) / self.cells[0]
+        self.hy = (self.y_range[1] - self.y_range[0]) / self.cells[1]
+        self.device = torch.device(device) if device is not None else torch.device("cpu")
+        self._tables = {}
+
+    @classmethod
+    def from_model(cls, model, x_range=(0.0, 4.0), y_range=(0.0, 4.0), spacing: float = 0.01):
+        """
+        Tabulate a trained network with nodes every `spacing` Angstrom.
+        """
+        nx = int(round((x_range[1] - x_range[0]) / spacing)) + 1
+        ny = int(round((y_range[1] - y_range[0]) / spacing)) + 1
+        xs = np.linspace(x_range[0], x_range[1], nx)
+        ys = np.linspace(y_range[0], y_range[1], ny)
+        hx, hy = xs[1] - xs[0], ys[1] - ys[0]
+        f, fx, fy, fxy = _node_derivatives(model, xs, ys)
+
+        # Node data of every cell arranged as [[f, h_y f_y], [h_x f_x, h_x h_y f_xy]] blocks
+        def corners(a):
+            return np.stack((
+                np.stack((a[:-1, :-1], a[:-1, 1:]), axis=-1),
+                np.stack((a[1:, :-1], a[1:, 1:]), axis=-1),
+            ), axis=-2)
+
+        F = np.empty((nx - 1, ny - 1, 4, 4))
+        F[..., :2, :2] = corners(f)
+        F[..., :2, 2:] = corners(fy) * hy
+        F[..., 2:, :2] = corners(fx) * hx
+        F[..., 2:, 2:] = corners(fxy) * hx * hy
+        coefficients = _HERMITE @ F @ _HERMITE.T
+        return cls(coefficients, x_range, y_range, device=next(model.parameters()).device,
+                   source=model_fingerprint(model))
+
+    def save(self, path: str):
+        """
+        Write the table as a compressed `.npz`, together with the fingerprint of its source network.
+        """
+        extra = {"source": np.array(self.source)} if self.source is not None else {}
+        np.savez_compressed(path, coefficients=self.coefficients, x_range=self.x_range, y_range=self.y_range, **extra)
+        return path
+
+    @classmethod
+    def load(cls, path: str, device=None):
+        data = np.load(path)
+        source = str(data["source"]) if "source" in data.files else None     # tables saved before fingerprints
+        return cls(data["coefficients"], data["x_range"], data["y_range"], device=device, source=source)
+
+    def _locate(self, x, y):
+        sx = (x - self.x_range[0]) / self.hx
+        sy = (y - self.y_range[0]) / self.hy
+        i = np.clip(np.floor(sx), 0, self.cells[0] - 1)
+        j = np.clip(np.floor(sy), 0, self.cells[1] - 1)
+        return i.astype(np.intp), j.astype(np.intp), sx - i, sy - j
+
+    def energy_and_gradient(self, points):
+        """
+        Energies and dE/d(r12, r23) at (N, 2) points, pure NumPy (Horner evaluation of the cell polynomials).
+
+        Returns:
+            tuple: (energy (N,), gradient (N, 2)) as float64 arrays
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        i, j, t, u = self._locate(points[:, 0], points[:, 1])
+        a = self.coefficients[i, j]
+        t, u = t[:, None], u[:, None]
+        # contract the u powers first: (N, 4) polynomials in t for p and dp/du
+        aU = ((a[:, :, 3] * u + a[:, :, 2]) * u + a[:, :, 1]) * u + a[:, :, 0]
+        daU = (3 * a[:, :, 3] * u + 2 * a[:, :, 2]) * u + a[:, :, 1]
+        t = t[:, 0]
+        energy = ((aU[:, 3] * t + aU[:, 2]) * t + aU[:, 1]) * t + aU[:, 0]
+        gradient = np.empty((len(t), 2))
+        gradient[:, 0] = ((3 * aU[:, 3] * t + 2 * aU[:, 2]) * t + aU[:, 1]) / self.hx
+        gradient[:, 1] = (((daU[:, 3] * t + daU[:, 2]) * t + daU[:, 1]) * t + daU[:, 0]) / self.hy
+        return energy, gradient
+
+    def energy(self, points):
+        """
+        Energies at (N, 2) points, pure NumPy.
+        """
+        return self.energy_and_gradient(points)[0]
+
+    def energy_and_gradient_tensor(self, r):
+        """
+        Torch version of energy_and_gradient for the MD engine (same interface as PESEvaluator).
+
+        The coefficient table is copied to the tensor's device once and cached.
+
+        Returns:
+            tuple: (energy (N,), gradient (N, 2)) as float64 tensors
+        """
+        table = self._tables.get(r.device)
+        if table is None:
+            table = self._tables[r.device] = torch.as_tensor(self.coefficients, device=r.device)
+        r = r.detach().double()
+        sx = (r[:, 0] - self.x_range[0]) / self.hx
+        sy = (r[:, 1] - self.y_range[0]) / self.hy
+        i = sx.floor().clamp(0, self.cells[0] - 1)
+        j = sy.floor().clamp(0, self.cells[1] - 1)
+        t, u = sx - i, sy - j
+        a = table[i.long(), j.long()]
+        t, u = t.unsqueeze(1), u.unsqueeze(1)
+        aU = ((a[:, :, 3] * u + a[:, :, 2]) * u + a[:, :, 1]) * u + a[:, :, 0]
+        daU = (3 * a[:, :, 3] * u + 2 * a[:, :, 2]) * u + a[:, :, 1]
+        t = t.squeeze(1)
+        energy = ((aU[:, 3] * t + aU[:, 2]) * t + aU[:, 1]) * t + aU[:, 0]
+        gx = ((3 * aU[:, 3] * t + 2 * aU[:, 2]) * t + aU[:, 1]) / self.hx
+        gy = (((daU[:, 3] * t + daU[:, 2]) * t + daU[:, 1]) * t + daU[:, 0]) / self.hy
+        return energy, torch.stack((gx, gy), dim=1)
+
+    def error_report(self, model, n_samples: int = 20000, seed: int = 0):
+        """
+        Interpolation error against the live network.
+
+        Compares energies and gradients at random points and at cell centres (where Hermite
+        interpolation error peaks) with a float64 copy of the network, so the figures measure the
+        interpolation itself rather than float32 rounding; `network_float32_*` gives that rounding
+        for scale. Both evaluators are timed on the random sample.
+
+        Returns:
+            dict: energy/gradient RMS and max absolute errors, table size and microseconds per point
+        """
+        from pes_evaluator import PESEvaluator
+
+        rng = np.random.default_rng(seed)
+        random_points = np.column_stack((
+            rng.uniform(*self.x_range, n_samples),
+            rng.uniform(*self.y_range, n_samples),
+        ))
+        centres = np.column_stack((
+            self.x_range[0] + (rng.integers(0, self.cells[0], n_samples) + 0.5) * self.hx,
+            self.y_range[0] + (rng.integers(0, self.cells[1], n_samples) + 0.5) * self.hy,
+        ))
+        points = np.concatenate((random_points, centres))
+
+        evaluator = PESEvaluator(model)
+        start = time.perf_counter()
+        e_net, g_net = evaluator.energy_and_gradient(random_points)
+        network_us = (time.perf_counter() - start) / n_samples * 1e6
+        start = time.perf_counter()
+        self.energy_and_gradient(random_points)
+        spline_us = (time.perf_counter() - start) / n_samples * 1e6
+
+        e32, _ = evaluator.energy_and_gradient(points)
+        e_ref, g_ref = PESEvaluator(copy.deepcopy(model).double()).energy_and_gradient(points)
+        e_spl, g_spl = self.energy_and_gradient(points)
+        e_err = np.abs(e_spl - e_ref)
+        g_err = np.linalg.norm(g_spl - g_ref, axis=1)
+        return {
+            "nodes": (self.cells[0] + 1) * (self.cells[1] + 1),
+            "spacing": (self.hx, self.hy),
+            "energy_rmse": float(np.sqrt(np.mean(e_err ** 2))),
+            "energy_max": float(e_err.max()),
+            "gradient_rmse": float(np.sqrt(np.mean(g_err ** 2))),
+            "gradient_max": float(g_err.max()),
+            "network_float32_energy_max": float(np.abs(e32 - e_ref).max()),
+            "network_us_per_point": network_us,
+            "spline_us_per_point": spline_us,
+        }
@@ -0,0 +1,163 @@
+"""
+Hyperparameter sweeps.
+
+Hyperparameter sweep: expands value lists over num_layers, hidden_dim, activation_function, learning_rate and
+weight into configurations, trains them concurrently in spawned worker processes (each limited to a fixed number
+of torch/BLAS threads, so workers x threads matches the machine instead of every run grabbing all cores) and
+collects the results in one leaderboard CSV that is rewritten as runs finish.
+"""
+
+import contextlib
+import csv
+import itertools
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+SWEEP_KEYS = ("num_layers", "hidden_dim", "activation_function", "learning_rate", "weight")
+LEADERBOARD_FIELDS = ("rank", "run", *SWEEP_KEYS, "r2", "best_loss", "epochs_run", "seconds", "model_dir", "error")
+_THREAD_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def expand_grid(base_cfg, grid):
+    """
+    One config per combination of the values in `grid`.
+
+    Keys missing from `grid` keep their value from `base_cfg`. Every config gets GUI-style file names:
+    the weights are "<layers>-<hidden>-<activation>-<timestamp>.pth" inside a directory of the same name,
+    so `simulate`, `neb` and the GUI recognise the architecture of a sweep result.
+
+    Args:
+        base_cfg (dict): merged config, e.g. config.get_config("2-64")
+        grid (dict): {key: [values, ...]} for keys of SWEEP_KEYS
+
+    Returns:
+        list: (run name, config) pairs
+    """
+    unknown = set(grid) - set(SWEEP_KEYS)
+    if unknown:
+        raise ValueError(f"Cannot sweep over {', '.join(sorted(unknown))} (supported: {', '.join(SWEEP_KEYS)})")
+    values = [list(grid.get(key) or [base_cfg[key]]) for key in SWEEP_KEYS]
+    tag = datetime.now().strftime("%Y%m%d-%H%M%S")
+    runs = []
+    for combination in itertools.product(*values):
+        cfg = {**base_cfg, **dict(zip(SWEEP_KEYS, combination))}
+        stem = f"{cfg['num_layers']}-{cfg['hidden_dim']}-{cfg['activation_function']}"
+        name = f"{stem}-lr{cfg['learning_rate']:g}-w{cfg['weight']:g}"
+        cfg["save_model_path"] = f"{stem}-{tag}.pth"
+        cfg["saveaxpath"] = f"{stem}-3d.png"
+        cfg["saveaxpath2"] = f"{stem}-2d.png"
+        cfg["assesspath"] = f"{stem}-fit.png"
+        runs.append((name, cfg))
+    return runs
+
+
+def plan_workers(n_runs: int, workers: int = None, threads: int = None, cpus: int = None):
+    """
+    Worker processes and threads per worker: by default one worker per run up to the core count,
+    with the cores shared out evenly.
+
+    Returns:
+        tuple: (workers, threads per worker)
+    """
+    cpus = cpus or os.cpu_count() or 1
+    if workers is None:
+        workers = min(n_runs, max(1, cpus // threads)) if threads else min(n_runs, cpus)
+    workers = max(1, min(workers, n_runs))
+    threads = threads or max(1, cpus // workers)
+    return workers, threads
+
+
+@contextlib.contextmanager
+def _thread_limited_children(threads: int):
+    """
+    Thread limit for spawned workers; BLAS/OpenMP read these at import, before any initializer runs.
+    """
+    saved = {var: os.environ.get(var) for var in _THREAD_VARIABLES}
+    os.environ.update({var: str(threads) for var in _THREAD_VARIABLES})
+    try:
+        yield
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def _train_run(name, cfg, data_path, run_dir, threads, visualize):
+    """
+    Worker entry point: train one configuration, never raise.
+    """
+    import torch
+    from train import train_from_config
+
+    torch.set_num_threads(threads)
+    row = {"run": name, **{key: cfg[key] for key in SWEEP_KEYS}, "model_dir": run_dir}
+    try:
+        result = train_from_config(cfg, data_path, run_dir, visualize=visualize, num_threads=threads, progress=False)
+        row.update({key: result[key] for key in ("r2", "best_loss", "epochs_run", "seconds")})
+    except Exception:
+        row["error"] = traceback.format_exc(limit=3).strip().splitlines()[-1]
+    return row
+
+
+def write_leaderboard(rows, path: str):
+    """
+    Write runs sorted by R^2 (best first, failed runs last) with their rank.
+    """
+    ordered = sorted(rows, key=lambda r: (r.get("r2") is None, -(r.get("r2") or 0.0)))
+    ranked = [{**row, "rank": rank if row.get("r2") is not None else ""} for rank, row in enumerate(ordered, 1)]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=LEADERBOARD_FIELDS)
+        writer.writeheader()
+        writer.writerows(ranked)
+    return ranked
+
+
+def run_sweep(base_cfg, grid, data_path=None, out_dir: str = "sweep", workers: int = None, threads: int = None,
+              visualize: bool = False):
+    """
+    Train every combination of `grid` concurrently and rank them.
+
+    Workers are started with the "spawn" method (safe with torch and CUDA) and each run trains with
+    `threads` torch threads. `<out_dir>/leaderboard.csv` is rewritten after every finished run, so an
+    interrupted sweep keeps the results it has.
+
+    Args:
+        base_cfg (dict): merged config supplying everything that is not swept
+        grid (dict): {key: [values, ...]}, see expand_grid
+        data_path (str): training data, defaults to base_cfg['train_data_path']
+        out_dir (str): sweep directory; run i trains in <out_dir>/<run name>/<stem>-<timestamp>
+        workers (int): concurrent runs, see plan_workers
+        threads (int): torch threads per run, see plan_workers
+        visualize (bool): also write the three figures of every run
+
+    Returns:
+        list: leaderboard rows (dicts), best first
+    """
+    runs = expand_grid(base_cfg, grid)
+    data_path = os.path.abspath(data_path or base_cfg['train_data_path'])
+    workers, threads = plan_workers(len(runs), workers, threads)
+    os.makedirs(out_dir, exist_ok=True)
+    leaderboard = os.path.join(out_dir, "leaderboard.csv")
+    print(f"Sweep: {len(runs)} runs, {workers} workers x {threads} threads -> {leaderboard}")
+
+    rows = []
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with _thread_limited_children(threads), ProcessPoolExecutor(workers, mp_context=context) as pool:
+        futures = []
+        for name, cfg in runs:
+            run_dir = os.path.join(out_dir, name, cfg["save_model_path"].replace(".pth", ""))
+            futures.append(pool.submit(_train_run, name, cfg, data_path, run_dir, threads, visualize))
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            write_leaderboard(rows, leaderboard)
+            status = f"R2 {row['r2']:.6f}" if "r2" in row else f"failed: {row['error']}"
+            print(f"[{len(rows)}/{len(runs)}] {row['run']}: {status} ({time.perf_counter() - start:.0f} s)")
+    return write_leaderboard(rows, leaderboard)
@@ -0,0 +1,76 @@
+"""
+Active-learning test script.
+
+Drives the active-learning loop and propose_batch with tiny ensembles against the analytic LEPS potential
+and checks that the selected points lie on the grid, are never selected twice, and that propose_batch only
+writes inputs for the selected points. Run with `python test_active_learning.py` or pytest.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+from active_learning import LEPSPotential, grid_candidates, propose_batch, run_active_learning, RUN_BIG_DIR
+from config import get_config, DEFAULT_CONFIG_NAME
+
+TINY = {"members": 2, "epochs": 20, "batch_size": 6, "initial_stride": 5, "seed": 0}
+
+
+def _grid_keys(points):
+    return {(round(float(x), 6), round(float(y), 6)) for x, y in points}
+
+
+def test_loop_on_leps():
+    """Every round adds new, distinct grid points"""
+    candidates = grid_candidates(step=0.1, size=16)
+    data, history = run_active_learning(LEPSPotential(), get_config(DEFAULT_CONFIG_NAME), rounds=3,
+                                        candidates=candidates, **TINY)
+    points = data[["x", "y"]].to_numpy()
+    keys = _grid_keys(points)
+    assert len(keys) == len(points), "a point was labelled twice"
+    assert keys <= _grid_keys(candidates), "a point outside the grid was labelled"
+    labelled = history["labelled"].tolist()
+    assert len(labelled) == 4 and all(b > a for a, b in zip(labelled, labelled[1:]))
+    assert labelled[-1] == len(points)
+    assert np.isfinite(history["rmse"]).all()
+    print("✅ LEPS active-learning loop test passed!")
+
+
+def test_propose_batch_writes_only_selected_inputs():
+    """Initial design first, then one ensemble-selected batch on top of the labelled points"""
+    sys.path.insert(0, RUN_BIG_DIR)
+    from extract import discover_points
+    import generate_gaussian_input as generator
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        root = os.path.join(temp_dir, "calc")
+        cfg = get_config(DEFAULT_CONFIG_NAME)
+
+        def written():
+            return _grid_keys((m, -n) for m, n, _ in discover_points(root, generator.ATOM2, generator.ATOM3))
+
+        first = propose_batch("gaussian", cfg, root=root, **TINY)
+        assert written() == _grid_keys(first) and len(_grid_keys(first)) == len(first)
+
+        # Label the initial design with LEPS in place of Gaussian + extraction
+        data_path = os.path.join(temp_dir, "labelled.csv")
+        LEPSPotential()(first).to_csv(data_path, index=False)
+        second = propose_batch("gaussian", cfg, data_path=data_path, root=root, **TINY)
+
+        assert len(second) == TINY["batch_size"]
+        assert len(_grid_keys(second)) == len(second), "a point was selected twice"
+        assert not _grid_keys(second) & _grid_keys(first), "an existing calculation was selected again"
+        assert _grid_keys(second) <= _grid_keys(grid_candidates())
+        assert written() == _grid_keys(first) | _grid_keys(second), "inputs written for unselected points"
+        print("✅ propose_batch test passed!")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    test_loop_on_leps()
+    test_propose_batch_writes_only_selected_inputs()
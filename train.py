@@ -4,11 +4,46 @@ Training loop utilities.
 Training loop utilities: contains training functions and model saving.
 """
 
+import time
 import torch
-from utils import setup_logging, log_metrics
-import numpy as np
-from sklearn.metrics import r2_score
-from tqdm import tqdm
+from utils import (
+    setup_logging, log_metrics, visualize_model, accuracy, load_model, ensure_dir, MetricsRecorder, peak_memory_mb,
+)
+from evaluation import Evaluator
+from checkpoint import CheckpointManager
+from profiling import phase, mark_step
+from data_loader import load_data
+from loss import CustomLoss
+from model import NeuralNetwork
+from torch.optim.lr_scheduler import ReduceLROnPlateau
+from config import TRAINING_MODES, OPTIMIZERS
+
+
+def build_optimizer(model, cfg):
+    """
+    Build the optimizer and LR scheduler described by a config.
+
+    Adam is paired with ReduceLROnPlateau; L-BFGS uses a strong-Wolfe line search
+    and no scheduler (returned as None).
+    """
+    name = cfg.get("optimizer", "adam")
+    if name not in OPTIMIZERS:
+        raise ValueError(f"Unknown optimizer: {name} (choose from {', '.join(OPTIMIZERS)})")
+    if name == "lbfgs":
+        optimizer = torch.optim.LBFGS(
+            model.parameters(),
+            lr=cfg["lbfgs_lr"],
+            max_iter=cfg["lbfgs_max_iter"],
+            history_size=cfg["lbfgs_history_size"],
+            line_search_fn="strong_wolfe",
+        )
+        return optimizer, None
+    optimizer = torch.optim.Adam(model.parameters(), lr=cfg['learning_rate'])
+    scheduler = ReduceLROnPlateau(
+        optimizer, cfg['scheduler_mode'], patience=cfg['scheduler_patience'], factor=cfg['scheduler_factor']
+    )
+    return optimizer, scheduler
+
 
 def train(
     model,
@@ -23,6 +58,13 @@ def train(
     epochs: int = 1000,
     patience: int = 50,
     min_delta: float = 1e-4,
+    mode: str = "sample",
+    eval_every: int = 10,
+    num_threads: int = None,
+    progress: bool = True,
+    checkpoint=None,
+    resume: bool = False,
+    on_epoch=None,
 ):
     """
     Train the model with early stopping and LR scheduling.
@@ -34,7 +76,7 @@ def train(
         train_loader: DataLoader producing (X, y) / Training data loader
         criterion: loss function / Loss function
         optimizer: optimizer / Optimizer
-        scheduler: LR scheduler / Learning rate scheduler
+        scheduler: LR scheduler or None / Learning rate scheduler
         path (str): checkpoint save path / Model save path
         data (pd.DataFrame): raw dataframe for eval / Data for evaluation and visualization
         weight (float): gradient term weight / Gradient term weight
@@ -42,10 +84,30 @@ def train(
         epochs (int): max epochs / Maximum epochs
         patience (int): early stopping patience / Early stopping patience value
         min_delta (float): min improvement to reset patience / Minimum improvement to reset patience
+        mode (str): "sample" (one row per step), "batch" (mini-batches from the loader)
+            or "full" (whole dataset resident on the device) / Training mode
+        eval_every (int): epochs between R^2/MAE/max-error evaluations, 0 disables / Evaluation interval
+        num_threads (int): torch intra-op threads, None keeps torch's default / CPU thread limit
+        progress (bool): show the tqdm progress bar / Show progress bar
+        checkpoint (CheckpointManager): background writer of the best weights (to `path`) and the resumable
+            state, default CheckpointManager(path) / Checkpoint manager
+        resume (bool): continue from the resumable state of an interrupted run if there is one / Resume training
+        on_epoch (callable): called after every epoch as on_epoch(epoch, {"loss", "best_loss", "lr"}) / Progress hook
+
+    Returns:
+        dict: {"best_loss", "epochs_run"}
     """
-    torch.set_num_threads(12)
+    from tqdm import tqdm
+
+    if mode not in TRAINING_MODES:
+        raise ValueError(f"Unknown training mode: {mode}")
+    if isinstance(optimizer, torch.optim.LBFGS) and mode != "full":
+        raise ValueError("L-BFGS needs a closure over the whole dataset, use mode='full'")
+    if num_threads:
+        torch.set_num_threads(int(num_threads))
     trainname = ''.join(['Training Batch'])
-    writer = setup_logging(trainname)
+    # add_scalar only queues; the event files are written by the recorder's background thread
+    writer = MetricsRecorder(setup_logging(trainname))
     model.train()
     best_loss = float('inf')
     patience_counter = 0
@@ -55,74 +117,345 @@ def train(
     epochs = int(epochs)
     current_lr = optimizer.param_groups[0]['lr']  # the initial learning rate
     loss_list = []
-    for epoch in tqdm(range(epochs),desc=trainname):
-        sum_total = 0
-        grad_list = torch.tensor([[0.,0.,0.]], dtype=torch.float32, device=device)
-        model.train()  # assure the model is in training mode
-        for inputs, labels in train_loader:
-            inputs = inputs.to(device)
-            labels = labels.to(device)
-            optimizer.zero_grad()
-            outputs = model(inputs)
-            inputs.retain_grad()
-            outputs.backward(torch.ones_like(outputs), retain_graph=True)
-            predicted_gradients = inputs.grad/0.529
-            optimizer.zero_grad()
-            outputs = model(inputs)
-            F1 = -predicted_gradients[0][0]
-            F2 = predicted_gradients[0][0]-predicted_gradients[0][1]
-            F3 = predicted_gradients[0][1]
-            pred_grad = torch.cat((F2.reshape(-1,1),F3.reshape(-1,1),F1.reshape(-1,1)),dim=1).to(device)
-            loss = criterion(outputs[0][0], labels[0][0],pred_grad, labels[0][1:4], weight).to(device)
-            grad_list = torch.cat((grad_list,pred_grad),dim=0)     
-            grad_list = grad_list.to(device)
-            loss.backward()
-            sum_total += loss
-            optimizer.step()
-        sum_total /= len(train_loader)
-        loss_list.append(sum_total)
-        epsilon = 1e-6
-        # Detect gradient vanishing to avoid futile training.
-        # Detect gradient vanishing to avoid futile training.
-        if torch.all(grad_list.abs().mean() < epsilon):
-            print('break')
-            break
-        
-        model.eval()
-        X_pred = np.array([data['x'].to_numpy(), data['y'].to_numpy()]).T
-        X_pred_tensor = torch.tensor(X_pred, dtype=torch.float32).to(device)
-
-        # Predict on full mesh for logging.
-        # Make predictions on full data for logging.
-        with torch.no_grad():  # excluding the gradient
-            y_pred_tensor = model(X_pred_tensor).cpu()
-
-        # Convert the prediction results to a NumPy array.
-        y_pred = y_pred_tensor.numpy()
-
-        r_squared = r2_score(data['z1'], y_pred)
-        
-        log_metrics(writer, {'Loss': sum_total, 'Accuracy': r_squared}, epoch, "Train")
-
-        new_lr = optimizer.param_groups[0]['lr']
-        if new_lr < current_lr:
-            current_lr = new_lr  # upgrade the learning rate
-
-        # Update the best checkpoint if improved.
-        # If loss improves, save the best model.
-        if sum_total < best_loss - min_delta:
-            best_loss = sum_total
-            patience_counter = 0  # reset the patience counter
-            save_model(model, path)
-        else:
-            patience_counter += 1 # if no improvements, add 1 to the patience counter
-        
-        #optimize the learning rate
-        scheduler.step(sum_total.detach().cpu().item())
-        # check the early stop condition
-        if patience_counter >= patience:
-            tqdm.write("Early stopping triggered")
-            break
+    evaluator = Evaluator(model, data, device, every=eval_every)
+    if mode == "full":
+        # Keep inputs and targets resident on the device for the whole run
+        X_full, y_full = (t.detach().to(device).contiguous() for t in train_loader.dataset.tensors)
+    samples_per_epoch = len(train_loader.dataset)
+    steps_per_epoch = 1 if mode == "full" else len(train_loader)
+    train_total = eval_total = 0.0
+
+    # Best weights and resumable state are written in the background, at most every checkpoint.min_interval s
+    owns_checkpoint = checkpoint is None
+    checkpoint = checkpoint or CheckpointManager(path)
+    # `stopped`: ended by early stopping / vanishing gradients, so a resume does not train further
+    next_epoch, stopped = 0, False
+
+    def resume_state():
+        return {
+            "epoch": next_epoch,
+            "stopped": stopped,
+            "model": model.state_dict(),
+            "optimizer": optimizer.state_dict(),
+            "scheduler": scheduler.state_dict() if scheduler is not None else None,
+            "best_loss": best_loss,
+            "patience_counter": patience_counter,
+            "loss_list": list(loss_list),
+            "rng": torch.get_rng_state(),
+            "cuda_rng": torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None,
+        }
+
+    state = checkpoint.load_state(map_location=device) if resume else None
+    if state is not None:
+        model.load_state_dict(state["model"])
+        optimizer.load_state_dict(state["optimizer"])
+        if scheduler is not None and state["scheduler"] is not None:
+            scheduler.load_state_dict(state["scheduler"])
+        next_epoch, stopped = state["epoch"], state["stopped"]
+        best_loss, patience_counter = state["best_loss"], state["patience_counter"]
+        loss_list = list(state["loss_list"])
+        current_lr = optimizer.param_groups[0]['lr']
+        torch.set_rng_state(state["rng"].cpu())
+        if state["cuda_rng"] is not None and torch.cuda.is_available():
+            torch.cuda.set_rng_state_all([s.cpu() for s in state["cuda_rng"]])
+        tqdm.write(f"Resuming {checkpoint.state_path} at epoch {next_epoch} (best loss {best_loss:.6g})")
+
+    try:
+        for epoch in tqdm(range(next_epoch, next_epoch if stopped else epochs), desc=trainname,
+                          initial=next_epoch, total=epochs, disable=not progress):
+            epoch_start = time.perf_counter()
+            model.train()  # assure the model is in training mode
+            with phase("train_epoch"):
+                if mode == "full":
+                    sum_total, grad_mean = _run_full_epoch(model, X_full, y_full, criterion, optimizer, weight)
+                elif mode == "batch":
+                    sum_total, grad_mean = _run_batch_epoch(model, train_loader, criterion, optimizer, weight, device)
+                else:
+                    sum_total, grad_mean = _run_sample_epoch(model, train_loader, criterion, optimizer, weight, device)
+                # The only host-device sync of the epoch: fetch loss and force magnitude together
+                sum_total, grad_mean = torch.stack((sum_total.detach(), grad_mean.detach())).tolist()
+            train_seconds = time.perf_counter() - epoch_start
+            loss_list.append(sum_total)
+            with phase("logging"):
+                log_metrics(writer, {'Loss': sum_total}, epoch, "Train")
+            next_epoch = epoch + 1
+            epsilon = 1e-6
+            # Detect gradient vanishing to avoid futile training.
+            if grad_mean < epsilon:
+                print('break')
+                stopped = True
+                with phase("checkpointing"):
+                    checkpoint.save_state(resume_state)
+                break
+
+            # Full-dataset evaluation on the cached device tensors, every `eval_every` epochs.
+            # Results are collected one evaluation late so the host never waits for them.
+            eval_seconds = 0.0
+            if evaluator.due(epoch):
+                eval_start = time.perf_counter()
+                with phase("evaluation"):
+                    _log_evaluations(writer, evaluator.collect())
+                    evaluator.submit(epoch)
+                eval_seconds = time.perf_counter() - eval_start
+
+            new_lr = optimizer.param_groups[0]['lr']
+            if new_lr < current_lr:
+                current_lr = new_lr  # upgrade the learning rate
+
+            # Update the best checkpoint if improved.
+            # If loss improves, keep the best model (written in the background).
+            if sum_total < best_loss - min_delta:
+                best_loss = sum_total
+                patience_counter = 0  # reset the patience counter
+                with phase("checkpointing"):
+                    checkpoint.update_best(model)
+            else:
+                patience_counter += 1 # if no improvements, add 1 to the patience counter
+
+            #optimize the learning rate
+            if scheduler is not None:
+                scheduler.step(sum_total)
+            # check the early stop condition (recorded in the resumable state)
+            stopped = patience_counter >= patience
+            # Resumable snapshot of the completed epoch; written now or later, depending on the interval
+            with phase("checkpointing"):
+                checkpoint.save_state(resume_state)
+            train_total += train_seconds
+            eval_total += eval_seconds
+            with phase("logging"):
+                _log_performance(writer, epoch, time.perf_counter() - epoch_start, train_seconds, eval_seconds,
+                                 eval_total / (train_total + eval_total), samples_per_epoch, steps_per_epoch,
+                                 optimizer.param_groups[0]['lr'])
+            if on_epoch is not None:
+                on_epoch(epoch, {"loss": sum_total, "best_loss": best_loss, "lr": optimizer.param_groups[0]['lr']})
+            mark_step()
+            if stopped:
+                tqdm.write("Early stopping triggered")
+                break
+        with phase("evaluation"):
+            _log_evaluations(writer, evaluator.collect())
+    finally:
+        # also on interruption: write the snapshot of the last completed epoch, never the half-updated live state
+        with phase("checkpointing"):
+            checkpoint.save_latest_state()
+            if owns_checkpoint:
+                checkpoint.close()
+            else:
+                checkpoint.flush()
+        writer.close()
+    return {"best_loss": best_loss, "epochs_run": next_epoch}
+
+
+def train_from_config(cfg, data_path=None, out_dir=None, visualize: bool = True, num_threads: int = None,
+                      progress: bool = True, resume: bool = False, on_epoch=None, atoms=("H", "H", "Ne")):
+    """
+    Build, train and evaluate one model described by a merged config.
+
+    Same steps as `main.py train`: model, optimizer and loader from `cfg`, training with early stopping,
+    then the best checkpoint is reloaded for R^2 and (optionally) the three figures.
+
+    Args:
+        cfg (dict): merged config (config.get_config plus overrides)
+        data_path (str): training CSV / .npy, defaults to cfg['train_data_path']
+        out_dir (str): output directory for weights and figures, created if missing
+        visualize (bool): write the fit / 3D / contour figures
+        num_threads (int): torch intra-op threads, see train()
+        progress (bool): show the tqdm progress bar
+        resume (bool): continue an interrupted run from its `.resume.pt` state, see train()
+        on_epoch (callable): per-epoch progress hook, see train()
+        atoms (tuple): atom1, atom2, atom3 for the figure labels
+
+    Returns:
+        dict: {"r2", "best_loss", "epochs_run", "seconds", "model_path"}
+    """
+    data_path = data_path or cfg['train_data_path']
+    out_dir = out_dir or "."
+    ensure_dir(out_dir)
+    save_model_path = f"{out_dir}/{cfg['save_model_path']}"
+
+    batch_size = cfg['batch_size'] if cfg['training_mode'] == "batch" else 1
+    with phase("data_load"):
+        train_loader, data = load_data(data_path, batch_size=batch_size)
+    model = NeuralNetwork(
+        cfg['input_dim'], cfg['hidden_dim'], cfg['num_layers'], cfg['output_dim'], cfg['activation_function']
+    )
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = model.to(device)
+    criterion = CustomLoss()
+    optimizer, scheduler = build_optimizer(model, cfg)
+
+    start = time.perf_counter()
+    with CheckpointManager(save_model_path, min_interval=cfg['checkpoint_interval']) as checkpoint:
+        result = train(
+            model,
+            train_loader,
+            criterion,
+            optimizer,
+            scheduler,
+            save_model_path,
+            data,
+            cfg['weight'],
+            trainname=cfg['save_model_path'].replace(".pth", ""),
+            epochs=cfg['epochs'],
+            patience=cfg['patience'],
+            min_delta=cfg['min_delta'],
+            mode=cfg['training_mode'],
+            eval_every=cfg['eval_every'],
+            num_threads=num_threads,
+            progress=progress,
+            checkpoint=checkpoint,
+            resume=resume,
+            on_epoch=on_epoch,
+        )
+    seconds = time.perf_counter() - start
+
+    model = load_model(model, save_model_path)
+    if visualize:
+        with phase("plotting"):
+            visualize_model(model, data, f"{out_dir}/{cfg['saveaxpath']}", f"{out_dir}/{cfg['saveaxpath2']}",
+                            f"{out_dir}/{cfg['assesspath']}", *atoms)
+    with phase("evaluation"):
+        r2 = float(accuracy(model, data))
+    return {"r2": r2, **result, "seconds": seconds, "model_path": save_model_path}
+
+
+def _log_evaluations(writer, results):
+    """
+    Write collected evaluation metrics to TensorBoard.
+    """
+    for epoch, metrics in results:
+        log_metrics(
+            writer,
+            {'Accuracy': metrics['r2'], 'MAE': metrics['mae'], 'MaxError': metrics['max_error']},
+            epoch,
+            "Train",
+        )
+
+
+def _log_performance(writer, epoch, epoch_seconds, train_seconds, eval_seconds, eval_share, samples, steps, lr):
+    """
+    Write the throughput and resource scalars of one epoch under "Perf/".
+    """
+    metrics = {
+        'EpochSeconds': epoch_seconds,
+        'TrainSeconds': train_seconds,
+        'EvalSeconds': eval_seconds,
+        'EvalShare': eval_share,
+        'SamplesPerSec': samples / train_seconds,
+        'StepsPerSec': steps / train_seconds,
+        'LearningRate': lr,
+    }
+    memory = peak_memory_mb()
+    if memory["rss"] is not None:
+        metrics['PeakRSS_MB'] = memory["rss"]
+    if memory["cuda"] is not None:
+        metrics['PeakCUDA_MB'] = memory["cuda"]
+    log_metrics(writer, metrics, epoch, "Perf")
+
+
+def forces_from_gradient(gradients):
+    """
+    Convert dE/d(r12, r23) into forces ordered like the z2, z3, z4 labels.
+
+    The gradient is rescaled from Angstrom to Bohr and returned as (F2, F3, F1).
+    """
+    gradients = gradients / 0.529
+    return torch.stack(
+        (gradients[:, 0] - gradients[:, 1], gradients[:, 1], -gradients[:, 0]), dim=1
+    )
+
+
+def _run_sample_epoch(model, train_loader, criterion, optimizer, weight, device):
+    """
+    One epoch of the original per-sample loop.
+
+    Returns the mean loss and the mean absolute predicted force.
+    """
+    sum_total = 0
+    grad_list = torch.tensor([[0.,0.,0.]], dtype=torch.float32, device=device)
+    for inputs, labels in train_loader:
+        inputs = inputs.to(device).requires_grad_(True)
+        labels = labels.to(device)
+        optimizer.zero_grad()
+        outputs = model(inputs)
+        outputs.backward(torch.ones_like(outputs), retain_graph=True)
+        predicted_gradients = inputs.grad/0.529
+        optimizer.zero_grad()
+        outputs = model(inputs)
+        F1 = -predicted_gradients[0][0]
+        F2 = predicted_gradients[0][0]-predicted_gradients[0][1]
+        F3 = predicted_gradients[0][1]
+        pred_grad = torch.cat((F2.reshape(-1,1),F3.reshape(-1,1),F1.reshape(-1,1)),dim=1).to(device)
+        loss = criterion(outputs[0][0], labels[0][0],pred_grad, labels[0][1:4], weight).to(device)
+        grad_list = torch.cat((grad_list,pred_grad),dim=0)
+        grad_list = grad_list.to(device)
+        loss.backward()
+        sum_total += loss
+        optimizer.step()
+    sum_total /= len(train_loader)
+    return sum_total, grad_list.abs().mean()
+
+
+def _run_batch_epoch(model, train_loader, criterion, optimizer, weight, device):
+    """
+    One epoch over mini-batches.
+
+    Energies and input gradients of the whole batch come from a single fused
+    forward pass (NeuralNetwork.energy_and_gradient) that stays differentiable,
+    so the force term of CustomLoss is trained as well. The returned loss is the sample-weighted
+    mean, i.e. the same quantity the per-sample loop reports.
+    """
+    n_samples = len(train_loader.dataset)
+    sum_total = torch.zeros((), device=device)
+    grad_abs_sum = torch.zeros((), device=device)
+    for inputs, labels in train_loader:
+        inputs = inputs.to(device)
+        labels = labels.to(device)
+        optimizer.zero_grad()
+        outputs, gradients = model.energy_and_gradient(inputs)
+        pred_grad = forces_from_gradient(gradients)
+        loss = criterion(outputs[:, 0], labels[:, 0], pred_grad, labels[:, 1:4], weight)
+        loss.backward()
+        optimizer.step()
+        sum_total += loss.detach() * inputs.shape[0]
+        grad_abs_sum += pred_grad.detach().abs().sum()
+    return sum_total / n_samples, grad_abs_sum / (3 * n_samples)
+
+
+def _full_batch_loss(model, X, y, criterion, weight):
+    """
+    CustomLoss over the whole dataset, with the force term kept differentiable.
+    """
+    outputs, gradients = model.energy_and_gradient(X.detach())
+    pred_grad = forces_from_gradient(gradients)
+    loss = criterion(outputs[:, 0], y[:, 0], pred_grad, y[:, 1:4], weight)
+    return loss, pred_grad
+
+
+def _run_full_epoch(model, X, y, criterion, optimizer, weight):
+    """
+    One optimizer step on the full, device-resident dataset.
+
+    Works with closure-based optimizers such as L-BFGS (which may re-evaluate the
+    loss many times per step) as well as with Adam.
+    """
+    last = {}
+
+    def closure():
+        optimizer.zero_grad()
+        loss, pred_grad = _full_batch_loss(model, X, y, criterion, weight)
+        loss.backward()
+        last["loss"], last["pred_grad"] = loss.detach(), pred_grad.detach()
+        return loss
+
+    optimizer.step(closure)
+    if isinstance(optimizer, torch.optim.LBFGS):
+        # The last closure call may be a rejected line-search trial; report the loss of the accepted weights
+        with torch.no_grad():
+            loss, pred_grad = _full_batch_loss(model, X, y, criterion, weight)
+        return loss, pred_grad.abs().mean()
+    return last["loss"], last["pred_grad"].abs().mean()
+
 
 def save_model(model, path):
     """
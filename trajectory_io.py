@@ -0,0 +1,184 @@
+"""
+Binary trajectory format and XYZ export.
+
+Trajectory recording: MD frames (time, potential, total energy and the three collinear coordinates of every
+trajectory) are appended chunk by chunk to a raw `.trj` file next to a small JSON header, in the spirit of
+dataset_io. The file is read back with np.memmap, so long runs and large ensembles never have to fit in
+memory, and XYZ files are produced with one formatted write instead of a Python loop over rows.
+"""
+
+import json
+import os
+import numpy as np
+
+FORMAT_NAME = "pes-trajectory"
+FORMAT_VERSION = 1
+TRAJECTORY_SUFFIX = ".trj"
+# per trajectory and frame: time (s), potential (network units), total energy (eV), x1..x3 (Angstrom)
+FIELDS = ("time", "potential", "energy", "x1", "x2", "x3")
+DEFAULT_ATOMS = ("Ne", "H", "H")
+
+
+def header_path(trj_path: str) -> str:
+    """
+    Path of the JSON header belonging to a `.trj` file.
+    """
+    return os.path.splitext(trj_path)[0] + ".json"
+
+
+class TrajectoryWriter:
+    """
+    Frame recorder for run_batch_trajectories.
+
+    Frames arrive in chunks of (T, N) / (T, N, 3) arrays. With a `path` they are appended to the `.trj` file
+    as they come (memory stays at one chunk); without one they are kept and returned by arrays().
+
+    Args:
+        path (str): `.trj` output, or None to record in memory
+        n_trajectories (int): trajectories per frame
+        stride (int): record every `stride`-th step
+        dtype (str): "float32" (compact) or "float64"
+        chunk_frames (int): frames buffered on the device before each flush
+        atoms (tuple): atom symbols for the header and XYZ export
+        metadata (dict): extra header entries (dt, integrator, ...)
+    """
+
+    def __init__(self, path=None, n_trajectories: int = 1, stride: int = 1, dtype: str = "float32",
+                 chunk_frames: int = 1024, atoms=DEFAULT_ATOMS, metadata=None):
+        if dtype not in ("float32", "float64"):
+            raise ValueError(f"Unsupported dtype: {dtype}")
+        if stride < 1:
+            raise ValueError("stride must be at least 1")
+        self.path = path
+        self.n_trajectories = int(n_trajectories)
+        self.stride = int(stride)
+        self.dtype = dtype
+        self.chunk_frames = int(chunk_frames)
+        self.atoms = tuple(atoms)
+        self.metadata = dict(metadata or {})
+        self.frames = 0
+        self._chunks = []
+        self._file = None
+        if path is not None:
+            out_dir = os.path.dirname(path)
+            if out_dir:
+                os.makedirs(out_dir, exist_ok=True)
+            self._file = open(path, "wb")
+
+    def write_chunk(self, times, trajectory, potential, energy):
+        """
+        Append frames: times, potential, energy of shape (T, N) and trajectory of shape (T, N, 3).
+        """
+        block = np.empty((len(times), self.n_trajectories, len(FIELDS)), dtype=self.dtype)
+        block[..., 0] = times
+        block[..., 1] = potential
+        block[..., 2] = energy
+        block[..., 3:] = trajectory
+        if self._file is not None:
+            block.tofile(self._file)
+        else:
+            self._chunks.append(block)
+        self.frames += len(block)
+
+    def arrays(self):
+        """
+        Recorded frames of an in-memory writer, as the "times", "trajectory", "potential" and "energy" arrays.
+        """
+        if self._chunks:
+            block = np.concatenate(self._chunks)
+        else:
+            block = np.empty((0, self.n_trajectories, len(FIELDS)), dtype=self.dtype)
+        return _split_fields(block)
+
+    def header(self):
+        return {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "fields": list(FIELDS),
+            "dtype": self.dtype,
+            "frames": self.frames,
+            "n_trajectories": self.n_trajectories,
+            "stride": self.stride,
+            "atoms": list(self.atoms),
+            "units": {"time": "s", "potential": "network", "energy": "eV", "x1": "angstrom", "x2": "angstrom",
+                      "x3": "angstrom"},
+            **self.metadata,
+        }
+
+    def close(self):
+        """
+        Finish the file and write its JSON header (frame count included).
+        """
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+            with open(header_path(self.path), "w") as f:
+                json.dump(self.header(), f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _split_fields(block):
+    return {
+        "times": block[..., 0],
+        "potential": block[..., 1],
+        "energy": block[..., 2],
+        "trajectory": block[..., 3:],
+    }
+
+
+def save_trajectory(path: str, times, trajectory, potential, energy, stride: int = 1, dtype: str = "float32",
+                    atoms=DEFAULT_ATOMS, metadata=None):
+    """
+    Write already recorded frames as `.trj` + JSON header in one go.
+    """
+    times = np.asarray(times)
+    with TrajectoryWriter(path, times.shape[1], stride=stride, dtype=dtype, atoms=atoms,
+                          metadata=metadata) as writer:
+        writer.write_chunk(times, trajectory, potential, energy)
+    return path
+
+
+def read_trajectory(trj_path: str, mmap: bool = True):
+    """
+    Open a `.trj` file.
+
+    Returns:
+        tuple: (arrays, header) with "times", "potential", "energy" of shape (T, N) and "trajectory" (T, N, 3),
+            views into a read-only np.memmap when `mmap` is True
+    """
+    with open(header_path(trj_path)) as f:
+        header = json.load(f)
+    if header.get("format") != FORMAT_NAME:
+        raise ValueError(f"{header_path(trj_path)} is not a {FORMAT_NAME} header")
+    if header.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"{trj_path} has unsupported version {header['version']}")
+    shape = (header["frames"], header["n_trajectories"], len(header["fields"]))
+    if mmap and header["frames"] > 0:
+        block = np.memmap(trj_path, dtype=header["dtype"], mode="r", shape=shape)
+    else:
+        block = np.fromfile(trj_path, dtype=header["dtype"]).reshape(shape)
+    return _split_fields(block), header
+
+
+def write_xyz(path: str, times, coordinates, atoms=DEFAULT_ATOMS):
+    """
+    Write a collinear trajectory as an XYZ file with a single formatted write.
+
+    Frames with NaN coordinates (steps after a trajectory stopped) are skipped.
+
+    Args:
+        times (array-like): (T,) frame times in seconds
+        coordinates (array-like): (T, 3) positions along the molecular axis in Angstrom
+    """
+    times = np.asarray(times, dtype=np.float64)
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    valid = np.isfinite(times) & np.isfinite(coordinates).all(axis=1)
+    frame = f"{len(atoms)}\nTime = %.5e seconds\n" + "".join(f"{atom} %s 0 0\n" for atom in atoms)
+    values = np.column_stack((times[valid], coordinates[valid])).ravel().tolist()
+    with open(path, "w") as f:
+        f.write((frame * int(valid.sum())) % tuple(values))
+    return path
@@ -7,11 +7,14 @@ Utility function collection: model I/O, logging, visualization and evaluation me
 import torch
 import logging
 from datetime import datetime
-from torch.utils.tensorboard import SummaryWriter
-import numpy as np
-from sklearn.metrics import r2_score
-import matplotlib.pyplot as plt
 import os
+import sys
+import threading
+import time
+from pes_evaluator import PESEvaluator
+
+# TensorBoard, sklearn and matplotlib take seconds to import and are only needed by the
+# functions below that use them, so they are imported there.
 
 
 def ensure_dir(path: str):
@@ -44,6 +47,8 @@ def setup_logging(experiment_name):
 
     Create TensorBoard writer.
     """
+    from torch.utils.tensorboard import SummaryWriter
+
     current_time = datetime.now().strftime("%Y%m%d-%H%M%S")
     log_dir = f"logs/{current_time}_{experiment_name}"
     writer = SummaryWriter(log_dir)
@@ -60,6 +65,102 @@ def log_metrics(writer, metrics, step, prefix="Train"):
         writer.add_scalar(f"{prefix}/{key}", value, step)
 
 
+class MetricsRecorder:
+    """
+    Buffered TensorBoard scalar logger.
+
+    add_scalar() only appends (tag, value, step, wall time) to a list, so it can stand in for the SummaryWriter
+    in log_metrics; a background thread hands the buffer to the writer every `flush_interval` seconds or once
+    `max_pending` scalars are queued, so building the event protobufs never runs in the training or MD loop.
+
+    Args:
+        writer: torch.utils.tensorboard SummaryWriter (closed together with the recorder)
+        flush_interval (float): seconds between background flushes
+        max_pending (int): queued scalars that trigger an early flush
+    """
+
+    def __init__(self, writer, flush_interval: float = 5.0, max_pending: int = 1000):
+        self.writer = writer
+        self.log_dir = writer.log_dir
+        self.flush_interval = float(flush_interval)
+        self.max_pending = int(max_pending)
+        self._pending = []
+        self._closed = False
+        self._error = None
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+
+    def add_scalar(self, tag, value, step):
+        """
+        Queue one scalar; `value` may be a float or a 0-dim tensor.
+        """
+        with self._cond:
+            self._raise_error()
+            self._pending.append((tag, value, step, time.time()))
+            if len(self._pending) >= self.max_pending:
+                self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self.max_pending:
+                    self._cond.wait(self.flush_interval)
+                batch, self._pending = self._pending, []
+                closed = self._closed
+            try:
+                for tag, value, step, walltime in batch:
+                    self.writer.add_scalar(tag, float(value), step, walltime=walltime)
+                if batch:
+                    self.writer.flush()
+            except Exception as error:     # surfaced to the caller on the next add_scalar / close
+                self._error = error
+            if closed:
+                return
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError(f"Writing TensorBoard metrics failed: {error}") from error
+
+    def close(self):
+        """
+        Write everything queued, stop the thread and close the writer.
+        """
+        if self._closed:
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.writer.close()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def peak_memory_mb():
+    """
+    Peak resident set size of this process and peak CUDA memory allocated by torch, in MiB.
+
+    Returns:
+        dict: {"rss": float or None (no `resource` module, e.g. Windows), "cuda": float or None (no CUDA)}
+    """
+    try:
+        import resource
+    except ImportError:
+        rss = None
+    else:
+        # ru_maxrss is in KiB on Linux and in bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+    cuda = torch.cuda.max_memory_allocated() / 2 ** 20 if torch.cuda.is_available() else None
+    return {"rss": rss, "cuda": cuda}
+
+
 def visualize_model(model, data, savepath, savepath2, saverocpath, atom1="H", atom2="H", atom3="Ne"):
     """
     Generate 3 figures: scatter-of-true-vs-pred, 3D surface, 2D contour.
@@ -76,17 +177,11 @@ def visualize_model(model, data, savepath, savepath2, saverocpath, atom1="H", at
         atom2: second atom type (default: "H") 
         atom3: third atom type (default: "Ne")
     """
+    import matplotlib.pyplot as plt
+
     # Draw the ROC curve
-    x = data['x']
-    y = data['y']
-    x_roc = np.array([x.to_numpy(), y.to_numpy()]).T
-    x_roc_tensor = torch.tensor(x_roc, dtype=torch.float32)
-    model.eval()
-    # predict
-    with torch.no_grad():  # excluding the gradient
-        y_roc_tensor = model(x_roc_tensor)
-    # convert the result to numpy array
-    y_roc = y_roc_tensor.numpy()
+    evaluator = PESEvaluator(model)
+    y_roc = evaluator.energy(data[['x', 'y']].to_numpy())
     print()
     # Visualize the reliability of predictions.
     plt.figure()
@@ -97,20 +192,8 @@ def visualize_model(model, data, savepath, savepath2, saverocpath, atom1="H", at
     plt.title('True vs Predicted Values')
     plt.legend()
     plt.savefig(saverocpath)
-    # Create a grid to predict **z** values.
-    xp = np.linspace(0.5, 4.0, 1000)
-    yp = np.linspace(0.5, 4.0, 1000)
-    xp, yp = np.meshgrid(xp, yp)
-    X_pred = np.array([xp.ravel(), yp.ravel()]).T
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    X_pred_tensor = torch.tensor(X_pred, dtype=torch.float32).to(device)
-
-    # predict
-    with torch.no_grad():  # excluding the gradient
-        y_pred_tensor = model(X_pred_tensor).cpu()
-
-    # convert the result to numpy array
-    y_pred = y_pred_tensor.numpy()
+    # Predict **z** values on a grid, in memory-bounded chunks.
+    xp, yp, y_pred = evaluator.grid((0.5, 4.0), (0.5, 4.0), 1000)
     # visualize
     fig = plt.figure()
     ax = fig.add_subplot(111, projection='3d')
@@ -160,16 +243,10 @@ def accuracy(model, data):
 
     Compute R^2 on provided dataframe.
     """
-    model.eval()
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    X_pred = np.array([data['x'].to_numpy(), data['y'].to_numpy()]).T
-    X_pred_tensor = torch.tensor(X_pred, dtype=torch.float32).to(device)
+    from sklearn.metrics import r2_score
 
     # Make predictions
-    with torch.no_grad():
-        y_pred_tensor = model(X_pred_tensor).cpu()
-
-    y_pred = y_pred_tensor.numpy()
+    y_pred = PESEvaluator(model).energy(data[['x', 'y']].to_numpy())
 
     r_squared = r2_score(data['z1'], y_pred)
 